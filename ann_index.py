@@ -0,0 +1,175 @@
+from array import array
+
+import numpy as np
+
+
+def assign_nearest(data, centroids, chunk_size=65536):
+    # Index of the nearest centroid (squared L2) for every row of data.
+    half_norms = 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    labels = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), chunk_size):
+        block = data[start:start + chunk_size]
+        labels[start:start + chunk_size] = np.argmax(block @ centroids.T - half_norms, axis=1)
+    return labels
+
+
+def kmeans(data, k, iterations=20, seed=0):
+    # Plain Lloyd's k-means; empty clusters are re-seeded from random points.
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), k, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        labels = assign_nearest(data, centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=k)
+        present = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[present]
+        centroids[present] = np.add.reduceat(data[order], starts, axis=0) / counts[present, None]
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+    return centroids
+
+
+class IVFPQIndex:
+    '''
+    Inverted-file index with product quantisation (IVF-PQ) over row numbers.
+    Vectors are assigned to one of `nlist` coarse centroids and their residuals
+    are encoded as `m` one-byte PQ codes. A search probes the `nprobe` closest
+    lists and scores candidates with per-query lookup tables; raising nprobe
+    trades latency for recall. Rows can be added, overwritten and removed after
+    training, so the index grows incrementally.
+    '''
+    def __init__(self, dimension, nlist=256, m=16, nprobe=8, train_size=None, seed=0):
+        if dimension % m:
+            raise ValueError(f"dimension {dimension} is not divisible by m={m}")
+        self.dimension = dimension
+        self.nlist = nlist
+        self.m = m
+        self.ksub = 256
+        self.nprobe = nprobe
+        self.train_size = train_size or max(nlist * 40, self.ksub * 40)
+        self.seed = seed
+
+        self.centroids = None
+        self.codebooks = None
+        self.count = 0
+        self.codes = np.zeros((0, m), dtype=np.uint8)
+        self.assignments = np.zeros(0, dtype=np.int64)
+        self.lists = [array("q") for _ in range(nlist)]
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    def train(self, vectors, iterations=20):
+        rng = np.random.default_rng(self.seed)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) > self.train_size:
+            vectors = vectors[rng.choice(len(vectors), self.train_size, replace=False)]
+        if len(vectors) < max(self.nlist, self.ksub):
+            raise ValueError(f"need at least {max(self.nlist, self.ksub)} vectors to train, got {len(vectors)}")
+
+        self.centroids = kmeans(vectors, self.nlist, iterations, self.seed)
+        residuals = vectors - self.centroids[assign_nearest(vectors, self.centroids)]
+        sub = self.dimension // self.m
+        self.codebooks = np.stack([
+            kmeans(np.ascontiguousarray(residuals[:, j * sub:(j + 1) * sub]), self.ksub, iterations, self.seed + j)
+            for j in range(self.m)
+        ])
+
+    def _encode(self, vectors):
+        labels = assign_nearest(vectors, self.centroids)
+        residuals = vectors - self.centroids[labels]
+        sub = self.dimension // self.m
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = assign_nearest(np.ascontiguousarray(residuals[:, j * sub:(j + 1) * sub]), self.codebooks[j])
+        return labels, codes
+
+    def _reserve(self, rows):
+        capacity = len(self.assignments)
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2, 1024)
+        codes = np.zeros((new_capacity, self.m), dtype=np.uint8)
+        codes[:self.count] = self.codes[:self.count]
+        assignments = np.zeros(new_capacity, dtype=np.int64)
+        assignments[:self.count] = self.assignments[:self.count]
+        self.codes, self.assignments = codes, assignments
+
+    def set_rows(self, rows, vectors):
+        # Encode vectors for the given rows; rows equal to the current count are appended.
+        rows = np.asarray(rows, dtype=np.int64)
+        labels, codes = self._encode(np.asarray(vectors, dtype=np.float32))
+        self._reserve(max(self.count, int(rows.max()) + 1))
+        for row, label, code in zip(rows.tolist(), labels.tolist(), codes):
+            if row < self.count:
+                self.lists[self.assignments[row]].remove(row)
+            elif row == self.count:
+                self.count += 1
+            else:
+                raise ValueError(f"row {row} would leave a gap after {self.count} rows")
+            self.assignments[row] = label
+            self.codes[row] = code
+            self.lists[label].append(row)
+
+    def clear(self):
+        # Forget every row but keep the trained centroids and codebooks.
+        self.count = 0
+        self.lists = [array("q") for _ in range(self.nlist)]
+
+    def remove(self, row):
+        # Drop a row and move the last row into its place, mirroring LocalIndex.delete.
+        last = self.count - 1
+        self.lists[self.assignments[row]].remove(row)
+        if row != last:
+            members = self.lists[self.assignments[last]]
+            members[members.index(last)] = row
+            self.assignments[row] = self.assignments[last]
+            self.codes[row] = self.codes[last]
+        self.count -= 1
+
+    def search(self, query, k, nprobe=None):
+        # Return (rows, approximate inner-product scores), best first.
+        query = np.asarray(query, dtype=np.float32)
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        coarse = self.centroids @ query
+        # Probe the lists whose centroids are nearest in L2, matching how rows were assigned.
+        closeness = coarse - 0.5 * np.einsum("ij,ij->i", self.centroids, self.centroids)
+        probes = np.argpartition(-closeness, nprobe - 1)[:nprobe]
+
+        sub = self.dimension // self.m
+        tables = np.einsum("jkd,jd->jk", self.codebooks, query.reshape(self.m, sub))
+
+        rows = [np.frombuffer(self.lists[probe], dtype=np.int64) for probe in probes]
+        sizes = [len(members) for members in rows]
+        if not sum(sizes):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        rows = np.concatenate(rows)
+        base = np.repeat(coarse[probes], sizes)
+        scores = base + tables[np.arange(self.m), self.codes[rows]].sum(axis=1)
+
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return rows[top], scores[top]
+
+    def save(self, path):
+        np.savez(path, centroids=self.centroids, codebooks=self.codebooks, codes=self.codes[:self.count],
+                 assignments=self.assignments[:self.count],
+                 config=np.array([self.dimension, self.nlist, self.m, self.nprobe, self.train_size, self.seed]))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as stored:
+            dimension, nlist, m, nprobe, train_size, seed = stored["config"].tolist()
+            index = cls(dimension, nlist=nlist, m=m, nprobe=nprobe, train_size=train_size, seed=seed)
+            index.centroids = stored["centroids"]
+            index.codebooks = stored["codebooks"]
+            index.codes = stored["codes"].copy()
+            index.assignments = stored["assignments"].copy()
+        index.count = len(index.assignments)
+        order = np.argsort(index.assignments, kind="stable")
+        bounds = np.searchsorted(index.assignments[order], np.arange(nlist + 1))
+        index.lists = [array("q", order[bounds[i]:bounds[i + 1]].tolist()) for i in range(nlist)]
+        return index
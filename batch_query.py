@@ -0,0 +1,61 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+
+@dataclass
+class Match:
+    id: str
+    score: float
+    text: str
+    metadata: dict = field(default_factory=dict)
+
+
+@dataclass
+class QueryResult:
+    '''
+    Matches for one question. The "Query Results:" text returned by
+    TextEmbeddingQuery.query is only built when format() or str() is called.
+    '''
+    question: str
+    matches: list
+
+    def format(self):
+        lines = ["Query Results:\n"]
+        lines.extend(f"Match {i + 1}: ID = {match.id}, Score = {match.score:.6f}, Snippet: {match.text}\n"
+                     for i, match in enumerate(self.matches))
+        return "".join(lines)
+
+    def __str__(self):
+        return self.format()
+
+
+def _get(item, name, default=None):
+    # Pinecone responses support attribute and item access; plain dicts only the latter.
+    if isinstance(item, dict):
+        return item.get(name, default)
+    return getattr(item, name, default)
+
+
+def to_result(question, response):
+    matches = []
+    for match in _get(response, "matches", []):
+        metadata = _get(match, "metadata") or {}
+        matches.append(Match(_get(match, "id"), float(_get(match, "score")), metadata.get("text", ""), metadata))
+    return QueryResult(question, matches)
+
+
+def search_many(index, vectors, top_k=3, max_workers=8):
+    '''
+    Return one raw index response per vector. Indexes with a query_many method
+    (LocalIndex) answer the whole batch with matrix operations; anything else,
+    such as pinecone.Index, gets parallel query calls.
+    '''
+    if hasattr(index, "query_many"):
+        return index.query_many(vectors, top_k=top_k, include_metadata=True)
+
+    def run(vector):
+        values = vector.tolist() if hasattr(vector, "tolist") else vector
+        return index.query(vector=values, top_k=top_k, include_metadata=True)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(run, vectors))
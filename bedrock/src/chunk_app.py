@@ -2,34 +2,105 @@ import boto3
 import requests
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 class LambdaToEKSFileProcessor:
-    def __init__(self, eks_processing_url, auth_token):
+    '''
+    Forwards S3 event records to the EKS processing service. By default each
+    record is one blocking POST. With batch_mode=True, all records of an event
+    go out over one pooled keep-alive session: as bulk POSTs of up to
+    `bulk_size` references to `bulk_url` when the service has a bulk endpoint,
+    otherwise as concurrent single POSTs, at most `max_concurrency` at a time.
+    Requests time out after `timeout` seconds and are retried with backoff on
+    connection errors and 429/5xx responses. If any reference still fails, the
+    invocation raises, so Lambda's own retries and on-failure destination or
+    DLQ take the event.
+    '''
+    def __init__(self, eks_processing_url, auth_token, batch_mode=False, bulk_url=None, bulk_size=100,
+                 max_concurrency=8, timeout=(3.05, 30), max_retries=3, backoff_factor=0.5):
         self.s3_client = boto3.client('s3')
         self.eks_processing_url = eks_processing_url
         self.auth_token = auth_token
+        self.batch_mode = batch_mode
+        self.bulk_url = bulk_url
+        self.bulk_size = bulk_size
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+
+        # The processing service must accept a repeated file reference, since POSTs are retried too.
+        retry = Retry(total=max_retries, backoff_factor=backoff_factor, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=None, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Authorization": f"Bearer {self.auth_token}",
+                                     "Content-Type": "application/json"})
 
     def lambda_handler(self, event, context):
+        if self.batch_mode:
+            return self.dispatch_batched(event)
         for record in event['Records']:
             bucket_name = record['s3']['bucket']['name']
             object_key = record['s3']['object']['key']
-            
+
             # Assuming direct file transfer is not feasible, pass S3 file reference to EKS
             file_reference = {
                 "bucket_name": bucket_name,
                 "object_key": object_key
             }
-            
+
             # Trigger processing in EKS
             self.trigger_eks_processing(file_reference)
 
+    def dispatch_batched(self, event):
+        # Send every file reference in the event; raises if any of them did not get through.
+        file_references = [{"bucket_name": record['s3']['bucket']['name'], "object_key": record['s3']['object']['key']}
+                           for record in event['Records']]
+        if self.bulk_url:
+            groups = [file_references[i:i + self.bulk_size] for i in range(0, len(file_references), self.bulk_size)]
+            send = self.post_bulk
+        else:
+            groups = [[file_reference] for file_reference in file_references]
+            send = self.post_single
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            failed = [reference for group in pool.map(send, groups) for reference in group]
+        print(f"Triggered processing in EKS for {len(file_references) - len(failed)} of {len(file_references)} files.")
+        if failed:
+            # Failing the invocation hands the whole event back to Lambda; references that did get through are
+            # sent again, which the processing service already has to accept because of the HTTP retries.
+            raise RuntimeError(f"Failed to trigger processing in EKS for {len(failed)} files: "
+                               f"{[reference['object_key'] for reference in failed]}")
+        return {"dispatched": len(file_references)}
+
+    def post_single(self, group):
+        return self.post(self.eks_processing_url, group[0], group)
+
+    def post_bulk(self, group):
+        return self.post(self.bulk_url, {"files": group}, group)
+
+    def post(self, url, body, group):
+        # Returns the references in group that did not get through.
+        try:
+            response = self.session.post(url, json=body, timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f"Failed to trigger processing in EKS. Error: {e}")
+            return group
+        if not response.ok:
+            print(f"Failed to trigger processing in EKS. Status code: {response.status_code}, "
+                  f"Response: {response.text}")
+            return group
+        return []
+
     def trigger_eks_processing(self, file_reference):
         headers = {
             "Authorization": f"Bearer {self.auth_token}",
             "Content-Type": "application/json"
         }
         response = requests.post(self.eks_processing_url, headers=headers, json=file_reference)
-        
+
         if response.status_code == 200:
             print("Successfully triggered processing in EKS.")
         else:
@@ -38,3 +109,4 @@ class LambdaToEKSFileProcessor:
 # Example usage:
 # processor = LambdaToEKSFileProcessor('https://your-eks-processing-url', 'your_auth_token')
 # processor.lambda_handler(event, context)
+# Batched: LambdaToEKSFileProcessor(url, token, batch_mode=True, bulk_url='https://your-eks-processing-url/bulk')
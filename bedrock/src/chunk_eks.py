@@ -1,6 +1,10 @@
 import psycopg2
 from opensearchpy import OpenSearch
 
+# bedrock/src/chunker.py is a symlink to the repository-root chunker.py; package bedrock/src with links followed
+from chunker import TokenChunker
+from columnar import read_records
+
 class MetadataProcessor:
     def __init__(self):
         self.db_connection = psycopg2.connect(host="your_rds_host", dbname="your_db_name",
@@ -17,10 +21,26 @@ class MetadataProcessor:
         self.db_connection.commit()
 
 class ChunkProcessor:
+    def __init__(self, chunker=None):
+        # Shared sentence/token-budget chunker (chunker.py at the repository root)
+        self.chunker = chunker or TokenChunker(max_tokens=512, overlap_tokens=32)
+
     def chunk_data(self, data):
-        # Implement your logic to chunk the data
-        chunks = []  # This is a placeholder
-        return chunks
+        # Accepts raw text or a {"text": ..., "source": ...} record; returns [{"id", "text"}]
+        if isinstance(data, str):
+            text, source = data, "chunk"
+        else:
+            text, source = data.get('text', ''), data.get('source', 'chunk')
+        return [{"id": chunk.id, "text": chunk.text} for chunk in self.chunker.chunk_text(text, source)]
+
+    def iter_record_chunks(self, path):
+        # Chunk each row of a file_2_json .parquet/.arrow output; only the three columns used are read.
+        table = read_records(path, ('source_file', 'row_index', 'text'))
+        for batch in table.to_batches():
+            sources, rows, texts = (batch.column(i).to_pylist() for i in range(3))
+            for source, row, text in zip(sources, rows, texts):
+                for chunk in self.chunker.chunk_text(text, f"{source}_{row}"):
+                    yield {"id": chunk.id, "text": chunk.text, "source_file": source, "row_index": row}
     
     def create_embeddings(self, chunks):
         embeddings = []
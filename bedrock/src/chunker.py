@@ -0,0 +1 @@
+../../chunker.py
\ No newline at end of file
@@ -0,0 +1,75 @@
+import json
+import math
+
+RECORD_COLUMNS = ('source_file', 'row_index', 'text')
+
+
+def record_schema():
+    # Stable schema of file_2_json's Parquet/Arrow output: one row per CSV row, XML record or image.
+    import pyarrow as pa
+    return pa.schema([
+        pa.field('source_file', pa.string(), nullable=False),
+        pa.field('row_index', pa.int64(), nullable=False),
+        pa.field('text', pa.string(), nullable=False),
+    ])
+
+
+def record_text(record):
+    # Flatten a parsed record (CSV row, XML element dict, image metadata) into one line of text.
+    if isinstance(record, dict):
+        return " ".join(filter(None, (record_text(value) for value in record.values())))
+    if record is None or (isinstance(record, float) and math.isnan(record)):
+        return ""
+    if isinstance(record, (list, tuple)):
+        return json.dumps(record)
+    return str(record).strip()
+
+
+class RecordWriter:
+    '''
+    Streams (source_file, row_index, text) rows into a Parquet file (zstd
+    compressed, one row group per write) or an uncompressed Arrow IPC file,
+    which readers can memory-map without copying.
+    '''
+    def __init__(self, path, source_file, output_format='parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.schema = record_schema()
+        self.source_file = source_file
+        self.rows = 0
+        if output_format == 'parquet':
+            self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+        elif output_format == 'arrow':
+            self.writer = pa.ipc.new_file(path, self.schema)
+        else:
+            raise ValueError(f"Unsupported columnar format: {output_format}")
+
+    def write(self, texts):
+        texts = list(texts)
+        pa = self.pa
+        batch = pa.record_batch([
+            pa.array([self.source_file] * len(texts), pa.string()),
+            pa.array(range(self.rows, self.rows + len(texts)), pa.int64()),
+            pa.array(texts, pa.string()),
+        ], schema=self.schema)
+        self.writer.write_batch(batch)
+        self.rows += len(texts)
+
+    def close(self):
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_records(path, columns=RECORD_COLUMNS):
+    # Memory-map a .parquet or .arrow file written by RecordWriter, reading only `columns`.
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    if path.endswith('.arrow'):
+        return pa.ipc.open_file(pa.memory_map(path)).read_all().select(list(columns))
+    return pq.read_table(path, columns=list(columns), memory_map=True)
@@ -1,13 +1,23 @@
 import boto3
 import os
 import json
+import multiprocessing
+import tempfile
+import threading
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 import xml.etree.ElementTree as ET
 import pandas as pd
+from boto3.s3.transfer import TransferConfig
 from PIL import Image
 
+from columnar import RecordWriter, record_text
+
 s3_client = boto3.client('s3')
 upload_bucket_name = 'your-target-bucket-name'
+SUPPORTED_TYPES = {'xml', 'csv', 'gif', 'jpeg'}
+OUTPUT_FORMATS = {'ndjson', 'parquet', 'arrow'}
 
 def process_files(directory):
     for filename in os.listdir(directory):
@@ -26,6 +36,124 @@ def process_files(directory):
             s3_client.put_object(Bucket=upload_bucket_name, Key=target_filename, Body=json.dumps(content, indent=4))
             print(f"Uploaded {target_filename} to S3 bucket {upload_bucket_name}.")
 
+def process_files_parallel(directory, bucket=None, max_workers=None, upload_workers=4, max_pending=8,
+                           chunk_rows=2000, part_size=8 * 1024 * 1024, s3=None, mp_context=None,
+                           output_format='ndjson'):
+    '''
+    Parallel version of process_files writing NDJSON (one record per line), or
+    with output_format='parquet' / 'arrow' columnar files of
+    (source_file, row_index, text) rows (columnar.record_schema).
+    Files are parsed in a process pool into spool files on local disk: CSVs
+    chunk_rows rows at a time, XML with iterparse, so no file is held in
+    memory whole. Spooled files are uploaded by `upload_workers` threads with
+    multipart uploads of `part_size` parts. At most `max_pending` files are
+    converted but not yet uploaded, which bounds spool disk use. Workers are
+    started with the "spawn" method unless `mp_context` says otherwise, since
+    forking copies the boto3 client and the upload threads' locks. Returns the
+    uploaded keys; if any file fails, raises RuntimeError naming every failed
+    file once the rest are done.
+    '''
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}")
+    bucket = bucket or upload_bucket_name
+    s3 = s3 or s3_client
+    transfer = TransferConfig(multipart_threshold=part_size, multipart_chunksize=part_size)
+    mp_context = mp_context or multiprocessing.get_context('spawn')
+    slots = threading.BoundedSemaphore(max_pending)
+    uploaded = []
+    failed = []
+
+    def upload(filename, future):
+        try:
+            spool_path, target_filename = future.result()
+            s3.upload_file(spool_path, bucket, target_filename, Config=transfer)
+            os.remove(spool_path)
+            uploaded.append(target_filename)
+            print(f"Uploaded {target_filename} to S3 bucket {bucket}.")
+        except Exception as e:
+            failed.append(filename)
+            print(f"Failed to convert or upload {filename} from {directory}. Error: {e}")
+        finally:
+            slots.release()
+
+    filenames = [filename for filename in sorted(os.listdir(directory))
+                 if os.path.isfile(os.path.join(directory, filename))
+                 and identify_data_type(filename) in SUPPORTED_TYPES]
+    with tempfile.TemporaryDirectory() as spool_dir:
+        # The upload pool is shut down last, after every conversion has handed over its file.
+        with ThreadPoolExecutor(max_workers=upload_workers) as uploader, \
+                ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as pool:
+            for filename in filenames:
+                slots.acquire()
+                future = pool.submit(convert_file, os.path.join(directory, filename), spool_dir, chunk_rows,
+                                     output_format)
+                future.add_done_callback(partial(uploader.submit, upload, filename))
+    if failed:
+        raise RuntimeError(f"Failed to convert or upload {len(failed)} files from {directory}: {sorted(failed)}")
+    return uploaded
+
+def convert_file(path, spool_dir, chunk_rows=2000, output_format='ndjson'):
+    # Runs in a worker process: write the file's records to a spool file in the output format.
+    filename = os.path.basename(path)
+    data_type = identify_data_type(filename)
+    timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+    target_filename = f"{filename}-{timestamp}.{output_format}"
+    spool_path = os.path.join(spool_dir, target_filename)
+    if output_format != 'ndjson':
+        with RecordWriter(spool_path, filename, output_format) as writer:
+            for texts in iter_text_batches(path, data_type, chunk_rows):
+                writer.write(texts)
+        return spool_path, target_filename
+    with open(spool_path, 'w', encoding='utf-8') as out:
+        if data_type == 'csv':
+            for chunk in pd.read_csv(path, chunksize=chunk_rows):
+                lines = chunk.to_json(orient='records', lines=True, force_ascii=False)
+                out.write(lines if lines.endswith('\n') else lines + '\n')
+        elif data_type == 'xml':
+            for record in iter_xml_records(path):
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        else:
+            out.write(json.dumps(process_image_file(path, filename)) + '\n')
+    return spool_path, target_filename
+
+def iter_text_batches(path, data_type, chunk_rows=2000):
+    # Lists of up to chunk_rows record texts (columnar.record_text) in file order.
+    if data_type == 'csv':
+        for chunk in pd.read_csv(path, chunksize=chunk_rows, dtype=str, keep_default_na=False):
+            texts = chunk.iloc[:, 0].str.strip()
+            for column in chunk.columns[1:]:
+                texts = texts + ' ' + chunk[column].str.strip()
+            yield texts.str.strip().tolist()
+    elif data_type == 'xml':
+        batch = []
+        for record in iter_xml_records(path):
+            batch.append(record_text(record))
+            if len(batch) == chunk_rows:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    else:
+        yield [record_text(process_image_file(path, os.path.basename(path)))]
+
+def iter_xml_records(path):
+    # One {tag: text} or {tag: {child_tag: child_text}} record per child of the root, cleared once read.
+    depth = 0
+    root = None
+    for event, element in ET.iterparse(path, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            if len(element):
+                yield {element.tag: {child.tag: child.text for child in element}}
+            else:
+                yield {element.tag: element.text}
+            root.clear()
+
 def identify_data_type(filename):
     extension = filename.split('.')[-1].lower()
     return extension
@@ -1,21 +1,109 @@
 import boto3
 import base64
+import gzip
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 class MSKToS3Handler:
-    def __init__(self, s3_bucket):
+    '''
+    Writes records from an MSK event source mapping to S3. By default each
+    record becomes its own object. With micro_batch=True, records are grouped
+    per topic and partition into gzip-compressed NDJSON objects of at most
+    `max_records` records or `max_bytes` uncompressed bytes, keyed by their
+    offset range so keys never collide and a redelivered batch overwrites the
+    same objects. Batches are uploaded by `upload_workers` threads.
+    '''
+    def __init__(self, s3_bucket, micro_batch=False, max_records=10000, max_bytes=16 * 1024 * 1024,
+                 upload_workers=8):
         self.s3_client = boto3.client('s3')
         self.s3_bucket = s3_bucket
+        self.micro_batch = micro_batch
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.upload_workers = upload_workers
 
     def lambda_handler(self, event, context):
-        for record in event['records']:
-            topic_arn = record['eventSourceARN']
-            topic_name = self.extract_topic_name(topic_arn)
+        if self.micro_batch:
+            return self.handle_batched(event)
+        for record in self.iter_records(event):
+            topic_name = record['topic']
             file_content = base64.b64decode(record['value'])  # Assuming the payload is base64 encoded
             file_name = self.generate_file_name(topic_name)
-            
+
             self.upload_to_s3(file_name, file_content, topic_name)
 
+    def iter_records(self, event):
+        # MSK events group records by "topic-partition"; each record carries its topic, partition and offset.
+        records = event['records']
+        if isinstance(records, dict):
+            for partition_records in records.values():
+                yield from partition_records
+        else:
+            for record in records:
+                yield dict(record, topic=record.get('topic') or self.extract_topic_name(record['eventSourceARN']))
+
+    def handle_batched(self, event):
+        start = time.perf_counter()
+        batches = list(self.iter_batches(event))
+        with ThreadPoolExecutor(max_workers=self.upload_workers) as pool:
+            results = list(pool.map(self.upload_batch, batches))
+        failed = [key for key, ok in results if not ok]
+        count = sum(len(lines) for _, lines in batches)
+        rate = count / max(time.perf_counter() - start, 1e-9)
+        print(f"Uploaded {count} records in {len(batches) - len(failed)} objects ({rate:.0f} records/s).")
+        if failed:
+            # Failing the invocation makes the event source mapping redeliver; keys are offset based, so
+            # objects that did upload are overwritten with the same content.
+            raise RuntimeError(f"Failed to upload {len(failed)} batches to S3: {failed}")
+        return {"records": count, "objects": len(batches), "records_per_second": rate}
+
+    def iter_batches(self, event):
+        # Yield (key, NDJSON lines) per size/count-bounded batch, in offset order within each partition.
+        groups = {}
+        for record in self.iter_records(event):
+            groups.setdefault((record['topic'], record['partition']), []).append(record)
+        for (topic, partition), records in groups.items():
+            records.sort(key=lambda record: record['offset'])
+            lines, size, first, last = [], 0, None, None
+            for record in records:
+                line = self.to_line(record)
+                if lines and (len(lines) >= self.max_records or size + len(line) > self.max_bytes):
+                    yield self.batch_key(topic, partition, first, last), lines
+                    lines, size = [], 0
+                if not lines:
+                    first = record['offset']
+                last = record['offset']
+                lines.append(line)
+                size += len(line)
+            if lines:
+                yield self.batch_key(topic, partition, first, last), lines
+
+    def batch_key(self, topic, partition, first_offset, last_offset):
+        # Offsets are unique within a topic-partition, so the range names the batch.
+        return f"{topic}/partition={partition}/{first_offset:020d}-{last_offset:020d}.ndjson.gz"
+
+    def to_line(self, record):
+        value = base64.b64decode(record['value']) if record.get('value') else b''
+        try:
+            value, encoding = value.decode('utf-8'), 'utf-8'
+        except UnicodeDecodeError:
+            value, encoding = record['value'], 'base64'
+        line = {"topic": record['topic'], "partition": record['partition'], "offset": record['offset'],
+                "timestamp": record.get('timestamp'), "value": value, "value_encoding": encoding}
+        return json.dumps(line, ensure_ascii=False).encode('utf-8') + b'\n'
+
+    def upload_batch(self, batch):
+        key, lines = batch
+        try:
+            self.s3_client.put_object(Bucket=self.s3_bucket, Key=key, Body=gzip.compress(b''.join(lines), 6),
+                                      ContentType='application/x-ndjson')
+            return key, True
+        except Exception as e:
+            print(f"Failed to upload {key} to S3. Error: {e}")
+            return key, False
+
     def extract_topic_name(self, topic_arn):
         # Extract the topic name from the ARN
         return topic_arn.split(':')[-1]
@@ -36,3 +124,4 @@ class MSKToS3Handler:
 # Example usage:
 # handler = MSKToS3Handler('your-s3-bucket-name')
 # handler.lambda_handler(event, context)
+# Batched: MSKToS3Handler('your-s3-bucket-name', micro_batch=True).lambda_handler(event, context)
@@ -0,0 +1,69 @@
+import argparse
+import time
+
+import numpy as np
+from faq_data import REPO_ROOT  # noqa: F401  (puts the repo root on sys.path)
+
+from ann_index import IVFPQIndex
+from local_index import LocalIndex
+
+
+def synthetic(count, dim, clusters, rng):
+    # Clustered vectors look more like real embeddings than uniform noise.
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    return (centers[rng.integers(0, clusters, count)] + 0.5 * rng.standard_normal((count, dim))).astype(np.float32)
+
+
+def ground_truth(index, queries, k):
+    # Exact top-k rows from the flat matrix.
+    normalized = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = normalized @ index.vectors[:len(index)].T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def run(index, queries, truth, k, **options):
+    start = time.perf_counter()
+    results = [index.query(vector=query, top_k=k, **options) for query in queries]
+    seconds = time.perf_counter() - start
+    hits = sum(len({index.rows[match.id] for match in result.matches} & set(expected.tolist()))
+               for result, expected in zip(results, truth))
+    return hits / truth.size, len(queries) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF-PQ recall@k vs queries/sec on synthetic vectors")
+    parser.add_argument("--scales", default="100000,1000000")
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--m", type=int, default=16)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for count in [int(scale) for scale in args.scales.split(",")]:
+        vectors = synthetic(count, args.dim, clusters=max(count // 500, 16), rng=rng)
+        queries = vectors[rng.choice(count, args.queries, replace=False)] + 0.1 * rng.standard_normal(
+            (args.queries, args.dim)).astype(np.float32)
+
+        index = LocalIndex(args.dim, ann=IVFPQIndex(args.dim, nlist=args.nlist, m=args.m))
+        start = time.perf_counter()
+        for offset in range(0, count, 100000):
+            index.upsert([(f"v{i}", vectors[i], {}) for i in range(offset, min(offset + 100000, count))])
+        print(f"\n{count:,} vectors x {args.dim} dims: built in {time.perf_counter() - start:.1f}s")
+
+        truth = ground_truth(index, queries, args.k)
+        ann, index.ann = index.ann, None
+        recall, qps = run(index, queries, truth, args.k)
+        print(f"  flat                      recall@{args.k} {recall:.3f}  {qps:9.1f} qps")
+        index.ann = ann
+
+        for nprobe in (4, 16, 64):
+            for refine_factor in (1, 10):
+                index.refine_factor = refine_factor
+                recall, qps = run(index, queries, truth, args.k, nprobe=nprobe)
+                print(f"  ivfpq nprobe={nprobe:<3} refine={refine_factor:<3} recall@{args.k} {recall:.3f}  {qps:9.1f} qps")
+
+
+if __name__ == "__main__":
+    main()
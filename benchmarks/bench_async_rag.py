@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import time
+
+import numpy as np
+from faq_data import load_faq_rows
+from stubs import FakeEmbedder, FakeIndex, FakeLLM
+
+from sage_query_processor import QueryProcessor
+
+PROMPT = "CONTEXT_TEXT:\n{context_text}\n\nQUESTION:\n{question_text}\n\nANSWER:\n"
+
+
+def report(name, seconds, latencies):
+    latencies = np.array(latencies) * 1000
+    print(f"{name:<24} {len(latencies) / seconds:8.1f} questions/sec   "
+          f"p50 {np.percentile(latencies, 50):8.1f} ms   p99 {np.percentile(latencies, 99):8.1f} ms")
+
+
+async def simulate_users(processor, questions, users):
+    # Each simulated user asks its share of the questions one after another.
+    latencies = []
+
+    async def user(asked):
+        for question in asked:
+            start = time.perf_counter()
+            await processor.arag_query(question)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(user(questions[i::users]) for i in range(users)))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blocking rag_query vs arag_query under concurrent users (stub backends)")
+    parser.add_argument("--users", default="1,8,32,64")
+    parser.add_argument("--questions", type=int, default=128)
+    parser.add_argument("--embed-latency", type=float, default=0.02)
+    parser.add_argument("--index-latency", type=float, default=0.03)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--llm-concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    rows = load_faq_rows()
+    questions = [rows[i % len(rows)][0] for i in range(args.questions)]
+    index = FakeIndex(latency=args.index_latency)
+    index.upsert([(f"faq_{i}", [], {"text": answer}) for i, (_, answer) in enumerate(rows[:5])])
+    processor = QueryProcessor(FakeLLM(args.llm_latency), index, PROMPT, FakeEmbedder(latency=args.embed_latency),
+                               llm_concurrency=args.llm_concurrency)
+
+    # One blocking worker handles a question at a time.
+    latencies = []
+    start = time.perf_counter()
+    for question in questions[:16]:
+        began = time.perf_counter()
+        processor.rag_query(question)
+        latencies.append(time.perf_counter() - began)
+    report("rag_query (sequential)", time.perf_counter() - start, latencies)
+
+    for users in [int(value) for value in args.users.split(",")]:
+        start = time.perf_counter()
+        latencies = asyncio.run(simulate_users(processor, questions, users))
+        report(f"arag_query ({users} users)", time.perf_counter() - start, latencies)
+
+    start = time.perf_counter()
+    asyncio.run(processor.arag_query_many(questions))
+    print(f"{'arag_query_many':<24} {len(questions) / (time.perf_counter() - start):8.1f} questions/sec")
+
+
+if __name__ == "__main__":
+    main()
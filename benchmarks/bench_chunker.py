@@ -0,0 +1,56 @@
+import argparse
+import time
+
+import numpy as np
+from faq_data import FAQ_CSV
+from transformers import AutoTokenizer
+
+from chunker import TokenChunker, hf_token_counter
+
+
+def blank_line_segments(file_path):
+    # The previous read_file_segments: whole file, split on blank lines only.
+    with open(file_path, 'r', encoding='utf-8') as file:
+        lines = file.readlines()
+    segments, segment = [], ""
+    for line in lines:
+        if line.strip():
+            segment += line.strip() + " "
+        elif segment:
+            segments.append(segment.strip())
+            segment = ""
+    if segment:
+        segments.append(segment.strip())
+    return segments
+
+
+def report(name, texts, seconds, count_tokens, budget):
+    tokens = np.array(count_tokens(texts))
+    print(f"{name:<22} {len(texts):6d} chunks  {len(texts) / seconds:10.1f} chunks/sec   "
+          f"tokens mean {tokens.mean():7.1f} max {tokens.max():6d}   over budget {int((tokens > budget).sum())}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blank-line segments vs token-aware chunks on the FAQ CSV")
+    parser.add_argument("--model", default="bert-large-uncased-whole-word-masking-finetuned-squad")
+    parser.add_argument("--file", default=FAQ_CSV)
+    parser.add_argument("--max-tokens", type=int, default=510)
+    parser.add_argument("--overlap", default="0,32,64")
+    args = parser.parse_args()
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    count_tokens = hf_token_counter(tokenizer)
+
+    start = time.perf_counter()
+    segments = blank_line_segments(args.file)
+    report("blank-line segments", segments, time.perf_counter() - start, count_tokens, args.max_tokens)
+
+    for overlap in [int(value) for value in args.overlap.split(",")]:
+        chunker = TokenChunker(count_tokens, max_tokens=args.max_tokens, overlap_tokens=overlap)
+        start = time.perf_counter()
+        chunks = [chunk.text for chunk in chunker.iter_file_chunks(args.file, "faq")]
+        report(f"chunker (overlap {overlap})", chunks, time.perf_counter() - start, count_tokens, args.max_tokens)
+
+
+if __name__ == "__main__":
+    main()
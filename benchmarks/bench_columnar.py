@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from faq_data import FAQ_CSV, REPO_ROOT
+
+sys.path.insert(0, os.path.join(REPO_ROOT, "bedrock", "src"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+
+def timed(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="file_2_json output formats: bytes written and read time")
+    parser.add_argument("--scale", type=int, default=1000, help="copies of the FAQ CSV")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    import file_2_json
+    from columnar import read_records
+
+    with tempfile.TemporaryDirectory() as directory:
+        with open(FAQ_CSV, "r", encoding="utf-8-sig") as file:
+            faq = file.read().rstrip("\n") + "\n"
+        csv_path = os.path.join(directory, "faqs.csv")
+        with open(csv_path, "w", encoding="utf-8") as file:
+            file.write(faq * args.scale)
+        print(f"input: {os.path.getsize(csv_path) / 1e6:.1f} MB CSV")
+
+        # Current path: the whole CSV as one indented JSON document.
+        start = time.perf_counter()
+        json_path = os.path.join(directory, "faqs.json")
+        with open(json_path, "w", encoding="utf-8") as file:
+            file.write(json.dumps(file_2_json.process_csv_file(csv_path), indent=4))
+        outputs = [("json (indent=4)", json_path, time.perf_counter() - start)]
+        for output_format in ("ndjson", "parquet", "arrow"):
+            start = time.perf_counter()
+            path, _ = file_2_json.convert_file(csv_path, directory, output_format=output_format)
+            outputs.append((output_format, path, time.perf_counter() - start))
+
+        def read_json(path):
+            with open(path, "r", encoding="utf-8") as file:
+                return [" ".join(str(value) for value in record.values()) for record in json.load(file)]
+
+        def read_ndjson(path):
+            with open(path, "r", encoding="utf-8") as file:
+                return [" ".join(str(value) for value in json.loads(line).values()) for line in file]
+
+        readers = {"json (indent=4)": read_json, "ndjson": read_ndjson}
+        for name, path, write_seconds in outputs:
+            if name in readers:
+                read_seconds, texts = timed(lambda: readers[name](path), args.repeat)
+                rows, projected = len(texts), "n/a"
+            else:
+                read_seconds, table = timed(lambda: read_records(path, ("text",)), args.repeat)
+                rows = table.num_rows
+                index_seconds, _ = timed(lambda: read_records(path, ("row_index",)), args.repeat)
+                projected = f"{index_seconds * 1000:7.1f} ms"
+            print(f"{name:<16} {os.path.getsize(path) / 1e6:8.1f} MB   write {write_seconds:6.2f} s   "
+                  f"read text {read_seconds * 1000:8.1f} ms   read row_index only {projected}   rows {rows}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import argparse
+import time
+
+from faq_data import REPO_ROOT  # noqa: F401  (puts the repo root on sys.path)
+from stubs import FakeIndex
+
+from upload_pipeline import batched, concurrent_upsert
+
+
+def make_vectors(count, dim):
+    values = [0.0] * dim
+    return [(f"faq_{i}", values, {"text": "", "type": "faq"}) for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequential vs concurrent upsert against a fake index")
+    parser.add_argument("--vectors", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument("--workers", default="1,4,8,16")
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.vectors, args.dim)
+
+    # Current behaviour: one batch of 100 at a time, no retry.
+    index = FakeIndex(latency=args.latency)
+    start = time.perf_counter()
+    for batch in batched(vectors, 100):
+        index.upsert(vectors=batch)
+    seconds = time.perf_counter() - start
+    print(f"sequential : {len(vectors) / seconds:10.1f} vectors/sec")
+
+    for workers in [int(w) for w in args.workers.split(",")]:
+        index = FakeIndex(latency=args.latency, failure_rate=args.failure_rate)
+        summary = concurrent_upsert(index, batched(vectors, 100), max_workers=workers, backoff=0.05)
+        print(f"workers={workers:<3}: {summary.vectors_per_sec:10.1f} vectors/sec, "
+              f"{index.calls} calls, {len(summary.failed_ids)} failed ids")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import time
+
+import numpy as np
+from faq_data import load_faq_rows
+from transformers import AutoTokenizer, AutoModel
+
+from chunker import hf_token_counter
+from context_builder import ContextBuilder
+from embedding_engine import BatchEmbeddingEngine
+from local_index import LocalIndex
+
+
+def char_capped_context(contexts, max_section_len=1000):
+    # The previous QueryProcessor.construct_context: stop at the first chunk past 1000 characters.
+    chosen_sections = []
+    chosen_sections_len = 0
+    for text in contexts:
+        text = text.strip()
+        chosen_sections_len += len(text) + 2
+        if chosen_sections_len > max_section_len:
+            break
+        chosen_sections.append(text)
+    return "\n".join(chosen_sections)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Context tokens, answer coverage and assembly time per strategy")
+    parser.add_argument("--model", default="bert-large-uncased-whole-word-masking-finetuned-squad")
+    parser.add_argument("--llm-tokenizer", default="gpt2-medium")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--budgets", default="256,512")
+    args = parser.parse_args()
+
+    rows = load_faq_rows()
+    engine = BatchEmbeddingEngine(AutoTokenizer.from_pretrained(args.model), AutoModel.from_pretrained(args.model))
+    count_tokens = hf_token_counter(AutoTokenizer.from_pretrained(args.llm_tokenizer))
+
+    # Every answer is indexed twice, the copy slightly edited, as re-ingested documents often are.
+    answers = [answer for _, answer in rows]
+    copies = [answer.replace("Amazon SageMaker", "SageMaker") + " " for answer in answers]
+    index = LocalIndex(engine.model.config.hidden_size)
+    index.upsert([(f"faq_{i}", vector, {"text": text, "row": i % len(rows)})
+                  for i, (vector, text) in enumerate(zip(engine.embed(answers + copies), answers + copies))])
+    responses = index.query_many(engine.embed([question for question, _ in rows]), top_k=args.top_k,
+                                 include_metadata=True)
+    retrieved = [([match.metadata["text"] for match in response.matches], [match.score for match in response.matches])
+                 for response in responses]
+
+    strategies = [("1000-char cap", lambda contexts, scores: char_capped_context(contexts))]
+    for budget in [int(value) for value in args.budgets.split(",")]:
+        greedy = ContextBuilder(count_tokens, max_tokens=budget)
+        mmr = ContextBuilder(count_tokens, max_tokens=budget, mmr_lambda=0.7)
+        strategies.append((f"greedy {budget} tokens", greedy.build))
+        strategies.append((f"mmr {budget} tokens", mmr.build))
+
+    for name, build in strategies:
+        start = time.perf_counter()
+        contexts = [build(texts, scores) for texts, scores in retrieved]
+        seconds = time.perf_counter() - start
+        tokens = np.array(count_tokens(contexts))
+        # Answer coverage: the context contains (either copy of) the question's own FAQ answer.
+        covered = np.mean([answers[i] in context or copies[i].strip() in context for i, context in enumerate(contexts)])
+        print(f"{name:<20} context tokens mean {tokens.mean():6.1f} max {tokens.max():5d}   "
+              f"answer covered {covered:.2f}   {1e6 * seconds / len(contexts):8.1f} us/assembly")
+
+
+if __name__ == "__main__":
+    main()
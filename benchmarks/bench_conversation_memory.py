@@ -0,0 +1,87 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from faq_data import load_faq_rows
+from stubs import FakeEmbedder, FakeLLM
+
+from chunker import approximate_token_counter
+from conversation_memory import ConversationMemory, SQLiteConversationStore
+from local_index import LocalIndex
+from sage_query_processor import QueryProcessor
+
+PROMPT = "HISTORY:\n{history_text}\n\nCONTEXT_TEXT:\n{context_text}\n\nQUESTION:\n{question_text}\n\nANSWER:\n"
+
+
+class FullHistoryMemory:
+    '''
+    The previous flow (README, ConversationBufferMemory): every turn reads the
+    whole conversation from the store and writes the new turn straight back.
+    '''
+    def __init__(self, store):
+        self.store = store
+        self.turns = {}
+
+    def history(self, session_id):
+        _, _, turns = self.store.load(session_id, 1 << 30)
+        return "\n".join(f"User: {question}\nAssistant: {answer}" for _, question, answer in turns)
+
+    def add_turn(self, session_id, question, answer):
+        turn = self.turns[session_id] = self.turns.get(session_id, -1) + 1
+        self.store.write_batch([(session_id, turn, question, answer)], [])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-turn RAG latency and prompt size against conversation length")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--window", type=int, default=4)
+    parser.add_argument("--report", default="1,10,50,100,200")
+    args = parser.parse_args()
+
+    rows = load_faq_rows()
+    embedder = FakeEmbedder(64, latency=0)
+    index = LocalIndex(64)
+    index.upsert([(f"faq_{i}", vector, {"text": answer})
+                  for i, (vector, (_, answer)) in enumerate(zip(embedder.embed_docs([a for _, a in rows]), rows))])
+    report = {int(value) for value in args.report.split(",")}
+
+    with tempfile.TemporaryDirectory() as directory:
+        memories = [
+            ("full history", FullHistoryMemory(SQLiteConversationStore(os.path.join(directory, "full.sqlite3")))),
+            ("windowed + summary", ConversationMemory(SQLiteConversationStore(os.path.join(directory, "mem.sqlite3")),
+                                                      window=args.window)),
+        ]
+        for name, memory in memories:
+            llm = FakeLLM(latency=0)
+            processor = QueryProcessor(llm, index, PROMPT, embedder, memory=memory)
+            prompt_tokens = []
+            original = processor.build_prompt
+
+            def build_prompt(question_text, res, history=""):
+                prompt = original(question_text, res, history)
+                prompt_tokens.append(approximate_token_counter([prompt])[0])
+                return prompt
+            processor.build_prompt = build_prompt
+
+            # Sessions advance in lockstep, so every sample at turn n comes from sessions n turns long.
+            print(name)
+            for turn in range(1, args.turns + 1):
+                timings = []
+                for session in range(args.sessions):
+                    question = rows[(session * 31 + turn) % len(rows)][0]
+                    start = time.perf_counter()
+                    processor.rag_query(question, session_id=f"session-{session}")
+                    timings.append(time.perf_counter() - start)
+                if turn in report:
+                    tokens = prompt_tokens[-args.sessions:]
+                    print(f"  turn {turn:>4}   per-turn p50 {np.percentile(timings, 50) * 1000:7.3f} ms   "
+                          f"prompt ~{int(np.mean(tokens)):>6} tokens")
+            if hasattr(memory, "flush"):
+                memory.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from faq_data import REPO_ROOT
+
+sys.path.insert(0, os.path.join(REPO_ROOT, "bedrock", "src"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+
+class EKSStub(BaseHTTPRequestHandler):
+    '''
+    Stand-in for the EKS processing service: POST /process takes one file
+    reference, POST /process/bulk {"files": [...]}. Each request takes
+    `latency` seconds plus a small per-file cost, and fails with 503 at
+    `failure_rate`. Counts requests, accepted files and TCP connections.
+    '''
+    protocol_version = "HTTP/1.1"
+    latency = 0.02
+    per_file = 0.0005
+    failure_rate = 0.0
+    lock = threading.Lock()
+    stats = {"connections": 0, "requests": 0, "files": 0}
+    rng = random.Random(0)
+
+    def setup(self):
+        super().setup()
+        with self.lock:
+            self.stats["connections"] += 1
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        files = body["files"] if self.path.endswith("/bulk") else [body]
+        time.sleep(self.latency + self.per_file * len(files))
+        with self.lock:
+            self.stats["requests"] += 1
+            failed = self.rng.random() < self.failure_rate
+            if not failed:
+                self.stats["files"] += len(files)
+        self.send_response(503 if failed else 200)
+        payload = b'{"status": "unavailable"}' if failed else b'{"status": "accepted"}'
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_event(records):
+    return {"Records": [{"eventSource": "aws:s3", "eventName": "ObjectCreated:Put",
+                         "s3": {"bucket": {"name": "bench-bucket"}, "object": {"key": f"uploads/file_{i}.csv"}}}
+                        for i in range(records)]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LambdaToEKSFileProcessor: per-record POSTs vs batched dispatch")
+    parser.add_argument("--records", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="stub seconds per request")
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="share of stub requests answered 503")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--bulk-size", type=int, default=50)
+    args = parser.parse_args()
+
+    from chunk_app import LambdaToEKSFileProcessor
+    EKSStub.latency = args.latency
+    EKSStub.failure_rate = args.failure_rate
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EKSStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/process"
+
+    event = make_event(args.records)
+    modes = [
+        ("per record", LambdaToEKSFileProcessor(url, "token")),
+        ("concurrent", LambdaToEKSFileProcessor(url, "token", batch_mode=True, max_concurrency=args.concurrency,
+                                                backoff_factor=0.05)),
+        ("bulk", LambdaToEKSFileProcessor(url, "token", batch_mode=True, bulk_url=f"{url}/bulk",
+                                          bulk_size=args.bulk_size, max_concurrency=args.concurrency,
+                                          backoff_factor=0.05)),
+    ]
+    for name, processor in modes:
+        EKSStub.stats.update(connections=0, requests=0, files=0)
+        # Batched modes raise when files stay undelivered, so Lambda would retry the event.
+        outcome = "ok"
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            try:
+                processor.lambda_handler(event, None)
+            except RuntimeError:
+                outcome = "retried"
+            seconds = time.perf_counter() - start
+        stats = EKSStub.stats
+        lost = args.records - stats["files"]
+        print(f"{name:<11} {seconds * 1000:8.1f} ms   {args.records / seconds:7.0f} files/s   "
+              f"{stats['requests']:>4} requests   {stats['connections']:>4} connections   "
+              f"{lost:>3} not accepted   invocation {outcome}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import argparse
+import time
+from types import SimpleNamespace
+
+from faq_data import load_faq_texts
+from transformers import AutoTokenizer, AutoModel
+
+from embedding_engine import BatchEmbeddingEngine
+from uploader import EmbeddingUploader
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Segments/sec: one-at-a-time loop vs batched engine")
+    parser.add_argument("--model", default="bert-large-uncased-whole-word-masking-finetuned-squad")
+    parser.add_argument("--limit", type=int, default=64)
+    parser.add_argument("--batch-sizes", default="8,16,32")
+    args = parser.parse_args()
+
+    texts = load_faq_texts()[:args.limit]
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    model = AutoModel.from_pretrained(args.model)
+
+    # Current path: EmbeddingUploader.generate_embedding called once per segment.
+    holder = SimpleNamespace(tokenizer=tokenizer, model=model)
+    start = time.perf_counter()
+    for text in texts:
+        EmbeddingUploader.generate_embedding(holder, text)
+    loop_seconds = time.perf_counter() - start
+    print(f"one-at-a-time: {len(texts) / loop_seconds:8.2f} segments/sec")
+
+    engine = BatchEmbeddingEngine(tokenizer, model)
+    for batch_size in [int(size) for size in args.batch_sizes.split(",")]:
+        start = time.perf_counter()
+        engine.embed(texts, batch_size=batch_size)
+        seconds = time.perf_counter() - start
+        print(f"batched ({batch_size:3d}): {len(texts) / seconds:8.2f} segments/sec "
+              f"({loop_seconds / seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
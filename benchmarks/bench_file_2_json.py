@@ -0,0 +1,104 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from xml.sax.saxutils import escape
+
+from faq_data import FAQ_CSV, REPO_ROOT, load_faq_rows
+
+BEDROCK_SRC = os.path.join(REPO_ROOT, "bedrock", "src")
+BUCKET = "bench-file-2-json"
+
+
+def make_dataset(directory, csv_files, csv_scale, xml_files, xml_records, images):
+    # FAQ CSVs repeated csv_scale times, flat XML documents and a few small JPEGs.
+    with open(FAQ_CSV, "r", encoding="utf-8-sig") as file:
+        faq = file.read().rstrip("\n") + "\n"
+    for i in range(csv_files):
+        with open(os.path.join(directory, f"faq_{i}.csv"), "w", encoding="utf-8") as file:
+            file.write(faq * csv_scale)
+    rows = load_faq_rows()
+    for i in range(xml_files):
+        with open(os.path.join(directory, f"faq_{i}.xml"), "w", encoding="utf-8") as file:
+            file.write("<faqs>\n")
+            for j in range(xml_records):
+                question, answer = rows[j % len(rows)]
+                file.write(f"<faq><question>{escape(question)}</question><answer>{escape(answer)}</answer></faq>\n")
+            file.write("</faqs>\n")
+    from PIL import Image
+    for i in range(images):
+        Image.new("RGB", (640, 480), (i * 40 % 256, 90, 160)).save(os.path.join(directory, f"image_{i}.jpeg"))
+
+
+def run_mode(mode, directory, endpoint_url, args, results):
+    # Runs in a fresh process so ru_maxrss is this mode's own peak; objects are held by the moto server.
+    import boto3
+    sys.path.insert(0, BEDROCK_SRC)
+    import file_2_json
+
+    s3 = boto3.client("s3", endpoint_url=endpoint_url)
+    bucket = f"{BUCKET}-{mode}"
+    s3.create_bucket(Bucket=bucket)
+    file_2_json.s3_client = s3
+    file_2_json.upload_bucket_name = bucket
+    files = len(os.listdir(directory))
+    start = time.perf_counter()
+    if mode == "sequential":
+        file_2_json.process_files(directory)
+    else:
+        file_2_json.process_files_parallel(directory, bucket, max_workers=args.workers,
+                                           upload_workers=args.upload_workers, chunk_rows=args.chunk_rows)
+    seconds = time.perf_counter() - start
+    stored = sum(item["Size"] for item in s3.list_objects_v2(Bucket=bucket)["Contents"])
+    results.put((mode, files / seconds, seconds, stored,
+                 resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                 resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="file_2_json: sequential vs parallel NDJSON conversion into a local moto S3 server")
+    parser.add_argument("--csv-files", type=int, default=8)
+    parser.add_argument("--csv-scale", type=int, default=200, help="copies of the FAQ CSV per file")
+    parser.add_argument("--xml-files", type=int, default=4)
+    parser.add_argument("--xml-records", type=int, default=50000)
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--upload-workers", type=int, default=4)
+    parser.add_argument("--chunk-rows", type=int, default=2000)
+    parser.add_argument("--port", type=int, default=5055, help="port for the local moto S3 server")
+    args = parser.parse_args()
+
+    for name, value in [("AWS_DEFAULT_REGION", "us-east-1"), ("AWS_ACCESS_KEY_ID", "testing"),
+                        ("AWS_SECRET_ACCESS_KEY", "testing")]:
+        os.environ.setdefault(name, value)
+    from moto.server import ThreadedMotoServer
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(port=args.port, verbose=False)
+    server.start()
+    endpoint_url = f"http://127.0.0.1:{args.port}"
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        make_dataset(directory, args.csv_files, args.csv_scale, args.xml_files, args.xml_records, args.images)
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        print(f"{len(os.listdir(directory))} files, {size / 1e6:.1f} MB")
+        for mode in ("sequential", "parallel"):
+            results = context.Queue()
+            process = context.Process(target=run_mode, args=(mode, directory, endpoint_url, args, results))
+            process.start()
+            process.join()
+            if process.exitcode:
+                print(f"{mode:<11} failed with exit code {process.exitcode}")
+                continue
+            mode, files_per_second, seconds, stored, rss, child_rss = results.get()
+            print(f"{mode:<11} {files_per_second:6.2f} files/s   {seconds:6.2f} s   {stored / 1e6:7.1f} MB stored")
+            print(f"{'':<11} peak RSS {rss:6.0f} MB, largest worker {child_rss:5.0f} MB")
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
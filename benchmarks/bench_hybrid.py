@@ -0,0 +1,61 @@
+import argparse
+import time
+
+import numpy as np
+from faq_data import load_faq_rows
+from transformers import AutoTokenizer, AutoModel
+
+from embedding_engine import BatchEmbeddingEngine
+from hybrid_search import BM25Index, HybridRetriever
+from local_index import QueryResponse, LocalIndex
+
+
+def substring_filtered(index, vector, text, top_k):
+    # The previous query.py behaviour: keep top-3 vector matches mentioning "What is" or "How".
+    matches = index.query(vector=vector, top_k=3, include_metadata=True)["matches"]
+    kept = [match for match in matches if "What is" in match["metadata"]["text"] or "How" in match["metadata"]["text"]]
+    return QueryResponse(matches=kept or matches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector vs BM25 vs hybrid (RRF) retrieval on the SageMaker FAQ")
+    parser.add_argument("--model", default="bert-large-uncased-whole-word-masking-finetuned-squad")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    args = parser.parse_args()
+
+    # Answers are the indexed chunks; each FAQ question should retrieve its own answer.
+    rows = load_faq_rows()
+    engine = BatchEmbeddingEngine(AutoTokenizer.from_pretrained(args.model), AutoModel.from_pretrained(args.model))
+    index = LocalIndex(engine.model.config.hidden_size)
+    index.upsert([(f"faq_{i}", vector, {"text": answer})
+                  for i, (vector, (_, answer)) in enumerate(zip(engine.embed([a for _, a in rows]), rows))])
+    start = time.perf_counter()
+    bm25 = BM25Index.from_local_index(index)
+    bm25.search("warm up")
+    print(f"BM25 build: {(time.perf_counter() - start) * 1000:.1f} ms for {len(bm25)} chunks")
+
+    questions = [question for question, _ in rows]
+    vectors = engine.embed(questions)
+    hybrid = HybridRetriever(index, bm25, vector_k=args.fetch_k, lexical_k=args.fetch_k)
+    strategies = [
+        ("vector", lambda vector, text: index.query(vector=vector, top_k=args.top_k, include_metadata=True)),
+        ("substring filter", lambda vector, text: substring_filtered(index, vector, text, args.top_k)),
+        ("bm25", lambda vector, text: QueryResponse(matches=[{"id": vector_id} for vector_id, _, _ in
+                                                             bm25.search(text, args.top_k)])),
+        ("hybrid (rrf)", lambda vector, text: hybrid.query(vector, text, top_k=args.top_k)),
+    ]
+    for name, retrieve in strategies:
+        hits, timings = 0, []
+        for i, (vector, text) in enumerate(zip(vectors, questions)):
+            start = time.perf_counter()
+            response = retrieve(vector, text)
+            timings.append(time.perf_counter() - start)
+            hits += f"faq_{i}" in [match["id"] for match in response["matches"]]
+        timings = np.array(timings) * 1000
+        print(f"{name:<18} recall@{args.top_k} {hits / len(questions):.3f}   "
+              f"p50 {np.percentile(timings, 50):6.3f} ms   p99 {np.percentile(timings, 99):6.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
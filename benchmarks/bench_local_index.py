@@ -0,0 +1,48 @@
+import argparse
+import time
+
+import numpy as np
+from faq_data import REPO_ROOT  # noqa: F401  (puts the repo root on sys.path)
+from stubs import FakeIndex
+
+from local_index import LocalIndex
+
+
+def latencies(index, queries, top_k):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.query(vector=query, top_k=top_k, include_metadata=True)
+        timings.append(time.perf_counter() - start)
+    return np.array(timings) * 1000
+
+
+def report(name, timings):
+    print(f"{name:<14} p50 {np.percentile(timings, 50):8.3f} ms   p99 {np.percentile(timings, 99):8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local index vs stubbed remote index query latency")
+    parser.add_argument("--vectors", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--remote-latency", type=float, default=0.03)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.vectors, args.dim)).astype(np.float32)
+    queries = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    records = [(f"faq_{i}", vector, {"text": f"segment {i}"}) for i, vector in enumerate(vectors)]
+
+    local = LocalIndex(args.dim)
+    local.upsert(records)
+    report("local", latencies(local, queries, args.top_k))
+
+    remote = FakeIndex(latency=args.remote_latency)
+    remote.upsert(records[:args.top_k])
+    report("remote (stub)", latencies(remote, queries[:50], args.top_k))
+
+
+if __name__ == "__main__":
+    main()
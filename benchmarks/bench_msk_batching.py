@@ -0,0 +1,89 @@
+import argparse
+import base64
+import contextlib
+import gzip
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+from faq_data import REPO_ROOT, load_faq_texts
+
+sys.path.insert(0, os.path.join(REPO_ROOT, "bedrock", "src"))
+for name, value in [("AWS_DEFAULT_REGION", "us-east-1"), ("AWS_ACCESS_KEY_ID", "testing"),
+                    ("AWS_SECRET_ACCESS_KEY", "testing")]:
+    os.environ.setdefault(name, value)
+BUCKET = "bench-msk-batching"
+
+
+def make_event(topics, partitions, records, seed=0):
+    # Synthetic MSK event: records grouped under "topic-partition" keys, base64 values, increasing offsets.
+    rng = random.Random(seed)
+    texts = load_faq_texts()
+    now = int(time.time() * 1000)
+    grouped = {}
+    for i in range(records):
+        topic, partition = f"topic{rng.randrange(topics)}", rng.randrange(partitions)
+        batch = grouped.setdefault(f"{topic}-{partition}", [])
+        value = json.dumps({"id": i, "text": texts[i % len(texts)]}).encode("utf-8")
+        batch.append({"topic": topic, "partition": partition, "offset": 1000 + len(batch), "timestamp": now + i,
+                      "timestampType": "CREATE_TIME", "key": None, "headers": [],
+                      "value": base64.b64encode(value).decode("ascii")})
+    return {"eventSource": "aws:kafka", "eventSourceArn": "arn:aws:kafka:us-east-1:123456789012:cluster/bench/1",
+            "bootstrapServers": "b-1.bench:9092", "records": grouped}
+
+
+def count_stored(s3, bucket):
+    # Per-record objects hold one record; batches one NDJSON line per record.
+    objects = records = 0
+    for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket):
+        for item in page.get("Contents", []):
+            objects += 1
+            if item["Key"].endswith(".gz"):
+                records += gzip.decompress(s3.get_object(Bucket=bucket, Key=item["Key"])["Body"].read()).count(b"\n")
+            else:
+                records += 1
+    return objects, records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MSKToS3Handler: one object per record vs micro-batched NDJSON")
+    parser.add_argument("--topics", type=int, default=2)
+    parser.add_argument("--partitions", type=int, default=4)
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--max-records", type=int, default=1000)
+    parser.add_argument("--upload-workers", type=int, default=8)
+    parser.add_argument("--port", type=int, default=5056, help="port for the local moto S3 server")
+    args = parser.parse_args()
+
+    import boto3
+    from moto.server import ThreadedMotoServer
+    from msk_to_s3 import MSKToS3Handler
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(port=args.port, verbose=False)
+    server.start()
+    s3 = boto3.client("s3", endpoint_url=f"http://127.0.0.1:{args.port}")
+
+    event = make_event(args.topics, args.partitions, args.records)
+    modes = [
+        ("per record", MSKToS3Handler(f"{BUCKET}-single")),
+        ("micro-batch", MSKToS3Handler(f"{BUCKET}-batched", micro_batch=True, max_records=args.max_records,
+                                       upload_workers=args.upload_workers)),
+    ]
+    for name, handler in modes:
+        handler.s3_client = s3
+        s3.create_bucket(Bucket=handler.s3_bucket)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            handler.lambda_handler(event, None)
+            seconds = time.perf_counter() - start
+        objects, stored = count_stored(s3, handler.s3_bucket)
+        print(f"{name:<12} {args.records / seconds:9.0f} records/s   {objects:>5} objects   "
+              f"{stored:>6} of {args.records} records in S3")
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import argparse
+import time
+
+from faq_data import load_faq_texts
+from openai import OpenAI
+from stubs import MockEmbeddingsServer, fake_embedding
+
+from openai_batch_embedder import OpenAIBatchEmbedder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="One request per segment vs packed, concurrent batches")
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--max-batch-tokens", type=int, default=8000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    texts = load_faq_texts()
+    with MockEmbeddingsServer(dim=args.dim, latency=args.latency) as server:
+        client = OpenAI(api_key="test", base_url=server.base_url, max_retries=0)
+
+        # Current behaviour of uploader_openai.generate_embedding: input=[text] per call.
+        start = time.perf_counter()
+        for text in texts:
+            client.embeddings.create(input=[text], model="text-embedding-ada-002")
+        seconds = time.perf_counter() - start
+        print(f"one-per-request: {server.requests:4d} requests, {seconds:6.2f}s")
+
+        server.requests = 0
+        embedder = OpenAIBatchEmbedder(client, max_batch_tokens=args.max_batch_tokens,
+                                       max_concurrency=args.concurrency)
+        start = time.perf_counter()
+        embeddings = embedder.embed(texts)
+        seconds = time.perf_counter() - start
+        print(f"batched        : {server.requests:4d} requests, {seconds:6.2f}s, "
+              f"peak concurrency {server.max_concurrent}")
+
+        expected = fake_embedding(texts[-1], args.dim)
+        assert abs(embeddings[-1][0] - expected[0]) < 1e-5, "results were not mapped back by index"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import argparse
+
+import numpy as np
+from faq_data import load_faq_rows
+from transformers import AutoTokenizer, AutoModel
+
+from embedding_engine import BatchEmbeddingEngine
+from local_index import LocalIndex
+from quantization import DTYPES
+
+
+def top_ids(index, queries, top_k):
+    return [{match.id for match in response.matches} for response in index.query_many(queries, top_k=top_k)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs memory of float16 and int8 vector storage")
+    parser.add_argument("--model", default="bert-large-uncased-whole-word-masking-finetuned-squad")
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = load_faq_rows()
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    model = AutoModel.from_pretrained(args.model)
+    engine = BatchEmbeddingEngine(tokenizer, model, max_length=512)
+    # Index the answers and use the questions as queries.
+    answers = engine.embed([answer for _, answer in rows])
+    questions = engine.embed([question for question, _ in rows])
+    records = [(f"faq_{i}", vector) for i, vector in enumerate(answers)]
+
+    baseline = None
+    print(f"{len(records)} vectors, dim {answers.shape[1]}, recall@{args.top_k} against float32")
+    for dtype in DTYPES:
+        index = LocalIndex(answers.shape[1], dtype=dtype)
+        index.upsert(records)
+        found = top_ids(index, questions, args.top_k)
+        baseline = baseline or found
+        recall = np.mean([len(a & b) / len(b) for a, b in zip(found, baseline)])
+
+        # Upserts still carry float32 values (Pinecone takes nothing else); only the stored copy shrinks.
+        stored = index.vectors[:len(index)].nbytes + index.scales[:len(index)].nbytes
+        print(f"{dtype:<8} recall {recall:.3f}   memory {stored / 1024:8.1f} KiB ({stored / len(index):6.0f} B/vector)")
+
+
+if __name__ == "__main__":
+    main()
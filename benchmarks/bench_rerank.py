@@ -0,0 +1,74 @@
+import argparse
+import time
+
+import numpy as np
+from faq_data import load_faq_rows
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+from local_index import QueryMatch, QueryResponse
+from reranker import CrossEncoderReranker
+
+
+def candidates(rows, i, top_k):
+    # The question's own answer first, followed by the next answers in the file, as an over-fetched result.
+    answers = [rows[(i + j) % len(rows)][1] for j in range(top_k)]
+    return QueryResponse(matches=[QueryMatch(id=f"faq_{(i + j) % len(rows)}", score=1.0 - j / top_k,
+                                             metadata={"text": text}) for j, text in enumerate(answers)])
+
+
+def per_pair(reranker, question, response, top_k):
+    # Baseline: one forward pass per (question, chunk) pair, no cache.
+    scores = []
+    for match in response.matches:
+        reranker.cache.clear()
+        scores.append((reranker.score(question, [match.metadata["text"]])[0], match.id))
+    return sorted(scores, reverse=True)[:top_k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-encoder rerank latency per query on CPU")
+    parser.add_argument("--model", default="cross-encoder/ms-marco-MiniLM-L-6-v2")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--keep", type=int, default=5, help="matches kept after reranking")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--early-stop-gap", type=float, default=2.0)
+    parser.add_argument("--max-length", type=int, default=256)
+    args = parser.parse_args()
+
+    rows = load_faq_rows()
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    model = AutoModelForSequenceClassification.from_pretrained(args.model)
+    questions = [question for question, _ in rows[:args.queries]]
+
+    for fetch_k in (20, 50, 100):
+        responses = [candidates(rows, i, fetch_k) for i in range(len(questions))]
+        modes = [
+            ("per pair", CrossEncoderReranker(tokenizer, model, max_length=args.max_length), per_pair),
+            ("one batch", CrossEncoderReranker(tokenizer, model, batch_size=fetch_k, max_length=args.max_length,
+                                               cache_size=0), None),
+            ("batched + early stop", CrossEncoderReranker(tokenizer, model, batch_size=args.batch_size,
+                                                          max_length=args.max_length,
+                                                          early_stop_gap=args.early_stop_gap, cache_size=0), None),
+            ("cached repeat", CrossEncoderReranker(tokenizer, model, batch_size=fetch_k,
+                                                   max_length=args.max_length), None),
+        ]
+        for name, reranker, run in modes:
+            if name == "cached repeat":
+                for question, response in zip(questions, responses):
+                    reranker.rerank(question, response, args.keep)
+            reranker.pairs_scored = 0
+            timings = []
+            for question, response in zip(questions, responses):
+                start = time.perf_counter()
+                if run is not None:
+                    run(reranker, question, response, args.keep)
+                else:
+                    reranker.rerank(question, response, args.keep)
+                timings.append(time.perf_counter() - start)
+            timings = np.array(timings) * 1000
+            print(f"top_k {fetch_k:>3}  {name:<21} p50 {np.percentile(timings, 50):8.2f} ms   "
+                  f"p99 {np.percentile(timings, 99):8.2f} ms   pairs scored/query {reranker.pairs_scored / len(questions):6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+import time
+
+import numpy as np
+from faq_data import load_faq_texts
+from stubs import FakePredictor
+
+from sage_embeed_creator import EmbeddingCreator, EmbeddingFailure
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-document vs batched SageMaker embedding calls (stub predictor)")
+    parser.add_argument("--model", default="bert-base-uncased")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--throttle-rate", type=float, default=0.1)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-payload-bytes", type=int, default=64 * 1024)
+    args = parser.parse_args()
+
+    docs = load_faq_texts()
+
+    serial = FakePredictor(latency=args.latency)
+    creator = EmbeddingCreator(serial, args.model)
+    start = time.perf_counter()
+    expected = creator.embed_docs(docs)
+    seconds = time.perf_counter() - start
+    print(f"per-document: {len(docs) / seconds:8.1f} docs/sec   {serial.calls} calls")
+
+    batched = FakePredictor(latency=args.latency, throttle_rate=args.throttle_rate)
+    creator = EmbeddingCreator(batched, args.model, batch_size=args.batch_size, max_concurrency=args.concurrency,
+                               max_payload_bytes=args.max_payload_bytes)
+    start = time.perf_counter()
+    results = creator.embed_docs_batched(docs)
+    seconds = time.perf_counter() - start
+    failures = sum(isinstance(result, EmbeddingFailure) for result in results)
+    print(f"batched:      {len(docs) / seconds:8.1f} docs/sec   {batched.calls} calls "
+          f"({batched.throttled} throttled)   {failures} failures")
+
+    # Every position must hold the embedding of the document at that position.
+    aligned = all(np.allclose(result, reference, atol=1e-4)
+                  for result, reference in zip(results, expected) if not isinstance(result, EmbeddingFailure))
+    print(f"aligned with per-document results: {aligned}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import argparse
+import time
+
+from faq_data import load_faq_texts
+from stubs import FakePredictor
+
+from sage_embeed_creator import EmbeddingCreator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON vs npy payloads (and server-side pooling) for SageMaker embedding")
+    parser.add_argument("--model", default="bert-base-uncased")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    docs = load_faq_texts()
+    modes = [("json", False), ("json", True), ("npy", False), ("npy", True)]
+    for payload_format, pooling in modes:
+        predictor = FakePredictor(dim=args.dim, latency=0.0, pooling=pooling, max_payload_bytes=1 << 40)
+        creator = EmbeddingCreator(predictor, args.model, batch_size=args.batch_size, max_concurrency=1,
+                                   max_payload_bytes=1 << 40, payload_format=payload_format)
+        start = time.perf_counter()
+        creator.embed_docs_batched(docs)
+        seconds = time.perf_counter() - start
+        # No endpoint latency, so the time is all tokenising, encoding, decoding and pooling.
+        name = f"{payload_format}{' + server pooling' if pooling else ''}"
+        print(f"{name:<22} request {predictor.request_bytes / len(docs):9.0f} B/doc   "
+              f"response {predictor.response_bytes / len(docs):11.0f} B/doc   {seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import random
+import time
+
+from faq_data import load_faq_rows
+from stubs import FakeLLM
+from transformers import AutoTokenizer, AutoModel
+
+from embedding_engine import BatchEmbeddingEngine
+from local_index import LocalIndex
+from sage_query_processor import QueryProcessor
+from semantic_cache import SemanticCache
+
+PROMPT = "CONTEXT_TEXT:\n{context_text}\n\nQUESTION:\n{question_text}\n\nANSWER:\n"
+PHRASINGS = ["{q}", "{q_lower}", "Can you tell me: {q}", "{q_bare}", "Quick question - {q_lower}", "{q_bare} please"]
+
+
+class EngineEmbedder:
+    # embed_docs adapter around the local BERT engine, standing in for EmbeddingCreator.
+    def __init__(self, engine):
+        self.engine = engine
+
+    def embed_docs(self, docs):
+        return self.engine.embed(docs).tolist()
+
+
+def rephrase(question, rng):
+    bare = question.rstrip("?").strip()
+    return rng.choice(PHRASINGS).format(q=question, q_lower=question.lower(), q_bare=bare)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Semantic answer cache hit rate and latency on rephrased FAQ questions")
+    parser.add_argument("--model", default="bert-large-uncased-whole-word-masking-finetuned-squad")
+    parser.add_argument("--questions", type=int, default=40, help="distinct FAQ questions visitors ask")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--thresholds", default="0.95,0.97,0.99")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    rows = load_faq_rows()
+    engine = BatchEmbeddingEngine(AutoTokenizer.from_pretrained(args.model), AutoModel.from_pretrained(args.model))
+    embedder = EngineEmbedder(engine)
+    answers = engine.embed([answer for _, answer in rows])
+    index = LocalIndex(answers.shape[1])
+    index.upsert([(f"faq_{i}", vector, {"text": answer}) for i, (vector, (_, answer)) in enumerate(zip(answers, rows))])
+
+    # Visitors ask a few dozen questions in many phrasings, popular ones more often.
+    rng = random.Random(0)
+    popular = list(range(args.questions))
+    weights = [1.0 / (rank + 1) for rank in popular]
+    workload = [rng.choices(popular, weights)[0] for _ in range(args.requests)]
+    workload = [(i, rephrase(rows[i][0], rng)) for i in workload]
+
+    for threshold in [float(value) for value in args.thresholds.split(",")]:
+        cache = SemanticCache(answers.shape[1], threshold=threshold)
+        processor = QueryProcessor(FakeLLM(args.llm_latency), index, PROMPT, embedder, answer_cache=cache)
+        answered_for = {}
+        wrong = 0
+        start = time.perf_counter()
+        for original, question in workload:
+            answer = processor.rag_query(question)
+            # A hit is wrong if the cached answer was generated for a different FAQ entry.
+            wrong += answered_for.setdefault(answer, original) != original
+        seconds = time.perf_counter() - start
+        stats = cache.stats()
+        print(f"threshold {threshold:.2f}: hit rate {stats['hit_rate']:.2f}   wrong answers {wrong:3d}   "
+              f"hit {stats['avg_hit_ms']:6.1f} ms   miss {stats['avg_miss_ms']:6.1f} ms   "
+              f"{args.requests / seconds:6.1f} questions/sec   LLM calls {processor.llm.calls}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import asyncio
+import time
+
+import numpy as np
+from faq_data import load_faq_rows
+from stubs import FakeEmbedder, FakeIndex, FakeStreamingRuntime
+
+from sage_query_processor import QueryProcessor
+from tgi_stream import SageMakerStreamingLLM
+
+PROMPT = "CONTEXT_TEXT:\n{context_text}\n\nQUESTION:\n{question_text}\n\nANSWER:\n"
+
+
+def report(name, first, total):
+    first, total = np.array(first) * 1000, np.array(total) * 1000
+    print(f"{name:<26} time to first token p50 {np.percentile(first, 50):7.1f} ms   "
+          f"total p50 {np.percentile(total, 50):7.1f} ms")
+
+
+def timed_stream(tokens):
+    start = time.perf_counter()
+    first = None
+    for _ in tokens:
+        first = first or time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+async def timed_astream(tokens):
+    start = time.perf_counter()
+    first = None
+    async for _ in tokens:
+        first = first or time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blocking vs streaming generation: time to first token (stub endpoint)")
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--llm-concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    rows = load_faq_rows()
+    questions = [question for question, _ in rows[:args.questions]]
+    index = FakeIndex(latency=0.02)
+    index.upsert([(f"faq_{i}", [], {"text": answer}) for i, (_, answer) in enumerate(rows[:5])])
+    llm = SageMakerStreamingLLM("tgi-demo", runtime_client=FakeStreamingRuntime(args.ttft, args.token_latency,
+                                                                                 args.tokens))
+    processor = QueryProcessor(llm, index, PROMPT, FakeEmbedder(latency=0.02), llm_concurrency=args.llm_concurrency)
+
+    # Without streaming the first token is only visible once the whole answer is back.
+    totals = []
+    for question in questions:
+        start = time.perf_counter()
+        processor.rag_query(question)
+        totals.append(time.perf_counter() - start)
+    report("rag_query", totals, totals)
+
+    first, total = zip(*(timed_stream(processor.rag_query_stream(question)) for question in questions))
+    report("rag_query_stream", first, total)
+
+    async def run_async():
+        return await asyncio.gather(*(timed_astream(processor.arag_query_stream(q)) for q in questions))
+    first, total = zip(*asyncio.run(run_async()))
+    report(f"arag_query_stream (x{len(questions)})", first, total)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import csv
+import os
+import sys
+
+# Benchmarks run from the repository root or from this folder; make the
+# top-level modules importable either way.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+FAQ_CSV = os.path.join(REPO_ROOT, "content", "Amazon_SageMaker_FAQs.csv")
+
+
+def load_faq_rows(path=FAQ_CSV):
+    # Return (question, answer) pairs from the SageMaker FAQ CSV.
+    with open(path, "r", encoding="utf-8-sig", newline="") as file:
+        return [(row[0].strip(), row[1].strip()) for row in csv.reader(file) if len(row) >= 2]
+
+
+def load_faq_texts(path=FAQ_CSV):
+    # Return one "question answer" segment per FAQ row.
+    return [f"{question} {answer}" for question, answer in load_faq_rows(path)]
@@ -0,0 +1,264 @@
+import base64
+import hashlib
+import io
+import json
+import random
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from faq_data import REPO_ROOT  # noqa: F401  (puts the repo root on sys.path)
+
+from local_index import QueryMatch, QueryResponse
+
+
+class FakeIndex:
+    '''
+    In-process stand-in for pinecone.Index. Each call sleeps for `latency`
+    seconds to mimic a network round trip and fails with probability
+    `failure_rate`, so upsert throughput can be benchmarked offline.
+    '''
+    def __init__(self, latency=0.05, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.vectors = {}
+        self.calls = 0
+
+    def _round_trip(self):
+        with self.lock:
+            self.calls += 1
+            failed = self.random.random() < self.failure_rate
+        time.sleep(self.latency)
+        if failed:
+            raise ConnectionError("simulated upsert failure")
+
+    def upsert(self, vectors):
+        self._round_trip()
+        with self.lock:
+            for vector_id, values, metadata in vectors:
+                self.vectors[vector_id] = (values, metadata)
+
+    def query(self, vector=None, top_k=10, include_metadata=False, **kwargs):
+        # Only the round trip is simulated; matches are the first stored vectors.
+        self._round_trip()
+        with self.lock:
+            ids = list(self.vectors)[:top_k]
+        return QueryResponse(matches=[QueryMatch(id=vector_id, score=0.0, metadata=self.vectors[vector_id][1])
+                                      for vector_id in ids])
+
+    def delete(self, ids):
+        self._round_trip()
+        with self.lock:
+            for vector_id in ids:
+                self.vectors.pop(vector_id, None)
+
+
+def fake_embedding(text, dim):
+    # Deterministic pseudo-embedding so callers can check results map back correctly.
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    rng = random.Random(seed)
+    return [rng.uniform(-1.0, 1.0) for _ in range(dim)]
+
+
+class MockEmbeddingsServer:
+    '''
+    Local HTTP server that answers POST /v1/embeddings like the OpenAI API,
+    after `latency` seconds per request. Point OpenAI(base_url=server.base_url)
+    at it. `requests` counts calls and `max_concurrent` the peak parallelism.
+    '''
+    def __init__(self, dim=1536, latency=0.1):
+        self.dim = dim
+        self.latency = latency
+        self.requests = 0
+        self.active = 0
+        self.max_concurrent = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with mock.lock:
+                    mock.requests += 1
+                    mock.active += 1
+                    mock.max_concurrent = max(mock.max_concurrent, mock.active)
+                time.sleep(mock.latency)
+
+                inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+                data = []
+                for i, text in enumerate(inputs):
+                    vector = fake_embedding(text, mock.dim)
+                    if body.get("encoding_format") == "base64":
+                        vector = base64.b64encode(struct.pack(f"<{mock.dim}f", *vector)).decode("ascii")
+                    data.append({"object": "embedding", "index": i, "embedding": vector})
+                tokens = sum(len(text) // 4 + 1 for text in inputs)
+                payload = json.dumps({"object": "list", "data": data, "model": body["model"],
+                                      "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}).encode("utf-8")
+
+                with mock.lock:
+                    mock.active -= 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+
+class ThrottlingError(Exception):
+    # Shaped like the botocore ClientError SageMaker runtime raises when throttling.
+    def __init__(self):
+        super().__init__("An error occurred (ThrottlingException) when calling the InvokeEndpoint operation")
+        self.response = {"Error": {"Code": "ThrottlingException"}}
+
+
+class FakePredictor:
+    '''
+    Stand-in for a SageMaker HuggingFacePredictor serving feature extraction.
+    predict({"inputs": {"input_ids": [[...]], ...}}) returns per-token hidden
+    states of shape (batch, seq, dim) after a JSON round trip, taken from a fixed
+    random table per token ID. Each call sleeps `latency` seconds, is throttled
+    with probability `throttle_rate`, and bodies over `max_payload_bytes` fail.
+    Like sage_inference/inference.py, it accepts npy token arrays when a
+    serializer is set, returns .npy bodies when a deserializer is set, and
+    mean-pools on the "server" with pooling=True. Body sizes are recorded in
+    request_bytes / response_bytes.
+    '''
+    def __init__(self, dim=64, vocab_size=30522, latency=0.05, throttle_rate=0.0,
+                 max_payload_bytes=6 * 1024 * 1024, pooling=False, seed=0):
+        self.table = np.random.default_rng(seed).standard_normal((vocab_size, dim)).astype(np.float32)
+        self.serializer = None
+        self.deserializer = None
+        self.pooling = pooling
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.max_payload_bytes = max_payload_bytes
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+
+    def predict(self, data):
+        body = json.dumps(data).encode("utf-8") if self.serializer is None else self.serializer.serialize(data)
+        with self.lock:
+            self.calls += 1
+            throttled = self.random.random() < self.throttle_rate
+            self.throttled += throttled
+        time.sleep(self.latency)
+        if throttled:
+            raise ThrottlingError()
+        if len(body) > self.max_payload_bytes:
+            raise ValueError(f"request body of {len(body)} bytes is over the endpoint limit")
+
+        if self.serializer is None:
+            inputs = json.loads(body)["inputs"]
+            input_ids, mask = np.asarray(inputs["input_ids"]), np.asarray(inputs["attention_mask"])
+        else:
+            input_ids, mask = np.load(io.BytesIO(body))
+        hidden = self.table[input_ids]
+        if self.pooling:
+            weights = mask[..., None].astype(np.float32)
+            hidden = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1.0)
+
+        if self.deserializer is None:
+            response = json.dumps(hidden.tolist()).encode("utf-8")
+            result = json.loads(response)
+        else:
+            buffer = io.BytesIO()
+            np.save(buffer, hidden)
+            response = buffer.getvalue()
+            result = self.deserializer.deserialize(io.BytesIO(response), "application/x-npy")
+        with self.lock:
+            self.request_bytes += len(body)
+            self.response_bytes += len(response)
+        return result
+
+
+class FakeEmbedder:
+    # Stand-in for EmbeddingCreator: blocking embed_docs calls that take `latency` seconds.
+    def __init__(self, dim=64, latency=0.02):
+        self.dim = dim
+        self.latency = latency
+
+    def embed_docs(self, docs):
+        time.sleep(self.latency)
+        return [fake_embedding(doc, self.dim) for doc in docs]
+
+
+class FakeLLM:
+    # Stand-in for a text-generation predictor: blocking predict calls that take `latency` seconds.
+    def __init__(self, latency=0.2):
+        self.latency = latency
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def predict(self, data):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return [{"generated_text": f"answer to: {data['inputs'][-80:]}"}]
+
+
+class FakeStreamingRuntime:
+    '''
+    Stand-in for a boto3 "sagemaker-runtime" client in front of a TGI endpoint.
+    Generation takes `ttft` seconds to the first token and `token_latency` per
+    token after that. invoke_endpoint_with_response_stream returns the tokens as
+    server-sent events cut into PayloadParts at arbitrary byte offsets, as the
+    real event stream may; invoke_endpoint returns only once all are generated.
+    '''
+    def __init__(self, ttft=0.3, token_latency=0.02, tokens=40, seed=0):
+        self.ttft = ttft
+        self.token_latency = token_latency
+        self.tokens = tokens
+        self.random = random.Random(seed)
+
+    def _answer(self, body):
+        words = json.loads(body)["inputs"].split()
+        return [f" {words[i % len(words)]}" for i in range(self.tokens)]
+
+    def invoke_endpoint(self, EndpointName, Body, ContentType="application/json"):
+        answer = self._answer(Body)
+        time.sleep(self.ttft + self.token_latency * (len(answer) - 1))
+        return {"Body": io.BytesIO(json.dumps([{"generated_text": "".join(answer)}]).encode("utf-8"))}
+
+    def invoke_endpoint_with_response_stream(self, EndpointName, Body, ContentType="application/json"):
+        return {"Body": self._events(self._answer(Body))}
+
+    def _events(self, answer):
+        for i, text in enumerate(answer):
+            time.sleep(self.ttft if i == 0 else self.token_latency)
+            event = {"token": {"id": i, "text": text, "logprob": 0.0, "special": False},
+                     "generated_text": None, "details": None}
+            data = f"data:{json.dumps(event)}\n\n".encode("utf-8")
+            cut = self.random.randint(1, len(data) - 1)
+            yield {"PayloadPart": {"Bytes": data[:cut]}}
+            yield {"PayloadPart": {"Bytes": data[cut:]}}
+        end = {"token": {"id": 2, "text": "</s>", "logprob": 0.0, "special": True},
+               "generated_text": "".join(answer), "details": None}
+        yield {"PayloadPart": {"Bytes": f"data:{json.dumps(end)}\n\n".encode("utf-8")}}
@@ -0,0 +1,143 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from itertools import islice
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass(frozen=True)
+class Chunk:
+    id: str
+    text: str
+    tokens: int
+
+
+def approximate_token_counter(texts):
+    # Rough count (~4 characters per token) for when no tokenizer is available.
+    return [len(text) // 4 + 1 for text in texts]
+
+
+def hf_token_counter(tokenizer):
+    # Count tokens with a Hugging Face tokenizer, one batched call per list of texts.
+    def count(texts):
+        return [len(ids) for ids in tokenizer(list(texts), add_special_tokens=False)["input_ids"]]
+    return count
+
+
+def iter_sentences(lines, max_chars=20000):
+    '''
+    Yield sentences from an iterable of lines without reading it all first.
+    Blank lines end a paragraph (and so a sentence); a sentence that has not
+    ended by max_chars characters is emitted as it is.
+    '''
+    carry = ""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            if carry:
+                yield carry
+            carry = ""
+            continue
+        parts = SENTENCE_END.split(f"{carry} {line}" if carry else line)
+        # The last part is only complete if the line ends a sentence.
+        carry = "" if parts[-1][-1:] in ".!?" else parts.pop()
+        yield from parts
+        if len(carry) > max_chars:
+            yield carry
+            carry = ""
+    if carry:
+        yield carry
+
+
+class TokenChunker:
+    '''
+    Packs consecutive sentences into chunks of at most `max_tokens` tokens, as
+    counted by `count_tokens(list_of_texts) -> list_of_ints` (see hf_token_counter).
+    Each chunk after the first repeats up to `overlap_tokens` tokens of trailing
+    sentences from the previous one. Sentences longer than the budget are split
+    on whitespace. Chunk IDs are derived from the chunk text, so they stay the
+    same across runs and do not shift when content elsewhere in the file changes.
+    '''
+    def __init__(self, count_tokens=None, max_tokens=512, overlap_tokens=32, count_batch_size=64):
+        if overlap_tokens >= max_tokens:
+            raise ValueError(f"overlap_tokens ({overlap_tokens}) must be smaller than max_tokens ({max_tokens})")
+        self.count_tokens = count_tokens or approximate_token_counter
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.count_batch_size = count_batch_size
+
+    @classmethod
+    def for_model(cls, tokenizer, max_length=512, overlap_tokens=32):
+        # Budget that fits the model's context once special tokens ([CLS], [SEP]) are added.
+        max_tokens = min(max_length, tokenizer.model_max_length) - tokenizer.num_special_tokens_to_add()
+        return cls(hf_token_counter(tokenizer), max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+
+    def _counted(self, sentences):
+        # Yield (sentence, tokens), counting in batches and splitting overlong sentences.
+        sentences = iter(sentences)
+        while True:
+            batch = list(islice(sentences, self.count_batch_size))
+            if not batch:
+                return
+            for sentence, tokens in zip(batch, self.count_tokens(batch)):
+                if tokens <= self.max_tokens:
+                    yield sentence, tokens
+                else:
+                    yield from self._split_long(sentence)
+
+    def _split_long(self, sentence):
+        words = sentence.split()
+        piece, piece_tokens = [], 0
+        for word, tokens in zip(words, self.count_tokens(words)):
+            if piece and piece_tokens + tokens > self.max_tokens:
+                yield " ".join(piece), piece_tokens
+                piece, piece_tokens = [], 0
+            piece.append(word)
+            piece_tokens += tokens
+        if piece:
+            yield " ".join(piece), piece_tokens
+
+    def _overlap(self, window):
+        # Trailing sentences of the emitted chunk that fit in the overlap budget.
+        kept, tokens = [], 0
+        for sentence, count in reversed(window):
+            if tokens + count > self.overlap_tokens:
+                break
+            kept.append((sentence, count))
+            tokens += count
+        return kept[::-1]
+
+    def chunk_sentences(self, sentences, prefix="chunk"):
+        # Yield Chunks for an iterable of sentences; memory is bounded by one chunk.
+        window, window_tokens, fresh = [], 0, False
+        seen = {}
+        for sentence, tokens in self._counted(sentences):
+            if window and window_tokens + tokens > self.max_tokens:
+                if fresh:
+                    yield self._make_chunk(window, window_tokens, prefix, seen)
+                window = self._overlap(window)
+                window_tokens = sum(count for _, count in window)
+                while window and window_tokens + tokens > self.max_tokens:
+                    window_tokens -= window.pop(0)[1]
+            window.append((sentence, tokens))
+            window_tokens += tokens
+            fresh = True
+        if fresh:
+            yield self._make_chunk(window, window_tokens, prefix, seen)
+
+    def _make_chunk(self, window, tokens, prefix, seen):
+        text = " ".join(sentence for sentence, _ in window)
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        # Identical chunks within one source get an occurrence suffix.
+        seen[digest] = seen.get(digest, 0) + 1
+        suffix = f"_{seen[digest]}" if seen[digest] > 1 else ""
+        return Chunk(f"{prefix}_{digest}{suffix}", text, tokens)
+
+    def chunk_text(self, text, prefix="chunk"):
+        return list(self.chunk_sentences(iter_sentences(text.splitlines()), prefix))
+
+    def iter_file_chunks(self, file_path, prefix="chunk"):
+        # Stream a text file line by line into Chunks.
+        with open(file_path, "r", encoding="utf-8") as file:
+            yield from self.chunk_sentences(iter_sentences(file), prefix)
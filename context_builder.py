@@ -0,0 +1,81 @@
+import re
+
+import numpy as np
+
+from chunker import approximate_token_counter
+
+WORD = re.compile(r"\w+")
+
+
+def word_set(text):
+    return frozenset(WORD.findall(text.lower()))
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class ContextBuilder:
+    '''
+    Assembles retrieved chunks into the prompt context under a token budget,
+    counted by `count_tokens(list_of_texts) -> list_of_ints` (use
+    chunker.hf_token_counter with the LLM's tokenizer for exact counts).
+    Chunks whose word sets overlap a more relevant chunk by `dedup_threshold`
+    (Jaccard) or more are dropped. The rest are packed greedily by relevance:
+    a chunk that does not fit is skipped and smaller ones after it are still
+    considered. With `mmr_lambda` set, chunks are ordered by maximal marginal
+    relevance instead, trading relevance for diversity.
+    '''
+    def __init__(self, count_tokens=None, max_tokens=256, dedup_threshold=0.9, mmr_lambda=None, separator="\n"):
+        self.count_tokens = count_tokens or approximate_token_counter
+        self.max_tokens = max_tokens
+        self.dedup_threshold = dedup_threshold
+        self.mmr_lambda = mmr_lambda
+        self.separator = separator
+        self.separator_tokens = self.count_tokens([separator])[0]
+
+    def build(self, contexts, scores=None, vectors=None, max_tokens=None):
+        return self.separator.join(self.select(contexts, scores, vectors, max_tokens))
+
+    def select(self, contexts, scores=None, vectors=None, max_tokens=None):
+        # Return the chosen chunk texts in prompt order. Without scores, list order is relevance order.
+        texts = [text.strip() for text in contexts]
+        if not texts:
+            return []
+        scores = np.linspace(1.0, 0.0, len(texts)) if scores is None else np.asarray(scores, dtype=np.float64)
+        words = [word_set(text) for text in texts]
+
+        candidates = []
+        for i in np.argsort(-scores, kind="stable").tolist():
+            if texts[i] and all(jaccard(words[i], words[j]) < self.dedup_threshold for j in candidates):
+                candidates.append(i)
+        if self.mmr_lambda is not None:
+            candidates = self._mmr(candidates, scores, words, vectors)
+
+        budget = self.max_tokens if max_tokens is None else max_tokens
+        chosen, used = [], 0
+        for i, tokens in zip(candidates, self.count_tokens([texts[i] for i in candidates])):
+            cost = tokens + (self.separator_tokens if chosen else 0)
+            if used + cost <= budget:
+                chosen.append(i)
+                used += cost
+        return [texts[i] for i in chosen]
+
+    def _mmr(self, candidates, scores, words, vectors):
+        # Greedy MMR: relevance minus the highest similarity to anything already picked.
+        if vectors is not None:
+            matrix = np.asarray(vectors, dtype=np.float32)[candidates]
+            matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+            similarity = matrix @ matrix.T
+        else:
+            similarity = np.array([[jaccard(words[a], words[b]) for b in candidates] for a in candidates])
+        relevance = scores[candidates]
+        spread = relevance.max() - relevance.min()
+        relevance = (relevance - relevance.min()) / spread if spread > 0 else np.ones(len(candidates))
+
+        picked, remaining = [], list(range(len(candidates)))
+        while remaining:
+            redundancy = similarity[np.ix_(remaining, picked)].max(axis=1) if picked else np.zeros(len(remaining))
+            values = self.mmr_lambda * relevance[remaining] - (1 - self.mmr_lambda) * redundancy
+            picked.append(remaining.pop(int(np.argmax(values))))
+        return [candidates[i] for i in picked]
@@ -0,0 +1,223 @@
+import re
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def first_sentence(text):
+    return SENTENCE_END.split(text.strip(), 1)[0]
+
+
+class SQLiteConversationStore:
+    '''
+    Local stand-in for the DynamoDB conversation table: one row per
+    (session_id, turn) and one summary row per session. write_batch() commits
+    a whole batch of turns and summaries in one transaction.
+    '''
+    def __init__(self, path=":memory:"):
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.db.execute("CREATE TABLE IF NOT EXISTS turns (session_id TEXT NOT NULL, turn INTEGER NOT NULL, "
+                        "question TEXT NOT NULL, answer TEXT NOT NULL, PRIMARY KEY (session_id, turn))")
+        self.db.execute("CREATE TABLE IF NOT EXISTS summaries (session_id TEXT PRIMARY KEY, "
+                        "summary TEXT NOT NULL, turn INTEGER NOT NULL)")
+        self.db.commit()
+
+    def load(self, session_id, limit):
+        # Return (summary, summarised_turns, [(turn, question, answer)] for the last `limit` turns, oldest first).
+        with self.lock:
+            summary = self.db.execute("SELECT summary, turn FROM summaries WHERE session_id = ?",
+                                      (session_id,)).fetchone()
+            turns = self.db.execute("SELECT turn, question, answer FROM turns WHERE session_id = ? "
+                                    "ORDER BY turn DESC LIMIT ?", (session_id, limit)).fetchall()
+        summary, summarised = summary if summary else ("", 0)
+        return summary, summarised, turns[::-1]
+
+    def write_batch(self, turns, summaries):
+        # turns: [(session_id, turn, question, answer)]; summaries: [(session_id, summary, summarised_turns)].
+        with self.lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO turns VALUES (?, ?, ?, ?)", turns)
+            self.db.executemany("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)", summaries)
+
+
+class DynamoDBConversationStore:
+    '''
+    Conversation table in DynamoDB with partition key "session_id" (S) and
+    sort key "turn" (N). The summary is kept under turn -1; batches go through
+    the table's batch_writer, which sends up to 25 items per request.
+    '''
+    def __init__(self, table_name, dynamodb_resource=None):
+        if dynamodb_resource is None:
+            import boto3
+            dynamodb_resource = boto3.resource("dynamodb")
+        self.table = dynamodb_resource.Table(table_name)
+
+    def load(self, session_id, limit):
+        from boto3.dynamodb.conditions import Key
+        items = self.table.query(KeyConditionExpression=Key("session_id").eq(session_id) & Key("turn").gte(0),
+                                 ScanIndexForward=False, Limit=limit)["Items"]
+        summary = self.table.get_item(Key={"session_id": session_id, "turn": -1}).get("Item") or {}
+        turns = [(int(item["turn"]), item["question"], item["answer"]) for item in reversed(items)]
+        return summary.get("summary", ""), int(summary.get("summarised", 0)), turns
+
+    def write_batch(self, turns, summaries):
+        with self.table.batch_writer(overwrite_by_pkeys=["session_id", "turn"]) as batch:
+            for session_id, turn, question, answer in turns:
+                batch.put_item(Item={"session_id": session_id, "turn": turn, "question": question, "answer": answer})
+            for session_id, summary, summarised in summaries:
+                batch.put_item(Item={"session_id": session_id, "turn": -1, "summary": summary,
+                                     "summarised": summarised})
+
+
+class RollingSummarizer:
+    '''
+    Extractive incremental summary: each turn leaving the window adds its
+    question and the first sentence of its answer, and only the last
+    `max_words` words are kept.
+    '''
+    def __init__(self, max_words=150):
+        self.max_words = max_words
+
+    def __call__(self, summary, question, answer):
+        words = f"{summary} User asked: {question} Assistant: {first_sentence(answer)}".split()
+        return " ".join(words[-self.max_words:])
+
+
+class LLMSummarizer:
+    '''
+    Incremental summary written by an LLM predictor (same payloads as
+    HuggingFacePredictor.predict): the previous summary plus one turn in, the
+    new summary out, as in LangChain's ConversationSummaryMemory.
+    '''
+    prompt = ("Progressively summarize the conversation, adding onto the previous summary and returning a new "
+              "summary.\n\nCURRENT SUMMARY:\n{summary}\n\nNEW LINES:\nHuman: {question}\nAI: {answer}\n\n"
+              "NEW SUMMARY:\n")
+
+    def __init__(self, llm_predictor, max_new_tokens=128):
+        self.llm = llm_predictor
+        self.max_new_tokens = max_new_tokens
+
+    def __call__(self, summary, question, answer):
+        out = self.llm.predict({"inputs": self.prompt.format(summary=summary, question=question, answer=answer),
+                                "parameters": {"max_new_tokens": self.max_new_tokens, "return_full_text": False}})
+        return out[0]["generated_text"].strip()
+
+
+class Session:
+    def __init__(self, window, summary="", summarised=0, turns=()):
+        self.turns = deque(turns, maxlen=window)
+        self.summary = summary
+        self.summarised = summarised
+        self.next_turn = turns[-1][0] + 1 if turns else summarised
+        # Serialises turns of one session, including the summarizer call, without blocking other sessions.
+        self.lock = threading.Lock()
+
+
+class ConversationMemory:
+    '''
+    Per-session conversation history for QueryProcessor. The last `window`
+    turns of each session live in a ring buffer; a turn pushed out of the
+    window is folded into the session summary by `summarizer(summary,
+    question, answer)`, so the history in a prompt stays bounded however long
+    the session runs. The store (SQLiteConversationStore,
+    DynamoDBConversationStore) is read only when a session is not in memory,
+    and written in batches of `flush_every` turns. Beyond `max_sessions`, the
+    least recently used session is flushed and dropped from memory.
+    The shared lock only guards the session table and the pending writes;
+    summarizer calls hold just their session's lock, and store reads and
+    writes run outside both, so a slow LLM or DynamoDB call for one session
+    does not stall the others.
+    '''
+    def __init__(self, store=None, window=4, max_sessions=1024, flush_every=32, summarizer=None):
+        self.store = store if store is not None else SQLiteConversationStore()
+        self.window = window
+        self.max_sessions = max_sessions
+        self.flush_every = flush_every
+        self.summarizer = summarizer or RollingSummarizer()
+        self.sessions = OrderedDict()
+        self.pending_turns = []
+        self.pending_summaries = {}
+        self.lock = threading.Lock()
+        # Held while a batch is written, so a session is never reloaded before its own pending turns land.
+        self.flush_lock = threading.Lock()
+
+    def _session(self, session_id):
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                self.sessions.move_to_end(session_id)
+                return session
+
+        with self.flush_lock:
+            with self.lock:
+                # An evicted session whose turns are still pending must be written before it is read back.
+                dirty = session_id in self.pending_summaries or any(
+                    turn[0] == session_id for turn in self.pending_turns)
+            if dirty:
+                self._write_pending()
+            summary, summarised, turns = self.store.load(session_id, self.window)
+
+        loaded = Session(self.window, summary, summarised, turns)
+        with self.lock:
+            # Another thread may have loaded the same session meanwhile; keep the first one.
+            session = self.sessions.setdefault(session_id, loaded)
+            self.sessions.move_to_end(session_id)
+            evicted = len(self.sessions) > self.max_sessions
+            if evicted:
+                self.sessions.popitem(last=False)
+        if evicted:
+            # Whatever the evicted session still has pending goes out with this flush.
+            self.flush()
+        return session
+
+    def history(self, session_id):
+        # Prompt text: the running summary followed by the turns still in the window.
+        session = self._session(session_id)
+        with session.lock:
+            summary, turns = session.summary, list(session.turns)
+        lines = [f"Summary of earlier conversation: {summary}"] if summary else []
+        for _, question, answer in turns:
+            lines.append(f"User: {question}")
+            lines.append(f"Assistant: {answer}")
+        return "\n".join(lines)
+
+    def add_turn(self, session_id, question, answer):
+        session = self._session(session_id)
+        with session.lock:
+            if len(session.turns) == self.window:
+                _, old_question, old_answer = session.turns[0]
+                session.summary = self.summarizer(session.summary, old_question, old_answer)
+                session.summarised += 1
+            session.turns.append((session.next_turn, question, answer))
+            with self.lock:
+                if session.summarised:
+                    self.pending_summaries[session_id] = (session_id, session.summary, session.summarised)
+                self.pending_turns.append((session_id, session.next_turn, question, answer))
+                full = len(self.pending_turns) >= self.flush_every
+            session.next_turn += 1
+        if full:
+            self.flush()
+
+    def flush(self):
+        # Write every pending turn and summary to the store in one batch.
+        with self.flush_lock:
+            self._write_pending()
+
+    def _write_pending(self):
+        # Caller holds flush_lock. On failure the batch is put back so the next flush retries it.
+        with self.lock:
+            turns, self.pending_turns = self.pending_turns, []
+            summaries, self.pending_summaries = self.pending_summaries, {}
+        if not turns and not summaries:
+            return
+        try:
+            self.store.write_batch(turns, list(summaries.values()))
+        except Exception:
+            with self.lock:
+                self.pending_turns[:0] = turns
+                for session_id, summary in summaries.items():
+                    if session_id not in self.pending_summaries:
+                        self.pending_summaries[session_id] = summary
+            raise
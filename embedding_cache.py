@@ -0,0 +1,183 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from quantization import DTYPES, dequantize, quantize
+
+
+def embedding_key(model_name, text):
+    # Cache key for one (model, text) pair.
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class MemoryTier:
+    '''
+    In-process LRU of (codes, scale) entries, evicting least recently used
+    vectors once the stored codes exceed `max_bytes`.
+    '''
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, codes, scale):
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key)[0].nbytes
+        self.entries[key] = (codes, scale)
+        self.bytes += codes.nbytes
+        while self.bytes > self.max_bytes and self.entries:
+            _, (evicted, _) = self.entries.popitem(last=False)
+            self.bytes -= evicted.nbytes
+
+
+class DiskTier:
+    '''
+    On-disk store of vectors in a single memory-mapped file, float32 or scalar
+    quantised with a parallel file of per-vector scales. A SQLite table maps
+    each key to its row; the files grow by doubling as rows are added.
+    '''
+    def __init__(self, directory, dtype="float32", initial_rows=1024):
+        os.makedirs(directory, exist_ok=True)
+        self.dtype = dtype
+        self.data_path = os.path.join(directory, f"vectors.{dtype}")
+        self.scales_path = os.path.join(directory, "scales.f32")
+        self.db = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS rows (key TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self.db.commit()
+
+        meta = dict(self.db.execute("SELECT name, value FROM meta"))
+        stored_dtype = DTYPES[meta.get("dtype", DTYPES.index(dtype))]
+        if stored_dtype != dtype:
+            raise ValueError(f"{directory} holds {stored_dtype} vectors, not {dtype}")
+        self.dim = meta.get("dim")
+        self.count = meta.get("count", 0)
+        self.initial_rows = initial_rows
+        self.vectors = None
+        self.scales = None
+        if self.dim:
+            self._map(max(self.count, 1))
+
+    def _map(self, min_rows):
+        # (Re)open the data files with room for at least min_rows vectors.
+        row_bytes = self.dim * np.dtype(self.dtype).itemsize
+        existing_rows = os.path.getsize(self.data_path) // row_bytes if os.path.exists(self.data_path) else 0
+        capacity = max(existing_rows, self.initial_rows)
+        while capacity < min_rows:
+            capacity *= 2
+        if capacity != existing_rows:
+            with open(self.data_path, "ab") as file:
+                file.truncate(capacity * row_bytes)
+            with open(self.scales_path, "ab") as file:
+                file.truncate(capacity * 4)
+        if self.vectors is not None:
+            self.vectors.flush()
+            self.scales.flush()
+        self.vectors = np.memmap(self.data_path, dtype=self.dtype, mode="r+", shape=(capacity, self.dim))
+        self.scales = np.memmap(self.scales_path, dtype=np.float32, mode="r+", shape=(capacity,))
+
+    def get_many(self, keys):
+        # Return {key: (codes, scale)} for the keys present on disk.
+        if not keys or self.vectors is None:
+            return {}
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.db.execute(f"SELECT key, row FROM rows WHERE key IN ({placeholders})", chunk)
+            for key, row in rows:
+                found[key] = (np.array(self.vectors[row]), float(self.scales[row]))
+        return found
+
+    def put_many(self, items):
+        # Append (key, codes, scale) items and record their rows.
+        items = list(items)
+        if not items:
+            return
+        if self.dim is None:
+            self.dim = int(items[0][1].shape[0])
+        if self.vectors is None or self.count + len(items) > self.vectors.shape[0]:
+            self._map(self.count + len(items))
+
+        rows = []
+        for key, codes, scale in items:
+            self.vectors[self.count] = codes
+            self.scales[self.count] = scale
+            rows.append((key, self.count))
+            self.count += 1
+        self.vectors.flush()
+        self.scales.flush()
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO rows (key, row) VALUES (?, ?)", rows)
+            self.db.executemany("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                                [("dim", self.dim), ("count", self.count), ("dtype", DTYPES.index(self.dtype))])
+
+
+class EmbeddingCache:
+    '''
+    Two-tier embedding cache keyed by (model name, text hash): a bounded in-memory
+    LRU in front of an optional memory-mapped disk tier. Any object with the same
+    `embed` method can be passed to the uploaders and query classes instead.
+    dtype="float16" or "int8" stores vectors scalar-quantised in both tiers.
+    '''
+    def __init__(self, max_memory_bytes=64 * 1024 * 1024, disk_path=None, dtype="float32"):
+        self.dtype = dtype
+        self.memory = MemoryTier(max_memory_bytes)
+        self.disk = DiskTier(disk_path, dtype) if disk_path else None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model_name, texts):
+        # Return a list aligned with texts holding cached vectors or None.
+        keys = [embedding_key(model_name, text) for text in texts]
+        with self.lock:
+            entries = [self.memory.get(key) for key in keys]
+            missing = [key for key, entry in zip(keys, entries) if entry is None]
+            if missing and self.disk is not None:
+                from_disk = self.disk.get_many(missing)
+                for key, (codes, scale) in from_disk.items():
+                    self.memory.put(key, codes, scale)
+                entries = [entry if entry is not None else from_disk.get(key)
+                           for key, entry in zip(keys, entries)]
+        return [None if entry is None else dequantize(entry[0], entry[1]) for entry in entries]
+
+    def put_many(self, model_name, texts, vectors):
+        keys = [embedding_key(model_name, text) for text in texts]
+        if not keys:
+            return
+        codes, scales = quantize(np.asarray([np.asarray(v, dtype=np.float32) for v in vectors]), self.dtype)
+        items = list(zip(keys, codes, scales.tolist()))
+        with self.lock:
+            for key, vector_codes, scale in items:
+                self.memory.put(key, vector_codes, scale)
+            if self.disk is not None:
+                self.disk.put_many(items)
+
+    def embed(self, model_name, texts, embed_fn):
+        '''
+        Return float32 vectors for texts, calling embed_fn(list_of_texts) only for
+        the distinct texts that are not cached yet.
+        '''
+        texts = list(texts)
+        results = self.get_many(model_name, texts)
+
+        misses = list(dict.fromkeys(text for text, vector in zip(texts, results) if vector is None))
+        self.hits += len(texts) - sum(vector is None for vector in results)
+        self.misses += len(misses)
+        if misses:
+            computed = dict(zip(misses, (np.asarray(v, dtype=np.float32) for v in embed_fn(misses))))
+            self.put_many(model_name, list(computed.keys()), list(computed.values()))
+            results = [vector if vector is not None else computed[text] for text, vector in zip(texts, results)]
+
+        return results
@@ -0,0 +1,49 @@
+import torch
+
+
+class BatchEmbeddingEngine:
+    '''
+    This class turns many text segments into mean-pooled embeddings on CPU.
+    Segments are sorted by token length and grouped into buckets, so each bucket
+    is only padded to its own longest item. Padding is masked out of the mean.
+    '''
+    def __init__(self, tokenizer, model, batch_size=16, max_length=None):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.model.eval()
+        self.batch_size = batch_size
+
+        # BERT-style models cannot go past their position embedding table (512 for BERT).
+        model_limit = getattr(model.config, "max_position_embeddings", 512)
+        self.max_length = min(max_length or model_limit, model_limit)
+
+    def embed(self, texts, batch_size=None):
+        # Return a float32 array of shape (len(texts), hidden_size) in input order.
+        batch_size = batch_size or self.batch_size
+        texts = list(texts)
+        if not texts:
+            return torch.empty((0, self.model.config.hidden_size)).numpy()
+
+        # Tokenize once without padding so segments can be bucketed by length.
+        encoded = self.tokenizer(texts, truncation=True, max_length=self.max_length)
+        order = sorted(range(len(texts)), key=lambda i: len(encoded["input_ids"][i]))
+
+        embeddings = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            features = [{key: encoded[key][i] for key in encoded.keys()} for i in bucket]
+            inputs = self.tokenizer.pad(features, padding="longest", return_tensors="pt")
+            pooled = self._mean_pool(inputs)
+            for position, vector in zip(bucket, pooled):
+                embeddings[position] = vector
+
+        return torch.stack(embeddings).numpy()
+
+    def _mean_pool(self, inputs):
+        # Average the last hidden state over real tokens only.
+        with torch.inference_mode():
+            outputs = self.model(**inputs)
+            mask = inputs["attention_mask"].unsqueeze(-1).to(outputs.last_hidden_state.dtype)
+            summed = (outputs.last_hidden_state * mask).sum(dim=1)
+            counts = mask.sum(dim=1).clamp(min=1.0)
+            return summed / counts
@@ -0,0 +1,178 @@
+import json
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+from batch_query import to_result
+from local_index import QueryMatch, QueryResponse
+
+TOKEN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it my of on or that the this to what when "
+    "where which who why will with you your".split()
+)
+
+
+def tokenize(text):
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    # Fuse ranked ID lists: each list contributes 1 / (k + rank) per ID. Returns [(id, score)], best first.
+    scores = {}
+    for ranking in rankings:
+        for rank, vector_id in enumerate(ranking, start=1):
+            scores[vector_id] = scores.get(vector_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    '''
+    Okapi BM25 over chunk texts, keyed by the same IDs as the vector index.
+    Postings are kept per term as (rows, precomputed term weights) numpy arrays,
+    so a search is one vectorised add per query term. upsert/delete mark the
+    postings stale; they are rebuilt on the next search. Searches may run in
+    parallel with each other, but not with upsert or delete.
+    '''
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = []
+        self.metadata = []
+        self.term_counts = []
+        self.rows = {}
+        self.postings = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_local_index(cls, index, **kwargs):
+        # Build from a LocalIndex whose metadata holds the chunk text under "text".
+        bm25 = cls(**kwargs)
+        bm25.upsert((vector_id, metadata.get("text", ""), metadata)
+                    for vector_id, metadata in zip(index.ids, index.metadata))
+        return bm25
+
+    def upsert(self, records):
+        # records: (id, text, metadata) tuples, as yielded by upload_pipeline.iter_segment_records.
+        for vector_id, text, metadata in records:
+            row = self.rows.get(vector_id)
+            if row is None:
+                self.rows[vector_id] = len(self.ids)
+                self.ids.append(vector_id)
+                self.metadata.append(metadata)
+                self.term_counts.append(Counter(tokenize(text)))
+            else:
+                self.metadata[row] = metadata
+                self.term_counts[row] = Counter(tokenize(text))
+        self.postings = None
+
+    def delete(self, ids):
+        # Swap-remove, like LocalIndex.delete.
+        for vector_id in ids:
+            row = self.rows.pop(vector_id, None)
+            if row is None:
+                continue
+            last = len(self.ids) - 1
+            if row != last:
+                self.ids[row] = self.ids[last]
+                self.metadata[row] = self.metadata[last]
+                self.term_counts[row] = self.term_counts[last]
+                self.rows[self.ids[row]] = row
+            self.ids.pop()
+            self.metadata.pop()
+            self.term_counts.pop()
+        self.postings = None
+
+    def _build(self):
+        lengths = np.array([sum(counts.values()) for counts in self.term_counts], dtype=np.float32)
+        average = max(float(lengths.mean()), 1.0) if len(lengths) else 1.0
+        norms = self.k1 * (1 - self.b + self.b * lengths / average)
+
+        rows, freqs = {}, {}
+        for row, counts in enumerate(self.term_counts):
+            for term, freq in counts.items():
+                rows.setdefault(term, []).append(row)
+                freqs.setdefault(term, []).append(freq)
+
+        postings = {}
+        for term, term_rows in rows.items():
+            term_rows = np.array(term_rows, dtype=np.int32)
+            freq = np.array(freqs[term], dtype=np.float32)
+            idf = math.log(1 + (len(self.ids) - len(term_rows) + 0.5) / (len(term_rows) + 0.5))
+            postings[term] = (term_rows, (idf * freq * (self.k1 + 1) / (freq + norms[term_rows])).astype(np.float32))
+        self.postings = postings
+        return postings
+
+    def search(self, text, top_k=10):
+        # Return [(id, score, metadata)] for the best-scoring chunks, best first.
+        # Read the attribute once: another search may rebuild it, or an upsert reset it, in between.
+        postings = self.postings
+        if postings is None:
+            postings = self._build()
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(text)):
+            posting = postings.get(term)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+        hits = np.flatnonzero(scores)
+        if not len(hits):
+            return []
+        k = min(top_k, len(hits))
+        top = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[row], float(scores[row]), self.metadata[row]) for row in top]
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"k1": self.k1, "b": self.b, "ids": self.ids, "metadata": self.metadata,
+                       "term_counts": self.term_counts}, file)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as file:
+            stored = json.load(file)
+        bm25 = cls(stored["k1"], stored["b"])
+        bm25.ids = stored["ids"]
+        bm25.metadata = stored["metadata"]
+        bm25.term_counts = [Counter(counts) for counts in stored["term_counts"]]
+        bm25.rows = {vector_id: row for row, vector_id in enumerate(bm25.ids)}
+        return bm25
+
+
+class HybridRetriever:
+    '''
+    Lexical + vector retrieval: fetches `vector_k` candidates from the vector
+    index and `lexical_k` from a BM25Index over the same chunks, then fuses the
+    two rankings with reciprocal rank fusion. Returns a QueryResponse like
+    index.query, with the fused score in place of the similarity.
+    '''
+    def __init__(self, index, bm25, vector_k=20, lexical_k=20, rrf_k=60):
+        self.index = index
+        self.bm25 = bm25
+        self.vector_k = vector_k
+        self.lexical_k = lexical_k
+        self.rrf_k = rrf_k
+
+    def query(self, vector, text, top_k=3):
+        response = self.index.query(vector=vector, top_k=self.vector_k, include_metadata=True)
+        return self.fuse(response, text, top_k)
+
+    def fuse(self, response, text, top_k=3):
+        # Combine an existing vector response (e.g. from batch_query.search_many) with BM25 hits.
+        metadata = {}
+        vector_ranking = []
+        for match in to_result(text, response).matches:
+            vector_ranking.append(match.id)
+            metadata[match.id] = match.metadata
+        lexical_ranking = []
+        for vector_id, _, lexical_metadata in self.bm25.search(text, self.lexical_k):
+            lexical_ranking.append(vector_id)
+            metadata.setdefault(vector_id, lexical_metadata)
+
+        fused = reciprocal_rank_fusion([vector_ranking, lexical_ranking], self.rrf_k)[:top_k]
+        return QueryResponse(matches=[QueryMatch(id=vector_id, score=score, metadata=metadata[vector_id])
+                                      for vector_id, score in fused])
@@ -0,0 +1,41 @@
+import hashlib
+import sqlite3
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class IndexManifest:
+    '''
+    This class keeps a local SQLite record of which segment IDs are in the vector
+    index and the hash of the content they were embedded from, so a re-run only
+    has to embed new or changed segments and delete the ones that disappeared.
+    '''
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS segments (id TEXT PRIMARY KEY, hash TEXT NOT NULL)"
+        )
+        self.connection.commit()
+
+    def hashes(self):
+        # Return {segment_id: content_hash} for everything currently indexed.
+        return dict(self.connection.execute("SELECT id, hash FROM segments"))
+
+    def update(self, id_to_hash):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO segments (id, hash) VALUES (?, ?)", id_to_hash.items()
+            )
+
+    def remove(self, ids):
+        with self.connection:
+            self.connection.executemany("DELETE FROM segments WHERE id = ?", ((i,) for i in ids))
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM segments")
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,294 @@
+import contextlib
+import json
+import os
+import re
+import threading
+import uuid
+
+import numpy as np
+
+from ann_index import IVFPQIndex
+from quantization import dequantize, quantize, quantized_dot
+
+DATA_FILE = re.compile(r"(vectors|scales)(-[0-9a-f]+)?\.npy|ann(-[0-9a-f]+)?\.npz")
+# Data file names of indexes saved before ids.json recorded them.
+LEGACY_FILES = {"vectors": "vectors.npy", "scales": "scales.npy", "ann": "ann.npz"}
+
+
+class QueryMatch(dict):
+    '''
+    One query hit. Supports both match['metadata'] and match.metadata, like the
+    objects returned by pinecone.Index.query.
+    '''
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class QueryResponse(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class LocalIndex:
+    '''
+    In-process drop-in for pinecone.Index (upsert / query / delete) for corpora
+    that fit in memory. Vectors are L2-normalised and kept in one contiguous
+    matrix (float32 by default), so a query is a single matrix-vector product
+    followed by argpartition. save() writes the matrix as .npy, which load() memory-maps so
+    start-up does not depend on corpus size.
+    For millions of vectors pass ann=IVFPQIndex(...): once enough vectors are
+    upserted to train it, queries probe the ANN index for top_k * refine_factor
+    candidates and re-score only those exactly. nprobe and refine_factor are the
+    recall/latency knobs.
+    dtype="float16" or "int8" stores scalar-quantised vectors (with a float32
+    scale per vector) to cut memory by 2x or 4x.
+    `generation` is bumped on every write so caches of query results can tell
+    when the contents changed.
+    '''
+    def __init__(self, dimension, path=None, ann=None, refine_factor=10, dtype="float32"):
+        self.dimension = dimension
+        self.path = path
+        self.ann = ann
+        self.refine_factor = refine_factor
+        self.dtype = dtype
+        self.vectors = np.zeros((0, dimension), dtype=dtype)
+        self.scales = np.zeros(0, dtype=np.float32)
+        self.ids = []
+        self.metadata = []
+        self.rows = {}
+        self.generation = 0
+        self.lock = threading.RLock()
+        if path and os.path.exists(os.path.join(path, "ids.json")):
+            self._read(path)
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, "ids.json"), "r", encoding="utf-8") as file:
+            dimension = json.load(file)["dimension"]
+        return cls(dimension, path=path)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def _normalize(matrix):
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def _reserve(self, rows):
+        # Grow the backing matrix geometrically so repeated upserts stay amortised O(1).
+        capacity = self.vectors.shape[0]
+        if rows <= capacity and self.vectors.flags.writeable:
+            return
+        new_capacity = max(rows, capacity * 2, 1024)
+        grown = np.zeros((new_capacity, self.dimension), dtype=self.dtype)
+        grown[:len(self.ids)] = self.vectors[:len(self.ids)]
+        scales = np.zeros(new_capacity, dtype=np.float32)
+        scales[:len(self.ids)] = self.scales[:len(self.ids)]
+        self.vectors, self.scales = grown, scales
+
+    def _dense(self, rows):
+        # float32 copies of the stored (possibly quantised) rows.
+        return dequantize(self.vectors[rows], self.scales[rows])
+
+    def upsert(self, vectors, **kwargs):
+        # Accepts (id, values[, metadata]) tuples or {"id", "values", "metadata"} dicts.
+        records = []
+        for vector in vectors:
+            if isinstance(vector, dict):
+                records.append((vector["id"], vector["values"], vector.get("metadata") or {}))
+            else:
+                records.append((vector[0], vector[1], vector[2] if len(vector) > 2 else {}))
+        if not records:
+            return {"upserted_count": 0}
+
+        values = self._normalize(np.asarray([record[1] for record in records], dtype=np.float32))
+        codes, scales = quantize(values, self.dtype)
+        with self.lock:
+            self.generation += 1
+            self._reserve(len(self.ids) + len(records))
+            rows = {}
+            for (vector_id, _, metadata), vector, scale in zip(records, codes, scales):
+                row = self.rows.get(vector_id)
+                if row is None:
+                    row = len(self.ids)
+                    self.rows[vector_id] = row
+                    self.ids.append(vector_id)
+                    self.metadata.append(metadata)
+                else:
+                    self.metadata[row] = metadata
+                self.vectors[row] = vector
+                self.scales[row] = scale
+                rows[row] = None
+
+            if self.ann is not None:
+                if self.ann.trained:
+                    rows = sorted(rows)
+                    self.ann.set_rows(rows, self._dense(rows))
+                elif len(self.ids) >= self.ann.train_size:
+                    self.train_ann()
+        return {"upserted_count": len(records)}
+
+    def delete(self, ids=None, delete_all=False, **kwargs):
+        with self.lock:
+            self.generation += 1
+            if delete_all:
+                self.vectors = np.zeros((0, self.dimension), dtype=self.dtype)
+                self.scales = np.zeros(0, dtype=np.float32)
+                self.ids, self.metadata, self.rows = [], [], {}
+                if self.ann is not None:
+                    self.ann.clear()
+                return {}
+            self._reserve(len(self.ids))
+            for vector_id in ids or []:
+                row = self.rows.pop(vector_id, None)
+                if row is None:
+                    continue
+                # Move the last row into the hole to keep the matrix contiguous.
+                if self.ann is not None and self.ann.trained:
+                    self.ann.remove(row)
+                last = len(self.ids) - 1
+                if row != last:
+                    self.vectors[row] = self.vectors[last]
+                    self.scales[row] = self.scales[last]
+                    self.ids[row] = self.ids[last]
+                    self.metadata[row] = self.metadata[last]
+                    self.rows[self.ids[row]] = row
+                self.ids.pop()
+                self.metadata.pop()
+        return {}
+
+    def query(self, vector=None, top_k=10, include_metadata=False, include_values=False, nprobe=None, **kwargs):
+        query = self._normalize(np.asarray(vector, dtype=np.float32))
+        with self.lock:
+            count = len(self.ids)
+            if count == 0:
+                return QueryResponse(matches=[])
+            if self.ann is not None and self.ann.trained:
+                # Approximate candidates, re-scored exactly against the stored vectors
+                candidates, _ = self.ann.search(query, top_k * self.refine_factor, nprobe=nprobe)
+                candidate_scores = quantized_dot(self.vectors[candidates], self.scales[candidates], query)
+            else:
+                candidates = None
+                candidate_scores = quantized_dot(self.vectors[:count], self.scales[:count], query)
+            k = min(top_k, len(candidate_scores))
+            if k == 0:
+                return QueryResponse(matches=[])
+            top = np.argpartition(-candidate_scores, k - 1)[:k]
+            top = top[np.argsort(-candidate_scores[top])]
+            rows = top if candidates is None else candidates[top]
+            return QueryResponse(matches=[self._match(row, float(score), include_metadata, include_values)
+                                          for row, score in zip(rows, candidate_scores[top])])
+
+    def query_many(self, vectors, top_k=10, include_metadata=False, include_values=False, chunk_size=256, **kwargs):
+        # Answer many queries at once; the flat path scores each chunk with one matrix product.
+        queries = self._normalize(np.asarray(vectors, dtype=np.float32))
+        with self.lock:
+            count = len(self.ids)
+            if count == 0 or (self.ann is not None and self.ann.trained):
+                return [self.query(query, top_k, include_metadata, include_values, **kwargs) for query in queries]
+
+            k = min(top_k, count)
+            responses = []
+            for start in range(0, len(queries), chunk_size):
+                scores = quantized_dot(self.vectors[:count], self.scales[:count], queries[start:start + chunk_size]).T
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                top_scores = np.take_along_axis(scores, top, axis=1)
+                order = np.argsort(-top_scores, axis=1)
+                top = np.take_along_axis(top, order, axis=1)
+                top_scores = np.take_along_axis(top_scores, order, axis=1)
+                for rows, row_scores in zip(top, top_scores):
+                    responses.append(QueryResponse(matches=[
+                        self._match(row, float(score), include_metadata, include_values)
+                        for row, score in zip(rows, row_scores)
+                    ]))
+            return responses
+
+    def _match(self, row, score, include_metadata, include_values):
+        match = QueryMatch(id=self.ids[row], score=score)
+        if include_metadata:
+            match["metadata"] = self.metadata[row]
+        if include_values:
+            match["values"] = self._dense([row])[0].tolist()
+        return match
+
+    def train_ann(self):
+        # Train the ANN index on the stored vectors and encode all of them.
+        with self.lock:
+            count = len(self.ids)
+            vectors = self._dense(slice(0, count))
+            self.ann.train(vectors)
+            self.ann.clear()
+            self.ann.set_rows(np.arange(count), vectors)
+
+    def describe_index_stats(self):
+        return {"dimension": self.dimension, "total_vector_count": len(self.ids)}
+
+    def save(self, path=None):
+        path = path or self.path
+        os.makedirs(path, exist_ok=True)
+        with self.lock:
+            # Vectors, scales and the ANN index go to new files named for this save; ids.json names them and is
+            # swapped in last, so a reader or a crash sees either the old set or the new one, never a mix. A
+            # memory map of the previous vectors stays valid.
+            previous = self._files(path)
+            version = uuid.uuid4().hex[:12]
+            files = {"vectors": f"vectors-{version}.npy", "scales": f"scales-{version}.npy"}
+            np.save(os.path.join(path, files["vectors"]), self.vectors[:len(self.ids)])
+            np.save(os.path.join(path, files["scales"]), self.scales[:len(self.ids)])
+            if self.ann is not None and self.ann.trained:
+                files["ann"] = f"ann-{version}.npz"
+                self.ann.save(os.path.join(path, files["ann"]))
+            ids_path = os.path.join(path, "ids.json")
+            with open(ids_path + ".tmp", "w", encoding="utf-8") as file:
+                json.dump({"dimension": self.dimension, "dtype": self.dtype, "ids": self.ids,
+                           "metadata": self.metadata, "files": files}, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(ids_path + ".tmp", ids_path)
+            # Keep the set just replaced for readers that opened ids.json before the swap; drop anything older.
+            keep = set(files.values()) | set(previous.values())
+            for name in os.listdir(path):
+                if name not in keep and DATA_FILE.fullmatch(name):
+                    with contextlib.suppress(OSError):
+                        os.remove(os.path.join(path, name))
+
+    @staticmethod
+    def _files(path):
+        # Data files named by the current ids.json, if there is one.
+        try:
+            with open(os.path.join(path, "ids.json"), "r", encoding="utf-8") as file:
+                stored = json.load(file)
+        except FileNotFoundError:
+            return {}
+        return stored.get("files") or LEGACY_FILES
+
+    def flush(self):
+        # Persist to the configured path, if any; called by the uploaders after a run.
+        if self.path:
+            self.save()
+
+    def _read(self, path):
+        with open(os.path.join(path, "ids.json"), "r", encoding="utf-8") as file:
+            stored = json.load(file)
+        files = stored.get("files") or LEGACY_FILES
+        # Read-only memory map; the first write copies it into a growable array.
+        self.vectors = np.load(os.path.join(path, files["vectors"]), mmap_mode="r")
+        self.dtype = stored.get("dtype", "float32")
+        scales_path = os.path.join(path, files["scales"])
+        if os.path.exists(scales_path):
+            self.scales = np.load(scales_path)
+        else:
+            self.scales = np.ones(len(stored["ids"]), dtype=np.float32)
+        self.ids = stored["ids"]
+        self.metadata = stored["metadata"]
+        self.rows = {vector_id: row for row, vector_id in enumerate(self.ids)}
+        ann_path = os.path.join(path, files.get("ann", ""))
+        if files.get("ann") and os.path.exists(ann_path):
+            self.ann = IVFPQIndex.load(ann_path)
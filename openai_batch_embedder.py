@@ -0,0 +1,141 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import tiktoken
+except ImportError:  # fall back to a character-based estimate
+    tiktoken = None
+
+try:
+    import openai
+except ImportError:  # any client with embeddings.create will do
+    openai = None
+
+# Statuses worth retrying: timeout, conflict, rate limit; every 5xx is retried as well.
+RETRY_STATUSES = {408, 409, 429}
+
+
+def is_transient(error):
+    # Rate limits, timeouts, dropped connections and server errors; any other 4xx fails the same way again.
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRY_STATUSES or status >= 500
+    if openai is not None and isinstance(error, openai.APIConnectionError):
+        return True
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+class RateLimiter:
+    '''
+    Token-bucket limiter for an API that caps both requests per minute and
+    tokens per minute. acquire() blocks until both budgets allow the call.
+    '''
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.capacity = {"requests": float(requests_per_minute), "tokens": float(tokens_per_minute)}
+        self.available = dict(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+        for name, capacity in self.capacity.items():
+            self.available[name] = min(capacity, self.available[name] + elapsed * capacity / 60.0)
+
+    def acquire(self, tokens):
+        # A single request larger than the whole bucket is let through once the bucket is full.
+        tokens = min(tokens, self.capacity["tokens"])
+        while True:
+            with self.lock:
+                self._refill()
+                if self.available["requests"] >= 1 and self.available["tokens"] >= tokens:
+                    self.available["requests"] -= 1
+                    self.available["tokens"] -= tokens
+                    return
+                wait = max(
+                    (1 - self.available["requests"]) * 60.0 / self.capacity["requests"],
+                    (tokens - self.available["tokens"]) * 60.0 / self.capacity["tokens"],
+                )
+            time.sleep(max(wait, 0.001))
+
+
+class OpenAIBatchEmbedder:
+    '''
+    This class embeds many texts with as few embeddings.create calls as possible.
+    Texts are packed into requests bounded by `max_batch_tokens` and
+    `max_batch_items`, requests run concurrently under a RateLimiter, and each
+    result is mapped back to its input position through the response index.
+    '''
+    def __init__(self, client, model="text-embedding-ada-002", max_batch_tokens=8000, max_batch_items=2048,
+                 max_concurrency=4, requests_per_minute=3000, tokens_per_minute=1000000, max_retries=5):
+        self.client = client
+        self.model = model
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_items = max_batch_items
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.encoding = self._load_encoding(model)
+        self.requests_issued = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _load_encoding(model):
+        if tiktoken is None:
+            return None
+        try:
+            return tiktoken.encoding_for_model(model)
+        except Exception:
+            return None
+
+    def count_tokens(self, text):
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return len(text) // 4 + 1
+
+    def pack(self, texts):
+        # Group input positions into requests that respect the token and item budgets.
+        batches, batch, batch_tokens = [], [], 0
+        for position, text in enumerate(texts):
+            tokens = self.count_tokens(text)
+            if batch and (batch_tokens + tokens > self.max_batch_tokens or len(batch) >= self.max_batch_items):
+                batches.append((batch, batch_tokens))
+                batch, batch_tokens = [], 0
+            batch.append(position)
+            batch_tokens += tokens
+        if batch:
+            batches.append((batch, batch_tokens))
+        return batches
+
+    def _request(self, inputs, tokens):
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire(tokens)
+            with self.lock:
+                self.requests_issued += 1
+            try:
+                return self.client.embeddings.create(input=inputs, model=self.model)
+            except Exception as e:
+                if attempt == self.max_retries or not is_transient(e):
+                    raise
+                print(f"Embedding request failed ({e}); retrying")
+                time.sleep(random.uniform(0, 0.5 * (2 ** attempt)))
+
+    def embed(self, texts):
+        # Return one embedding per text, in input order.
+        texts = [text.replace("\n", " ") for text in texts]
+        embeddings = [None] * len(texts)
+
+        def run(batch):
+            positions, tokens = batch
+            response = self._request([texts[position] for position in positions], tokens)
+            for item in response.data:
+                embeddings[positions[item.index]] = item.embedding
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            # list() surfaces the first exception raised by any request
+            list(pool.map(run, self.pack(texts)))
+
+        return embeddings
@@ -0,0 +1,30 @@
+import re
+
+FIELD = re.compile(r"\{(\w+)\}")
+
+
+class PromptTemplate:
+    '''
+    A prompt with {field} placeholders, parsed once into literal segments and
+    field names. render() fills the fields with a single join, so a value that
+    itself contains "{context_text}" is inserted verbatim. A {word} render() is
+    not given a value for stays as literal text, as it did with str.replace.
+    With `count_tokens` (list_of_texts -> list_of_ints) the literal text is
+    counted once up front as `static_tokens`, for context budgeting to subtract.
+    '''
+    def __init__(self, template, count_tokens=None):
+        self.template = template
+        parts = FIELD.split(template)
+        self.literals = parts[0::2]
+        self.fields = parts[1::2]
+        self.static_tokens = sum(count_tokens(self.literals)) if count_tokens else None
+
+    def render(self, **values):
+        pieces = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            pieces.append(values[field] if field in values else f"{{{field}}}")
+            pieces.append(literal)
+        return "".join(pieces)
+
+    def __str__(self):
+        return self.template
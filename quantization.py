@@ -0,0 +1,36 @@
+import numpy as np
+
+DTYPES = ("float32", "float16", "int8")
+
+
+def quantize(vectors, dtype="float32"):
+    '''
+    Scalar-quantise a (n, dim) float array. Returns (codes, scales) where scales
+    holds one float32 factor per vector: 1.0 for float32/float16, and
+    max(|x|) / 127 for int8 so each vector uses the full int8 range.
+    '''
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype not in DTYPES:
+        raise ValueError(f"unsupported dtype {dtype!r}; expected one of {DTYPES}")
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=-1) / 127.0
+        scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        codes = np.clip(np.rint(vectors / scales[..., None]), -127, 127).astype(np.int8)
+        return codes, scales
+    return vectors.astype(dtype), np.ones(vectors.shape[:-1], dtype=np.float32)
+
+
+def dequantize(codes, scales):
+    return codes.astype(np.float32) * np.asarray(scales, dtype=np.float32)[..., None]
+
+
+def quantized_dot(codes, scales, queries, chunk_size=65536):
+    # Scores of quantized rows against one query (dim,) or many (q, dim), upcasting
+    # one chunk of rows at a time so memory stays bounded.
+    queries = np.asarray(queries, dtype=np.float32)
+    scores = np.empty((len(codes),) + queries.shape[:-1], dtype=np.float32)
+    for start in range(0, len(codes), chunk_size):
+        block = codes[start:start + chunk_size].astype(np.float32, copy=False)
+        scores[start:start + chunk_size] = block @ queries.T
+    scales = np.asarray(scales[:len(codes)], dtype=np.float32)
+    return scores * (scales[:, None] if queries.ndim == 2 else scales)
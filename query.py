@@ -3,21 +3,51 @@ from transformers import AutoTokenizer, AutoModel
 import numpy as np
 import pinecone
 
+from batch_query import search_many, to_result
+from embedding_engine import BatchEmbeddingEngine
+from hybrid_search import HybridRetriever
+
 class TextEmbeddingQuery:
     '''
     This class converts user input to embeeding and sends it to Pinecone to get the
     result using Hugging Face open source model_name = "bert-large-uncased-whole-word-masking-finetuned-squad"
+    With lexical_index=BM25Index(...) over the same chunks, results fuse BM25 and
+    vector rankings (hybrid_search.HybridRetriever). With reranker=CrossEncoderReranker(...),
+    fetch_k candidates are reordered by the cross-encoder before the top ones are kept.
     '''
-    def __init__(self, pinecone_api_key, pinecone_env, index_name, model_name):
-        # Initialize Pinecone
-        pinecone.init(api_key=pinecone_api_key, environment=pinecone_env)
-        self.index = pinecone.Index(index_name)
+    def __init__(self, pinecone_api_key, pinecone_env, index_name, model_name, embedding_cache=None, index=None,
+                 lexical_index=None, fetch_k=20, reranker=None):
+        # Use the supplied index (e.g. local_index.LocalIndex) or connect to Pinecone
+        if index is not None:
+            self.index = index
+        else:
+            pinecone.init(api_key=pinecone_api_key, environment=pinecone_env)
+            self.index = pinecone.Index(index_name)
 
         # Load the text embedding model (BERT fine-tuned for QA)
+        self.model_name = model_name
+        self.embedding_cache = embedding_cache
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         self.model = AutoModel.from_pretrained(model_name)
+        self.engine = BatchEmbeddingEngine(self.tokenizer, self.model)
+
+        # Hybrid retrieval over-fetches fetch_k candidates from each side before fusing
+        self.retriever = None
+        if lexical_index is not None:
+            self.retriever = HybridRetriever(self.index, lexical_index, vector_k=fetch_k, lexical_k=fetch_k)
+        self.reranker = reranker
+        self.fetch_k = fetch_k
 
     def generate_embedding(self, text):
+        # Repeat questions are answered from the embedding cache without a model call
+        if self.embedding_cache is not None:
+            return self.embedding_cache.embed(self.model_name, [text], self.compute_embeddings)[0]
+        return self.compute_embedding(text)
+
+    def compute_embeddings(self, texts):
+        return [self.compute_embedding(text) for text in texts]
+
+    def compute_embedding(self, text):
         inputs = self.tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=512)
         outputs = self.model(**inputs)
         embeddings = outputs.last_hidden_state.mean(dim=1).detach().numpy()
@@ -30,33 +60,49 @@ class TextEmbeddingQuery:
         if isinstance(user_embedding, np.ndarray):
             user_embedding = user_embedding.tolist()
 
-        query_result = self.index.query(
-            vector=user_embedding,
-            top_k=3,
-            include_metadata=True
-        )
+        # A reranker gets fetch_k candidates to choose the best 3 from
+        top_k = 3 if self.reranker is None else self.fetch_k
+        if self.retriever is not None:
+            query_result = self.retriever.query(user_embedding, user_input, top_k=top_k)
+        else:
+            query_result = self.index.query(
+                vector=user_embedding,
+                top_k=top_k,
+                include_metadata=True
+            )
+        if self.reranker is not None:
+            query_result = self.reranker.rerank(user_input, query_result, top_k=3)
 
         # Debug: Print raw query results
         print("Raw Query Results:", query_result)
 
-        # Filter results based on content
-        filtered_results = []
-        for match in query_result['matches']:
-            snippet = match['metadata'].get('text', '')
-            if "What is" in snippet or "How" in snippet:  # Adjusted criteria
-                filtered_results.append(match)
-
-        result_text = "Query Results:\n"  # Initialize result_text here
-        if not filtered_results:  # Fallback to top matches if no filtered results
-            for i, match in enumerate(query_result['matches'][:3]):  # Show top 3 matches
-                snippet = match['metadata'].get('text', '')
-                result_text += f"Match {i+1}: ID = {match['id']}, Score = {match['score']:.6f}, Snippet: {snippet}\n"
+        return to_result(user_input, query_result).format()
+
+
+    def query_batch(self, questions, top_k=3, batch_size=64):
+        '''
+        Embed all questions in batches and search them together. Returns one
+        batch_query.QueryResult per question; call str() on it for the text
+        that query() returns.
+        '''
+        questions = list(questions)
+        if self.embedding_cache is not None:
+            embeddings = self.embedding_cache.embed(
+                self.model_name, questions, lambda texts: self.engine.embed(texts, batch_size=batch_size))
         else:
-            for i, match in enumerate(filtered_results):
-                snippet = match['metadata'].get('text', '')
-                result_text += f"Match {i+1}: ID = {match['id']}, Score = {match['score']:.6f}, Snippet: {snippet}\n"
+            embeddings = self.engine.embed(questions, batch_size=batch_size)
 
-        return result_text
+        fetch_k = top_k if self.reranker is None else max(top_k, self.fetch_k)
+        if self.retriever is not None:
+            responses = search_many(self.index, embeddings, top_k=self.retriever.vector_k)
+            responses = [self.retriever.fuse(response, question, fetch_k)
+                         for question, response in zip(questions, responses)]
+        else:
+            responses = search_many(self.index, embeddings, top_k=fetch_k)
+        if self.reranker is not None:
+            responses = [self.reranker.rerank(question, response, top_k)
+                         for question, response in zip(questions, responses)]
+        return [to_result(question, response) for question, response in zip(questions, responses)]
 
 
 
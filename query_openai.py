@@ -3,23 +3,44 @@ from openai import OpenAI
 import pinecone
 import numpy as np
 
+from batch_query import search_many, to_result
+from openai_batch_embedder import OpenAIBatchEmbedder
+
 class TextEmbeddingQuery:
     '''
     This class uses OpenAI to convert user input text into embeeding,
     query the Pinecone Index to get the matching result. The embeedings are
     uploaded to PineCone using class EmbeddingUploader
     '''
-    def __init__(self, pinecone_api_key, pinecone_env, index_name, openai_api_key, model_name="text-embedding-ada-002"):
-        # Initialize Pinecone with the provided API key and environment, and create an index object.
-        pinecone.init(api_key=pinecone_api_key, environment=pinecone_env)
-        self.index = pinecone.Index(index_name)
+    def __init__(self, pinecone_api_key, pinecone_env, index_name, openai_api_key, model_name="text-embedding-ada-002",
+                 embedding_cache=None, index=None):
+        # Use the supplied index (e.g. a local_index.LocalIndex) if given; otherwise
+        # initialize Pinecone with the provided API key and environment.
+        if index is not None:
+            self.index = index
+        else:
+            pinecone.init(api_key=pinecone_api_key, environment=pinecone_env)
+            self.index = pinecone.Index(index_name)
 
         # Initialize the OpenAI client with the provided API key and set the model name for embeddings.
         openai.api_key = openai_api_key
         self.client = OpenAI()
         self.model_name = model_name
+        self.batch_embedder = OpenAIBatchEmbedder(self.client, model_name)
+
+        # Optional EmbeddingCache; repeat questions then cost no OpenAI call.
+        self.embedding_cache = embedding_cache
 
     def generate_embedding(self, text):
+        # Generate an embedding for the given text, from the cache when possible.
+        if self.embedding_cache is not None:
+            return self.embedding_cache.embed(self.model_name, [text], self.compute_embeddings)[0].tolist()
+        return self.compute_embedding(text)
+
+    def compute_embeddings(self, texts):
+        return [self.compute_embedding(text) for text in texts]
+
+    def compute_embedding(self, text):
         # Generate an embedding for the given text using the specified OpenAI model.
         text = text.replace("\n", " ")
         response = self.client.embeddings.create(input=[text], model=self.model_name)
@@ -40,13 +61,21 @@ class TextEmbeddingQuery:
             include_metadata=True
         )
 
-        # Format and return the query results.
-        result_text = "Query Results:\n"
-        for i, match in enumerate(query_result['matches']):
-            snippet = match['metadata'].get('text', '')
-            result_text += f"Match {i+1}: ID = {match['id']}, Score = {match['score']:.6f}, Snippet: {snippet}\n"
+        # Format and return the query results, with the same formatter as query.py and query_batch.
+        return to_result(user_input, query_result).format()
+
+    def query_batch(self, questions, top_k=3):
+        # Embed all questions with packed OpenAI requests and search them together.
+        # Returns one batch_query.QueryResult per question; str() gives the query() text.
+        questions = list(questions)
+        if self.embedding_cache is not None:
+            embeddings = [embedding.tolist() for embedding in
+                          self.embedding_cache.embed(self.model_name, questions, self.batch_embedder.embed)]
+        else:
+            embeddings = self.batch_embedder.embed(questions)
 
-        return result_text
+        responses = search_many(self.index, embeddings, top_k=top_k)
+        return [to_result(question, response) for question, response in zip(questions, responses)]
 
 # For local testing
 if __name__ == "__main__":
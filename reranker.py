@@ -0,0 +1,76 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import torch
+
+from batch_query import to_result
+from local_index import QueryMatch, QueryResponse
+
+
+class CrossEncoderReranker:
+    '''
+    Re-scores (question, chunk) pairs with a cross-encoder such as
+    "cross-encoder/ms-marco-MiniLM-L-6-v2" (AutoModelForSequenceClassification).
+    Candidates are scored in retrieval order, `batch_size` pairs per padded
+    forward pass. With `early_stop_gap`, scoring stops once the k-th best score
+    so far beats every score in the latest batch by that margin, since later,
+    lower-ranked candidates are then unlikely to make the cut. Pair scores are
+    kept in an LRU of `cache_size` entries.
+    '''
+    def __init__(self, tokenizer, model, batch_size=32, max_length=512, early_stop_gap=None, cache_size=10000):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.model.eval()
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.early_stop_gap = early_stop_gap
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.pairs_scored = 0
+
+    @staticmethod
+    def _key(question, text):
+        return hashlib.sha256(f"{question}\0{text}".encode("utf-8")).digest()
+
+    def score(self, question, texts):
+        # Scores for (question, text) pairs in one padded batch, cached pairs excluded.
+        keys = [self._key(question, text) for text in texts]
+        with self.lock:
+            scores = [self.cache.get(key) for key in keys]
+            for key, score in zip(keys, scores):
+                if score is not None:
+                    self.cache.move_to_end(key)
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            inputs = self.tokenizer([question] * len(missing), [texts[i] for i in missing], padding=True,
+                                    truncation="only_second", max_length=self.max_length, return_tensors="pt")
+            with torch.inference_mode():
+                logits = self.model(**inputs).logits
+            # Single-logit models give the relevance directly; two-class models the positive class.
+            values = (logits[:, 0] if logits.shape[-1] == 1 else logits[:, -1]).tolist()
+            with self.lock:
+                self.pairs_scored += len(missing)
+                for i, value in zip(missing, values):
+                    scores[i] = value
+                    self.cache[keys[i]] = value
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return scores
+
+    def rerank(self, question, response, top_k=3):
+        # Reorder an index response by cross-encoder score; returns a QueryResponse of top_k matches.
+        matches = to_result(question, response).matches
+        scored = []
+        for start in range(0, len(matches), self.batch_size):
+            batch = matches[start:start + self.batch_size]
+            batch_scores = self.score(question, [match.text for match in batch])
+            scored.extend(zip(batch_scores, batch))
+            if self.early_stop_gap is not None and len(scored) >= top_k:
+                kth_best = sorted((score for score, _ in scored), reverse=True)[top_k - 1]
+                if kth_best - max(batch_scores) >= self.early_stop_gap:
+                    break
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return QueryResponse(matches=[QueryMatch(id=match.id, score=score, metadata=match.metadata)
+                                      for score, match in scored[:top_k]])
@@ -1,9 +1,29 @@
 from transformers import AutoTokenizer
 from typing import List
 import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 import numpy as np
 
-import json
+from sage_payload import NpyDeserializer, NpySerializer, npy_size, pack_tokens
+
+# Error codes SageMaker runtime uses when an endpoint is over capacity.
+THROTTLE_CODES = {"ThrottlingException", "Throttling", "TooManyRequestsException", "ServiceUnavailable"}
+
+
+@dataclass
+class EmbeddingFailure:
+    # Placeholder returned by embed_docs_batched in place of a vector that could not be computed.
+    error: str
+
+
+def is_throttled(error):
+    # botocore ClientErrors carry the code in error.response; other clients only in the message.
+    code = ((getattr(error, "response", None) or {}).get("Error") or {}).get("Code", "")
+    return code in THROTTLE_CODES or "throttl" in str(error).lower()
+
 
 # EmbeddingCreator is a class designed to generate embeddings for a list of documents.
 # It utilizes a specified encoder model for generating embeddings and the Hugging Face AutoTokenizer
@@ -11,36 +31,143 @@ import json
 # into a list of numerical embeddings that represent the semantic content of each document.
 # This is useful for tasks like document similarity, clustering, or as input features for machine learning models.
 class EmbeddingCreator:
-    def __init__(self, encoder_model_predictor, model_name):
+    def __init__(self, encoder_model_predictor, model_name, embedding_cache=None, batch_size=16,
+                 max_payload_bytes=5 * 1024 * 1024, max_concurrency=4, max_retries=5, max_length=512,
+                 payload_format="json"):
         # Initializes the EmbeddingCreator with a specific encoder model and tokenizer.
         self.encoder = encoder_model_predictor
+        self.model_name = model_name
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
 
+        # Optional EmbeddingCache shared with the uploaders and query classes.
+        self.embedding_cache = embedding_cache
+
+        # Batched mode (embed_docs_batched): documents per request, request body limit
+        # (SageMaker real-time endpoints reject bodies over 6 MB), parallel requests and
+        # retries for throttled calls.
+        self.batch_size = batch_size
+        self.max_payload_bytes = max_payload_bytes
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.max_length = max_length
+
+        # payload_format="npy" sends (2, batch, seq) int32 token arrays and reads .npy
+        # responses instead of JSON lists; the endpoint must run sage_inference/inference.py.
+        # Endpoints deployed with POOLING=mean return one vector per document, which is used as is.
+        self.payload_format = payload_format
+        if payload_format == "npy":
+            self.encoder.serializer = NpySerializer()
+            self.encoder.deserializer = NpyDeserializer()
+
     def embed_docs(self, docs: List[str]) -> List[List[float]]:
         # Generates embeddings for a list of documents.
         all_embeddings = []
 
-        for doc in docs:
-            # Tokenize the document using the pre-initialized tokenizer.
-            inputs = self.tokenizer(doc, return_tensors="pt")
+        # Look every document up in the cache first; only misses reach the endpoint.
+        cached = self.embedding_cache.get_many(self.model_name, docs) if self.embedding_cache else [None] * len(docs)
 
-            # Convert tokenized input to lists for processing.
-            inputs_to_list = {key: value.tolist() for key, value in inputs.items()}
+        for doc, hit in zip(docs, cached):
+            if hit is not None:
+                all_embeddings.append(hit.tolist())
+                continue
 
-            # Prepare the payload, ensuring it's not double-serialized.
-            payload = {"inputs": inputs_to_list}
-
-            try:
-                # Use the encoder model to predict embeddings and average them to get a single embedding per document.
-                response = self.encoder.predict(payload)
-                embeddings = np.mean(np.array(response), axis=1)
-                all_embeddings.append(embeddings.tolist())
-            except Exception as e:
-                # Handle any errors that occur during the embedding process.
-                print(f"Error in embedding document: {e}")
+            embedding = self.embed_doc(doc)
+            if embedding is not None:
+                all_embeddings.append(embedding)
+                if self.embedding_cache is not None:
+                    self.embedding_cache.put_many(self.model_name, [doc], [embedding])
 
         if not all_embeddings:
             # Raise an exception if no embeddings were generated, indicating a failure in the process.
             raise Exception("No embeddings were generated due to errors.")
 
         return all_embeddings
+
+    def embed_doc(self, doc: str):
+        # Tokenize the document using the pre-initialized tokenizer.
+        inputs = self.tokenizer(doc, return_tensors="np")
+
+        # Build the JSON or npy request body for the configured payload format.
+        payload, _ = self._payload(inputs)
+
+        try:
+            # Use the encoder model to predict token embeddings and average them into one vector per document.
+            response = np.asarray(self.encoder.predict(payload), dtype=np.float32)
+            return self._mean_pool(response, inputs["attention_mask"])[0].tolist()
+        except Exception as e:
+            # Handle any errors that occur during the embedding process.
+            print(f"Error in embedding document: {e}")
+            return None
+
+    def embed_docs_batched(self, docs: List[str]) -> list:
+        # One entry per document, in input order: a vector or an EmbeddingFailure.
+        results = [None] * len(docs)
+        cached = self.embedding_cache.get_many(self.model_name, docs) if self.embedding_cache else [None] * len(docs)
+        for position, hit in enumerate(cached):
+            if hit is not None:
+                results[position] = hit.tolist()
+
+        misses = [position for position, hit in enumerate(cached) if hit is None]
+        if not misses:
+            return results
+
+        # Tokenize once without padding; similar lengths share a request so little padding is sent.
+        encoded = self.tokenizer([docs[position] for position in misses], truncation=True, max_length=self.max_length)
+        order = sorted(range(len(misses)), key=lambda i: len(encoded["input_ids"][i]))
+        batches = [order[start:start + self.batch_size] for start in range(0, len(order), self.batch_size)]
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            for outcomes in pool.map(lambda batch: self._embed_batch(encoded, batch), batches):
+                for i, outcome in outcomes:
+                    results[misses[i]] = outcome
+
+        if self.embedding_cache is not None:
+            done = [position for position in misses if not isinstance(results[position], EmbeddingFailure)]
+            self.embedding_cache.put_many(self.model_name, [docs[p] for p in done], [results[p] for p in done])
+        return results
+
+    def _embed_batch(self, encoded, batch):
+        # Return [(i, vector or EmbeddingFailure)]; batches over the payload limit are halved.
+        features = [{key: encoded[key][i] for key in encoded.keys()} for i in batch]
+        padded = self.tokenizer.pad(features, padding="longest", return_tensors="np")
+        payload, size = self._payload(padded)
+        if size > self.max_payload_bytes:
+            if len(batch) == 1:
+                return [(batch[0], EmbeddingFailure(f"payload of {size} bytes exceeds {self.max_payload_bytes}"))]
+            middle = len(batch) // 2
+            return self._embed_batch(encoded, batch[:middle]) + self._embed_batch(encoded, batch[middle:])
+
+        try:
+            response = np.asarray(self._predict(payload), dtype=np.float32)
+            vectors = self._mean_pool(response, padded["attention_mask"])
+        except Exception as e:
+            print(f"Error in embedding batch of {len(batch)} documents: {e}")
+            return [(i, EmbeddingFailure(str(e))) for i in batch]
+        return [(i, vector.tolist()) for i, vector in zip(batch, vectors)]
+
+    def _payload(self, inputs):
+        # Return (request body, approximate size in bytes) for tokenized inputs.
+        if self.payload_format == "npy":
+            tokens = pack_tokens(inputs["input_ids"], inputs["attention_mask"])
+            return tokens, npy_size(tokens)
+        payload = {"inputs": {key: value.tolist() for key, value in inputs.items()}}
+        return payload, len(json.dumps(payload))
+
+    def _predict(self, payload):
+        # Retry throttled calls with jittered exponential backoff; other errors fail the batch.
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.encoder.predict(payload)
+            except Exception as e:
+                if attempt == self.max_retries or not is_throttled(e):
+                    raise
+                time.sleep(random.uniform(0, 0.5 * (2 ** attempt)))
+
+    @staticmethod
+    def _mean_pool(hidden_states, attention_mask):
+        # Average (batch, seq, hidden) token states over real tokens; padding is masked out.
+        # A (batch, hidden) response was already pooled by the endpoint.
+        if hidden_states.ndim == 2:
+            return hidden_states
+        mask = attention_mask[..., None].astype(np.float32)
+        return (hidden_states * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1.0)
@@ -0,0 +1,47 @@
+# Custom handler for the Hugging Face SageMaker inference toolkit. Deploy it with
+# HuggingFaceModel(entry_point="inference.py", source_dir="sage_inference", ...).
+# Requests are either JSON ({"inputs": {"input_ids": [[...]], "attention_mask": [[...]]}})
+# or application/x-npy arrays of shape (2, batch, seq) holding IDs and mask.
+# With the POOLING=mean environment variable the endpoint returns one mean-pooled
+# vector per document instead of every token's hidden state.
+import io
+import json
+import os
+
+import numpy as np
+import torch
+from transformers import AutoModel
+
+NPY_CONTENT_TYPE = "application/x-npy"
+
+
+def model_fn(model_dir):
+    model = AutoModel.from_pretrained(model_dir)
+    model.eval()
+    return model
+
+
+def input_fn(input_data, content_type):
+    if content_type == NPY_CONTENT_TYPE:
+        tokens = np.load(io.BytesIO(input_data), allow_pickle=False)
+        return {"input_ids": tokens[0], "attention_mask": tokens[1]}
+    inputs = json.loads(input_data)["inputs"]
+    return {key: np.asarray(value) for key, value in inputs.items()}
+
+
+def predict_fn(data, model):
+    inputs = {key: torch.as_tensor(np.asarray(value, dtype=np.int64)) for key, value in data.items()}
+    with torch.inference_mode():
+        hidden = model(**inputs).last_hidden_state
+        if os.environ.get("POOLING", "none") == "mean":
+            mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            hidden = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1.0)
+    return hidden.numpy()
+
+
+def output_fn(prediction, accept):
+    if accept == NPY_CONTENT_TYPE:
+        buffer = io.BytesIO()
+        np.save(buffer, prediction.astype(np.float32), allow_pickle=False)
+        return buffer.getvalue()
+    return json.dumps(prediction.tolist())
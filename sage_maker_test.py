@@ -4,6 +4,10 @@ from sagemaker.huggingface import HuggingFacePredictor
 from sage_model_deploy import ModelDeploymentAndEndpointManager 
 from sage_embeed_creator import EmbeddingCreator
 from sage_query_processor import QueryProcessor
+from chunker import hf_token_counter
+from context_builder import ContextBuilder
+from prompt_template import PromptTemplate
+from transformers import AutoTokenizer
 from dotenv import load_dotenv 
 load_dotenv()
 from sagemaker.huggingface import HuggingFaceModel, get_huggingface_llm_image_uri
@@ -57,7 +61,7 @@ gpt2_predictor = HuggingFacePredictor(endpoint_name=gpt2_endpoint_name)
 index_name = 'kit'  # Replace with your Pinecone index name
 index = pinecone.Index(index_name)
 
-prompt_template = """
+prompt_template_text = """
 Answer the following QUESTION based on the CONTEXT_TEXT provided. If you do not know the answer and the CONTEXT_TEXT say "I don't know".
 
 CONTEXT_TEXT:
@@ -69,7 +73,13 @@ QUESTION:
 ANSWER:
 """
 
-query_processor = QueryProcessor(gpt2_predictor, index, prompt_template, embedding_creator)
+# Budget the prompt with GPT-2's own tokenizer: 1024 positions, 256 of them left for the answer.
+# The template's static tokens are counted once here and subtracted from every context budget.
+count_tokens = hf_token_counter(AutoTokenizer.from_pretrained("gpt2-medium"))
+prompt_template = PromptTemplate(prompt_template_text, count_tokens)
+context_builder = ContextBuilder(count_tokens)
+query_processor = QueryProcessor(gpt2_predictor, index, prompt_template, embedding_creator,
+                                 context_builder=context_builder, max_prompt_tokens=768)
 
 # Use the query_processor to process a query
 question = "How does Amazon SageMaker Canvas pricing work?"
@@ -12,7 +12,8 @@ class ModelDeploymentAndEndpointManager:
         self.minilm_endpoint_name = minilm_endpoint_name
         self.aws_role_arn = aws_role_arn
 
-    def deploy_model(self, hub_config, llm_image, endpoint_name, model_name):
+    def deploy_model(self, hub_config, llm_image, endpoint_name, model_name, entry_point=None, source_dir=None):
+      # entry_point="inference.py", source_dir="sage_inference" deploys the npy / pooling handler.
       sagemaker_client = boto3.client('sagemaker')
 
       # Check if the model already exists
@@ -26,6 +27,8 @@ class ModelDeploymentAndEndpointManager:
                   role=self.aws_role_arn,
                   image_uri=llm_image,
                   name=model_name,
+                  entry_point=entry_point,
+                  source_dir=source_dir,
                   sagemaker_session=sagemaker.Session()
             )
 
@@ -0,0 +1,42 @@
+import io
+
+import numpy as np
+
+NPY_CONTENT_TYPE = "application/x-npy"
+
+
+class NpySerializer:
+    '''
+    Writes numpy arrays as .npy bytes. Assign to predictor.serializer; it follows
+    the sagemaker.serializers interface (CONTENT_TYPE, serialize) and so works
+    with any SDK version and with stub predictors.
+    '''
+    CONTENT_TYPE = NPY_CONTENT_TYPE
+
+    def serialize(self, data):
+        buffer = io.BytesIO()
+        np.save(buffer, np.asarray(data), allow_pickle=False)
+        return buffer.getvalue()
+
+
+class NpyDeserializer:
+    '''
+    Reads .npy response bodies into numpy arrays; assign to predictor.deserializer.
+    '''
+    ACCEPT = (NPY_CONTENT_TYPE,)
+
+    def deserialize(self, stream, content_type):
+        try:
+            return np.load(io.BytesIO(stream.read()), allow_pickle=False)
+        finally:
+            stream.close()
+
+
+def pack_tokens(input_ids, attention_mask):
+    # One int32 array of shape (2, batch, seq): input IDs, then the attention mask.
+    return np.stack([np.asarray(input_ids), np.asarray(attention_mask)]).astype(np.int32)
+
+
+def npy_size(array):
+    # Bytes np.save writes for an array: the data plus a header of at most 128 bytes.
+    return array.nbytes + 128
@@ -1,31 +1,233 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import List
 
+from context_builder import ContextBuilder
+from prompt_template import PromptTemplate
+
 class QueryProcessor:
-    def __init__(self, llm_predictor, index, prompt_template, embedding_creator):
+    '''
+    Retrieval-augmented generation over an embedder, a vector index and an LLM
+    predictor. rag_query answers one question with blocking calls; arag_query
+    does the same on an event loop, and arag_query_many answers many questions
+    concurrently while capping in-flight calls per backend.
+    With answer_cache=SemanticCache(...), a question close enough to one
+    answered before is served from the cache right after it is embedded.
+    Cached answers are invalidated by the index's `generation`, which only a
+    LocalIndex has, and which only counts writes made through that object: for
+    Pinecone, or a LocalIndex rebuilt by another process, stale answers can be
+    served until they expire (SemanticCache.ungenerated_ttl for Pinecone, ttl
+    otherwise), unless answer_cache.invalidate() is called after the upload.
+    rag_query_stream / arag_query_stream yield the answer token by token when
+    the LLM client has a stream() method (tgi_stream.SageMakerStreamingLLM).
+    With reranker=CrossEncoderReranker(...), fetch_k candidates are retrieved
+    and the top_k best by cross-encoder score go into the prompt.
+    With memory=ConversationMemory(...), calls that pass a session_id fill the
+    template's {history_text} field with that session's bounded history and
+    record the new turn; the answer cache is only used for a session's first
+    question, since follow-ups depend on the history. The async paths run the
+    memory calls (store reads and writes, summaries) on the pool, at most
+    `memory_concurrency` at a time.
+    '''
+    def __init__(self, llm_predictor, index, prompt_template, embedding_creator,
+                 embed_concurrency=8, index_concurrency=16, llm_concurrency=4, answer_cache=None,
+                 context_builder=None, max_prompt_tokens=None, reranker=None, top_k=5, fetch_k=20,
+                 rerank_concurrency=2, memory=None, memory_concurrency=8):
         self.llm = llm_predictor
         self.index = index
-        self.prompt_template = prompt_template
         self.embedding_creator = embedding_creator
+        self.answer_cache = answer_cache
+        # Token-budgeted context assembly; give it the LLM's tokenizer for exact budgets.
+        self.context_builder = context_builder or ContextBuilder()
+
+        # Parsed once; plain strings are compiled with the context builder's token counter.
+        if not isinstance(prompt_template, PromptTemplate):
+            prompt_template = PromptTemplate(prompt_template, self.context_builder.count_tokens)
+        self.prompt_template = prompt_template
+        # With max_prompt_tokens, the context gets whatever the template and question leave over.
+        self.max_prompt_tokens = max_prompt_tokens
+        self.reranker = reranker
+        self.top_k = top_k
+        self.fetch_k = fetch_k
+        self.memory = memory
+
+        # Per-backend limits for the async path; blocking clients run on a pool sized to match.
+        self.concurrency = {"embed": embed_concurrency, "index": index_concurrency, "llm": llm_concurrency,
+                            "rerank": rerank_concurrency, "memory": memory_concurrency}
+        self.executor = ThreadPoolExecutor(max_workers=sum(self.concurrency.values()), thread_name_prefix="rag")
+        self._loop = None
+        self._semaphores = {}
+
+    def rag_query(self, question_text: str, session_id=None) -> str:
+        start = time.perf_counter()
+        query_vec = self.embedding_creator.embed_docs([question_text])[0]
+        history = self._history(session_id)
+        answer = self._cached_answer(question_text, query_vec, start, history)
+        if answer is not None:
+            self._remember(session_id, question_text, answer)
+            return answer
+        res = self.retrieve(question_text, query_vec)
+        out = self.llm.predict({"inputs": self.build_prompt(question_text, res, history)})
+        return self._store_answer(question_text, query_vec, out[0]["generated_text"], start, session_id, history)
+
+    async def arag_query(self, question_text: str, session_id=None) -> str:
+        # Same steps as rag_query without blocking the event loop.
+        start = time.perf_counter()
+        query_vec = (await self._call("embed", self.embedding_creator, "aembed_docs", "embed_docs", [question_text]))[0]
+        history = await self._ahistory(session_id)
+        answer = self._cached_answer(question_text, query_vec, start, history)
+        if answer is None:
+            res = await self._aretrieve(question_text, query_vec)
+            out = await self._call("llm", self.llm, "apredict", "predict",
+                                   {"inputs": self.build_prompt(question_text, res, history)})
+            answer = self._cache_answer(question_text, query_vec, out[0]["generated_text"], start, history)
+        await self._aremember(session_id, question_text, answer)
+        return answer
+
+    async def arag_query_many(self, questions: List[str], return_exceptions=False, session_ids=None) -> list:
+        # Answers in question order; the per-backend semaphores bound the actual concurrency.
+        session_ids = session_ids or [None] * len(questions)
+        return await asyncio.gather(*(self.arag_query(question, session_id)
+                                      for question, session_id in zip(questions, session_ids)),
+                                    return_exceptions=return_exceptions)
 
-    def rag_query(self, question_text: str) -> str:
+    def rag_query_stream(self, question_text: str, session_id=None):
+        # Yield answer tokens as the LLM generates them; a cached answer comes as one piece.
+        start = time.perf_counter()
         query_vec = self.embedding_creator.embed_docs([question_text])[0]
-        res = self.index.query(query_vec, top_k=5, include_metadata=True)
+        history = self._history(session_id)
+        answer = self._cached_answer(question_text, query_vec, start, history)
+        if answer is not None:
+            self._remember(session_id, question_text, answer)
+            yield answer
+            return
+        res = self.retrieve(question_text, query_vec)
+        pieces = []
+        for token in self.llm.stream({"inputs": self.build_prompt(question_text, res, history)}):
+            pieces.append(token)
+            yield token
+        self._store_answer(question_text, query_vec, "".join(pieces), start, session_id, history)
+
+    async def arag_query_stream(self, question_text: str, session_id=None):
+        # Async generator version of rag_query_stream; holds an LLM slot while tokens are streamed.
+        start = time.perf_counter()
+        query_vec = (await self._call("embed", self.embedding_creator, "aembed_docs", "embed_docs", [question_text]))[0]
+        history = await self._ahistory(session_id)
+        answer = self._cached_answer(question_text, query_vec, start, history)
+        if answer is not None:
+            await self._aremember(session_id, question_text, answer)
+            yield answer
+            return
+        res = await self._aretrieve(question_text, query_vec)
+        pieces = []
+        async with self._limit("llm"):
+            async for token in self._astream({"inputs": self.build_prompt(question_text, res, history)}):
+                pieces.append(token)
+                yield token
+        answer = self._cache_answer(question_text, query_vec, "".join(pieces), start, history)
+        await self._aremember(session_id, question_text, answer)
+
+    def retrieve(self, question_text, query_vec):
+        # Over-fetch and rerank when a reranker is set, otherwise take the index's top_k as is.
+        if self.reranker is None:
+            return self.index.query(query_vec, top_k=self.top_k, include_metadata=True)
+        res = self.index.query(query_vec, top_k=self.fetch_k, include_metadata=True)
+        return self.reranker.rerank(question_text, res, top_k=self.top_k)
+
+    async def _aretrieve(self, question_text, query_vec):
+        top_k = self.top_k if self.reranker is None else self.fetch_k
+        res = await self._call("index", self.index, "aquery", "query", query_vec, top_k=top_k, include_metadata=True)
+        if self.reranker is None:
+            return res
+        return await self._call("rerank", self.reranker, "arerank", "rerank", question_text, res, top_k=self.top_k)
+
+    async def _astream(self, data):
+        # Use the client's async generator if it has one, otherwise pull the blocking stream on the pool.
+        method = getattr(self.llm, "astream", None)
+        if method is not None:
+            async for token in method(data):
+                yield token
+            return
+        loop = asyncio.get_running_loop()
+        tokens = iter(self.llm.stream(data))
+        done = object()
+        while True:
+            token = await loop.run_in_executor(self.executor, next, tokens, done)
+            if token is done:
+                return
+            yield token
+
+    def _history(self, session_id):
+        if self.memory is None or session_id is None:
+            return ""
+        return self.memory.history(session_id)
+
+    async def _ahistory(self, session_id):
+        # Loading a session may hit the store, so the async paths run it on the pool like any other backend.
+        if self.memory is None or session_id is None:
+            return ""
+        return await self._call("memory", self.memory, "ahistory", "history", session_id)
+
+    def _cached_answer(self, question_text, query_vec, start, history=""):
+        if self.answer_cache is None or history:
+            return None
+        # Indexes with a generation counter (LocalIndex) invalidate answers when they change.
+        answer = self.answer_cache.get(query_vec, getattr(self.index, "generation", None))
+        if answer is not None:
+            self.answer_cache.record(True, time.perf_counter() - start)
+        return answer
+
+    def _cache_answer(self, question_text, query_vec, answer, start, history=""):
+        if self.answer_cache is not None and not history:
+            self.answer_cache.put(question_text, query_vec, answer, getattr(self.index, "generation", None))
+            self.answer_cache.record(False, time.perf_counter() - start)
+        return answer
+
+    def _store_answer(self, question_text, query_vec, answer, start, session_id=None, history=""):
+        self._cache_answer(question_text, query_vec, answer, start, history)
+        self._remember(session_id, question_text, answer)
+        return answer
+
+    def _remember(self, session_id, question_text, answer):
+        if self.memory is not None and session_id is not None:
+            self.memory.add_turn(session_id, question_text, answer)
+
+    async def _aremember(self, session_id, question_text, answer):
+        # add_turn may call the summarizer and flush to the store; keep both off the event loop.
+        if self.memory is not None and session_id is not None:
+            await self._call("memory", self.memory, "aadd_turn", "add_turn", session_id, question_text, answer)
+
+    def build_prompt(self, question_text, res, history=""):
         contexts = [match.metadata['text'] for match in res.matches]
-        context_str = self.construct_context(contexts)
-        text_input = self.prompt_template.replace("{context_text}", context_str).replace("{question_text}", question_text)
-        out = self.llm.predict({"inputs": text_input})
-        return out[0]["generated_text"]
-
-    def construct_context(self, contexts: List[str], max_section_len=1000) -> str:
-        chosen_sections = []
-        chosen_sections_len = 0
-
-        for text in contexts:
-            text = text.strip()
-            chosen_sections_len += len(text) + 2
-            if chosen_sections_len > max_section_len:
-                break
-            chosen_sections.append(text)
-
-        concatenated_doc = "\n".join(chosen_sections)
-        return concatenated_doc
+        max_tokens = None
+        if self.max_prompt_tokens is not None:
+            # The question and the conversation history come out of the context's share.
+            texts = [question_text, history] if history else [question_text]
+            question_tokens = sum(self.context_builder.count_tokens(texts))
+            max_tokens = max(self.max_prompt_tokens - (self.prompt_template.static_tokens or 0) - question_tokens, 0)
+        context_str = self.construct_context(contexts, [match.score for match in res.matches], max_tokens)
+        return self.prompt_template.render(context_text=context_str, question_text=question_text,
+                                           history_text=history)
+
+    async def _call(self, backend, client, async_name, sync_name, *args, **kwargs):
+        # Await the client's native coroutine if it has one, otherwise run the blocking call on the pool.
+        async with self._limit(backend):
+            method = getattr(client, async_name, None)
+            if method is not None:
+                return await method(*args, **kwargs)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, partial(getattr(client, sync_name), *args, **kwargs))
+
+    def _limit(self, backend):
+        # Semaphores belong to one event loop, so they are recreated when the loop changes.
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphores = {name: asyncio.Semaphore(limit) for name, limit in self.concurrency.items()}
+        return self._semaphores[backend]
+
+    def construct_context(self, contexts: List[str], scores=None, max_tokens=None) -> str:
+        # Deduplicated chunks packed into the token budget, most relevant first.
+        return self.context_builder.build(contexts, scores, max_tokens=max_tokens)
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticCache:
+    '''
+    Answer cache keyed by question embedding. get() returns the answer of the
+    most similar cached question if its cosine similarity is at least
+    `threshold`, so rephrased questions skip retrieval and generation. Entries
+    expire after `ttl` seconds, the least recently used one is evicted beyond
+    `max_entries`, and entries stored under an older index generation (see
+    LocalIndex.generation) are dropped on lookup. Answers stored without a
+    generation (a Pinecone index, whose changes the cache cannot see) expire
+    after `ungenerated_ttl` seconds instead; call invalidate() after a
+    re-upload to drop them at once.
+    '''
+    def __init__(self, dimension, threshold=0.95, ttl=3600, max_entries=1024, ungenerated_ttl=300):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.ungenerated_ttl = ungenerated_ttl
+        self.max_entries = max_entries
+        # One row per slot; freed slots are zeroed so they can never match.
+        self.vectors = np.zeros((max_entries, dimension), dtype=np.float32)
+        self.entries = OrderedDict()
+        self.free = list(range(max_entries - 1, -1, -1))
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+
+    def get(self, vector, generation=None):
+        # Return the cached answer for the closest question above the threshold, or None.
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / max(np.linalg.norm(query), 1e-12)
+        now = time.monotonic()
+        with self.lock:
+            if not self.entries:
+                return None
+            scores = self.vectors @ query
+            for slot in np.argsort(-scores):
+                if scores[slot] < self.threshold:
+                    return None
+                entry = self.entries.get(int(slot))
+                if entry is None:
+                    continue
+                if entry["expires"] < now or entry["generation"] != generation:
+                    self._drop(int(slot))
+                    continue
+                self.entries.move_to_end(int(slot))
+                return entry["answer"]
+        return None
+
+    def put(self, question, vector, answer, generation=None):
+        vector = np.asarray(vector, dtype=np.float32)
+        with self.lock:
+            if not self.free:
+                self._drop(next(iter(self.entries)))
+            slot = self.free.pop()
+            ttl = self.ttl if generation is not None else min(self.ttl, self.ungenerated_ttl)
+            self.vectors[slot] = vector / max(np.linalg.norm(vector), 1e-12)
+            self.entries[slot] = {"question": question, "answer": answer, "generation": generation,
+                                  "expires": time.monotonic() + ttl}
+
+    def invalidate(self):
+        # Forget every answer, e.g. after rebuilding an index that has no generation counter.
+        with self.lock:
+            for slot in list(self.entries):
+                self._drop(slot)
+
+    def _drop(self, slot):
+        del self.entries[slot]
+        self.vectors[slot] = 0.0
+        self.free.append(slot)
+
+    def record(self, hit, seconds):
+        # Latency counters, updated by QueryProcessor for every answered question.
+        with self.lock:
+            if hit:
+                self.hits += 1
+                self.hit_seconds += seconds
+            else:
+                self.misses += 1
+                self.miss_seconds += seconds
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "avg_hit_ms": 1000 * self.hit_seconds / self.hits if self.hits else 0.0,
+            "avg_miss_ms": 1000 * self.miss_seconds / self.misses if self.misses else 0.0,
+        }
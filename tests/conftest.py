@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The modules under test live at the repository root; the stand-in clients in benchmarks/stubs.py.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.append(os.path.join(REPO_ROOT, "benchmarks"))
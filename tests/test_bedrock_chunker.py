@@ -0,0 +1,14 @@
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BEDROCK_SRC = os.path.join(REPO_ROOT, "bedrock", "src")
+
+
+def test_bedrock_chunker_is_the_root_chunker():
+    # bedrock/src links to chunker.py instead of keeping a copy that could drift.
+    assert os.path.realpath(os.path.join(BEDROCK_SRC, "chunker.py")) == os.path.join(REPO_ROOT, "chunker.py")
+    result = subprocess.run([sys.executable, "-c", "import chunker; print(chunker.TokenChunker.__name__)"],
+                            cwd=BEDROCK_SRC, capture_output=True, text=True)
+    assert result.stdout.strip() == "TokenChunker", result.stderr
@@ -0,0 +1,77 @@
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bedrock", "src"))
+
+from chunk_app import LambdaToEKSFileProcessor  # noqa: E402
+
+BROKEN = "file_3.csv"
+
+
+class EKSStub(BaseHTTPRequestHandler):
+    # Answers 503 to the first attempt of every request and to every request that carries BROKEN.
+    protocol_version = "HTTP/1.1"
+    lock = threading.Lock()
+    attempts = {}
+    headers_seen = []
+    accepted = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        files = body["files"] if self.path.endswith("/bulk") else [body]
+        keys = tuple(reference["object_key"] for reference in files)
+        with self.lock:
+            self.headers_seen.append(self.headers["Authorization"])
+            self.attempts[keys] = self.attempts.get(keys, 0) + 1
+            failed = self.attempts[keys] == 1 or BROKEN in keys
+            if not failed:
+                self.accepted.extend(keys)
+        self.send_response(503 if failed else 200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    EKSStub.attempts, EKSStub.headers_seen, EKSStub.accepted = {}, [], []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EKSStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/process"
+    server.shutdown()
+    server.server_close()
+
+
+def make_event(count):
+    return {"Records": [{"s3": {"bucket": {"name": "bucket"}, "object": {"key": f"file_{i}.csv"}}}
+                        for i in range(count)]}
+
+
+@pytest.mark.parametrize("bulk", [False, True])
+def test_retries_5xx_and_fails_with_exactly_the_undelivered_keys(stub, bulk):
+    processor = LambdaToEKSFileProcessor(stub, "secret", batch_mode=True, bulk_url=f"{stub}/bulk" if bulk else None,
+                                         bulk_size=2, max_retries=2, backoff_factor=0.01)
+
+    with pytest.raises(RuntimeError) as error:
+        processor.lambda_handler(make_event(6), None)
+
+    # In bulk mode file_2.csv shares its request with the broken file, so it is not delivered either.
+    undelivered = ["file_2.csv", BROKEN] if bulk else [BROKEN]
+    assert str(error.value).endswith(str(undelivered))
+    assert sorted(EKSStub.accepted) == sorted({f"file_{i}.csv" for i in range(6)} - set(undelivered))
+    assert all(attempts == 3 for keys, attempts in EKSStub.attempts.items() if BROKEN in keys)
+    assert set(EKSStub.headers_seen) == {"Bearer secret"}
+
+
+def test_all_delivered_returns_the_count(stub):
+    processor = LambdaToEKSFileProcessor(stub, "secret", batch_mode=True, bulk_url=f"{stub}/bulk",
+                                         backoff_factor=0.01)
+    assert processor.lambda_handler(make_event(3), None) == {"dispatched": 3}
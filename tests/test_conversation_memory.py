@@ -0,0 +1,47 @@
+import threading
+
+from conversation_memory import ConversationMemory, SQLiteConversationStore
+
+
+class BlockingSummarizer:
+    # Holds the first call until released, standing in for a slow LLM summary.
+    def __init__(self):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, summary, question, answer):
+        self.entered.set()
+        self.release.wait(5)
+        return f"{summary} {question}".strip()
+
+
+def test_slow_summary_does_not_block_other_sessions():
+    summarizer = BlockingSummarizer()
+    memory = ConversationMemory(window=1, summarizer=summarizer)
+    memory.add_turn("slow", "q0", "a0")
+    worker = threading.Thread(target=memory.add_turn, args=("slow", "q1", "a1"))
+    worker.start()
+    assert summarizer.entered.wait(5)
+
+    memory.add_turn("fast", "hello", "hi")
+    memory.flush()
+    assert memory.history("fast") == "User: hello\nAssistant: hi"
+
+    summarizer.release.set()
+    worker.join(5)
+    assert memory.history("slow") == "Summary of earlier conversation: q0\nUser: q1\nAssistant: a1"
+
+
+def test_evicted_session_reloads_its_pending_turns():
+    memory = ConversationMemory(store=SQLiteConversationStore(), window=2, max_sessions=1, flush_every=100)
+    memory.add_turn("a", "q0", "a0")
+    memory.add_turn("a", "q1", "a1")
+    memory.add_turn("a", "q2", "a2")
+    memory.add_turn("b", "q", "a")
+
+    assert memory.history("a").endswith("User: q1\nAssistant: a1\nUser: q2\nAssistant: a2")
+    memory.add_turn("a", "q3", "a3")
+    memory.flush()
+    _, summarised, turns = memory.store.load("a", 10)
+    assert summarised == 2
+    assert [turn for turn, _, _ in turns] == [0, 1, 2, 3]
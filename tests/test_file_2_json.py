@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bedrock", "src"))
+
+import file_2_json  # noqa: E402
+
+
+class RecordingS3:
+    def __init__(self):
+        self.keys = []
+
+    def upload_file(self, path, bucket, key, Config=None):
+        self.keys.append(key)
+
+
+def test_failed_files_are_named(tmp_path):
+    (tmp_path / "good.csv").write_text("question,answer\nq,a\n", encoding="utf-8")
+    (tmp_path / "bad.xml").write_text("<faqs><faq>", encoding="utf-8")
+    s3 = RecordingS3()
+
+    with pytest.raises(RuntimeError, match=r"\['bad.xml'\]"):
+        file_2_json.process_files_parallel(str(tmp_path), "bucket", max_workers=1, s3=s3)
+    assert len(s3.keys) == 1 and s3.keys[0].startswith("good.csv-")
@@ -0,0 +1,41 @@
+from hybrid_search import BM25Index
+from local_index import LocalIndex
+from upload_pipeline import incremental_upsert, prepare_manifest, sync_lexical_index
+
+DIMENSION = 4
+
+
+def embed_batch(texts):
+    return [[float(len(text)), 1.0, 0.0, 0.0] for text in texts]
+
+
+def test_search_keeps_the_postings_it_read():
+    bm25 = BM25Index()
+    bm25.upsert([("a", "sagemaker endpoint", {}), ("b", "pinecone index", {})])
+
+    class ResetOnRead(dict):
+        # An upsert from another thread lands between two term lookups of one search.
+        def get(self, term, default=None):
+            bm25.postings = None
+            return super().get(term, default)
+
+    bm25.postings = ResetOnRead(bm25._build())
+    assert {vector_id for vector_id, _, _ in bm25.search("pinecone endpoint")} == {"a", "b"}
+
+
+def test_upload_keeps_lexical_index_in_step(tmp_path):
+    index = LocalIndex(DIMENSION)
+    bm25 = BM25Index()
+    manifest = prepare_manifest(str(tmp_path / "manifest.sqlite3"), incremental=False, fresh_index=True)
+    first = [("faq_0", "sagemaker endpoint", {"text": "sagemaker endpoint"}),
+             ("faq_1", "pinecone index", {"text": "pinecone index"})]
+    incremental_upsert(index, sync_lexical_index(iter(first), bm25), embed_batch, manifest)
+    assert sorted(bm25.ids) == ["faq_0", "faq_1"]
+
+    second = [("faq_0", "sagemaker serverless endpoint", {"text": "sagemaker serverless endpoint"})]
+    summary = incremental_upsert(index, sync_lexical_index(iter(second), bm25), embed_batch, manifest)
+
+    assert summary.deleted_ids == ["faq_1"]
+    assert bm25.ids == index.ids == ["faq_0"]
+    assert [vector_id for vector_id, _, _ in bm25.search("serverless")] == ["faq_0"]
+    assert bm25.search("pinecone") == []
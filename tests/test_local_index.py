@@ -0,0 +1,50 @@
+import json
+import os
+
+import numpy as np
+
+from local_index import LocalIndex
+
+DIMENSION = 4
+
+
+def vectors(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [(f"v{i}", rng.standard_normal(DIMENSION).tolist(), {"text": f"t{i}"}) for i in range(count)]
+
+
+def test_save_swaps_in_a_consistent_set(tmp_path):
+    path = str(tmp_path / "index")
+    index = LocalIndex(DIMENSION, path=path, dtype="int8")
+    index.upsert(vectors(3))
+    index.save()
+    reader = LocalIndex.load(path)
+    first = json.load(open(os.path.join(path, "ids.json")))["files"]
+
+    index.upsert(vectors(5, seed=1))
+    index.save()
+    index.upsert(vectors(7, seed=2))
+    index.save()
+
+    reloaded = LocalIndex.load(path)
+    assert len(reloaded) == 7 and len(reloaded.vectors) == 7 and len(reloaded.scales) == 7
+    # Only the current set and the one before it stay on disk; the map held by the old reader is untouched.
+    assert not any(os.path.exists(os.path.join(path, name)) for name in first.values())
+    assert len([name for name in os.listdir(path) if name.startswith("vectors")]) == 2
+    assert len(reader.query(vector=vectors(1)[0][1], top_k=1)["matches"]) == 1
+
+
+def test_load_reads_indexes_saved_with_fixed_names(tmp_path):
+    path = str(tmp_path / "index")
+    os.makedirs(path)
+    np.save(os.path.join(path, "vectors.npy"), np.eye(2, DIMENSION, dtype=np.float32))
+    with open(os.path.join(path, "ids.json"), "w", encoding="utf-8") as file:
+        json.dump({"dimension": DIMENSION, "ids": ["a", "b"], "metadata": [{}, {}]}, file)
+
+    index = LocalIndex.load(path)
+    assert index.query(vector=[0, 1, 0, 0], top_k=1)["matches"][0]["id"] == "b"
+    index.save()
+    assert os.path.exists(os.path.join(path, "vectors.npy"))
+    index.save()
+    assert not os.path.exists(os.path.join(path, "vectors.npy"))
+    assert len(LocalIndex.load(path)) == 2
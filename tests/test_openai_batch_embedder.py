@@ -0,0 +1,101 @@
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from openai import OpenAI
+
+import openai_batch_embedder
+from openai_batch_embedder import OpenAIBatchEmbedder, RateLimiter, is_transient
+from stubs import MockEmbeddingsServer, fake_embedding
+
+DIMENSION = 8
+TEXTS = [f"segment {i} " + "word " * (i % 5) for i in range(12)]
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(openai_batch_embedder.time, "sleep", lambda seconds: None)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class ShuffledClient:
+    # embeddings.create returns the items out of order; `errors` are raised by the first calls.
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.calls = []
+        self.lock = threading.Lock()
+        self.random = random.Random(0)
+        self.embeddings = self
+
+    def create(self, input, model):
+        with self.lock:
+            self.calls.append(list(input))
+            if self.errors:
+                raise self.errors.pop(0)
+            data = [SimpleNamespace(index=i, embedding=fake_embedding(text, DIMENSION)) for i, text in enumerate(input)]
+            self.random.shuffle(data)
+        return SimpleNamespace(data=data)
+
+
+def make_embedder(client, **kwargs):
+    embedder = OpenAIBatchEmbedder(client, **kwargs)
+    # Character-based token counts, so batch sizes do not depend on tiktoken being installed.
+    embedder.encoding = None
+    return embedder
+
+
+def test_out_of_order_items_map_back_to_their_input():
+    client = ShuffledClient()
+    embeddings = make_embedder(client, max_batch_items=5).embed(TEXTS)
+
+    assert len(client.calls) == 3
+    assert embeddings == [fake_embedding(text, DIMENSION) for text in TEXTS]
+
+
+def test_pack_respects_token_and_item_budgets():
+    embedder = make_embedder(ShuffledClient(), max_batch_tokens=10, max_batch_items=3)
+    batches = embedder.pack(TEXTS)
+
+    assert [position for positions, _ in batches for position in positions] == list(range(len(TEXTS)))
+    for positions, tokens in batches:
+        assert len(positions) <= 3
+        assert tokens == sum(embedder.count_tokens(TEXTS[position]) for position in positions)
+        assert tokens <= 10 or len(positions) == 1
+
+
+def test_only_transient_errors_are_retried(no_backoff):
+    client = ShuffledClient(errors=[StatusError(429), StatusError(503), ConnectionError("reset")])
+    assert len(make_embedder(client).embed(TEXTS)) == len(TEXTS)
+    assert len(client.calls) == 4
+
+    client = ShuffledClient(errors=[StatusError(400)])
+    with pytest.raises(StatusError):
+        make_embedder(client).embed(TEXTS)
+    assert len(client.calls) == 1
+    assert not is_transient(ValueError("bad input"))
+
+
+def test_rate_limiter_blocks_until_tokens_refill():
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=6000)
+    limiter.acquire(6000)
+    start = time.monotonic()
+    limiter.acquire(30)
+    # 6000 tokens per minute refill at 100 per second.
+    assert time.monotonic() - start >= 0.25
+
+
+def test_embeds_through_the_mock_server():
+    with MockEmbeddingsServer(dim=DIMENSION, latency=0.0) as server:
+        client = OpenAI(api_key="test", base_url=server.base_url, max_retries=0)
+        embeddings = make_embedder(client, max_batch_items=4).embed(TEXTS)
+
+    assert server.requests == 3
+    for embedding, text in zip(embeddings, TEXTS):
+        assert embedding == pytest.approx(fake_embedding(text, DIMENSION), abs=1e-6)
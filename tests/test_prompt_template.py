@@ -0,0 +1,8 @@
+from prompt_template import PromptTemplate
+
+
+def test_unknown_fields_stay_literal():
+    template = PromptTemplate('Answer as JSON: {"answer": "..."} or {answer}.\n{context_text}\nQ: {question_text}')
+    prompt = template.render(context_text="Uses {question_text} literally.", question_text="What is SageMaker?")
+    assert prompt == ('Answer as JSON: {"answer": "..."} or {answer}.\nUses {question_text} literally.\n'
+                      'Q: What is SageMaker?')
@@ -0,0 +1,23 @@
+import pytest
+
+from local_index import LocalIndex
+from stubs import fake_embedding
+
+pytest.importorskip("pinecone")
+from query_openai import TextEmbeddingQuery  # noqa: E402
+
+DIMENSION = 8
+TEXTS = ["SageMaker hosts models.", "Pinecone stores vectors.", "Bedrock runs foundation models.", "Unused."]
+
+
+def test_query_and_query_batch_share_one_formatter(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    index = LocalIndex(DIMENSION)
+    index.upsert([(f"faq_{i}", fake_embedding(text, DIMENSION), {"text": text}) for i, text in enumerate(TEXTS)])
+    query = TextEmbeddingQuery(None, None, "kit", "test", index=index)
+    query.compute_embedding = lambda text: fake_embedding(text, DIMENSION)
+    query.batch_embedder.embed = lambda texts: [fake_embedding(text, DIMENSION) for text in texts]
+
+    text = query.query(TEXTS[1])
+    assert text.startswith("Query Results:\nMatch 1: ID = faq_1, Score = 1.000000, Snippet: Pinecone stores vectors.\n")
+    assert text == str(query.query_batch([TEXTS[1]])[0])
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+import sage_embeed_creator
+from sage_embeed_creator import EmbeddingCreator, EmbeddingFailure, is_throttled
+from stubs import FakePredictor, ThrottlingError
+
+WORDS = ["sagemaker", "endpoint", "model", "index", "vector", "query", "answer", "poison"]
+DOCS = [" ".join(WORDS[j % 7] for j in range(i + 1)) for i in range(9)]
+
+
+@pytest.fixture(scope="module")
+def tokenizer_dir(tmp_path_factory):
+    # A word-level BERT vocabulary on disk, so AutoTokenizer loads without the network.
+    path = tmp_path_factory.mktemp("tokenizer")
+    (path / "vocab.txt").write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS) + "\n")
+    (path / "tokenizer_config.json").write_text('{"tokenizer_class": "BertTokenizer", "do_lower_case": true}')
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(sage_embeed_creator.time, "sleep", lambda seconds: None)
+
+
+class PoisonPredictor(FakePredictor):
+    # Fails every request that carries the "poison" token.
+    def __init__(self, poison_id, **kwargs):
+        super().__init__(latency=0.0, **kwargs)
+        self.poison_id = poison_id
+
+    def predict(self, data):
+        if self.poison_id in np.asarray(data["inputs"]["input_ids"]):
+            raise ValueError("model error")
+        return super().predict(data)
+
+
+def reference(tokenizer_dir, docs):
+    return EmbeddingCreator(FakePredictor(latency=0.0), tokenizer_dir).embed_docs(docs)
+
+
+def test_batched_results_are_in_input_order(tokenizer_dir):
+    predictor = FakePredictor(latency=0.0, throttle_rate=0.5)
+    creator = EmbeddingCreator(predictor, tokenizer_dir, batch_size=2, max_retries=20)
+
+    results = creator.embed_docs_batched(DOCS)
+
+    assert predictor.throttled > 0
+    np.testing.assert_allclose(results, reference(tokenizer_dir, DOCS), atol=1e-5)
+
+
+def test_oversized_batches_are_halved(tokenizer_dir):
+    predictor = FakePredictor(latency=0.0)
+    creator = EmbeddingCreator(predictor, tokenizer_dir, batch_size=8, max_payload_bytes=170)
+
+    results = creator.embed_docs_batched(DOCS)
+
+    # DOCS[8] alone is over the limit; everything else gets through in smaller requests.
+    assert isinstance(results[8], EmbeddingFailure) and "exceeds 170" in results[8].error
+    assert predictor.calls > 2
+    np.testing.assert_allclose(results[:8], reference(tokenizer_dir, DOCS[:8]), atol=1e-5)
+
+
+def test_failed_request_marks_only_its_own_batch(tokenizer_dir):
+    creator = EmbeddingCreator(FakePredictor(latency=0.0), tokenizer_dir, batch_size=2)
+    poison_id = creator.tokenizer.convert_tokens_to_ids("poison")
+    creator.encoder = PoisonPredictor(poison_id)
+    # Sorted by length, the poisoned document (the longest) shares its request with DOCS[4].
+    docs = DOCS[:5] + ["sagemaker endpoint model index vector poison"]
+
+    results = creator.embed_docs_batched(docs)
+
+    failed = [position for position, result in enumerate(results) if isinstance(result, EmbeddingFailure)]
+    assert failed == [4, 5]
+    assert results[5].error == "model error"
+    np.testing.assert_allclose(results[:4], reference(tokenizer_dir, docs[:4]), atol=1e-5)
+
+
+def test_is_throttled():
+    class ClientError(Exception):
+        response = None
+
+    assert is_throttled(ThrottlingError())
+    assert not is_throttled(ClientError("validation failed"))
+    assert is_throttled(ClientError("Rate exceeded, request throttled"))
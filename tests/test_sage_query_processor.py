@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+from conversation_memory import ConversationMemory
+from local_index import LocalIndex
+from sage_query_processor import QueryProcessor
+from stubs import FakeEmbedder, FakeLLM, FakeStreamingRuntime, fake_embedding
+from tgi_stream import SageMakerStreamingLLM
+
+DIMENSION = 8
+TEMPLATE = "{history_text}\nContext: {context_text}\nQuestion: {question_text}\nAnswer:"
+SUMMARY_SECONDS = 0.3
+
+
+def slow_summarizer(summary, question, answer):
+    # Blocking like LLMSummarizer's predict call.
+    time.sleep(SUMMARY_SECONDS)
+    return f"{summary} {question}".strip()
+
+
+def make_processor(memory, llm=None):
+    index = LocalIndex(DIMENSION)
+    index.upsert([("faq", fake_embedding("faq", DIMENSION), {"text": "SageMaker hosts models."})])
+    return QueryProcessor(llm or FakeLLM(latency=0.0), index, TEMPLATE, FakeEmbedder(DIMENSION, latency=0.0),
+                          top_k=1, memory=memory)
+
+
+def test_async_memory_calls_run_concurrently():
+    memory = ConversationMemory(window=1, summarizer=slow_summarizer)
+    processor = make_processor(memory)
+    sessions = [f"user-{i}" for i in range(4)]
+    for session_id in sessions:
+        memory.add_turn(session_id, "first question", "first answer")
+
+    start = time.perf_counter()
+    answers = asyncio.run(processor.arag_query_many(["second question"] * 4, session_ids=sessions))
+    seconds = time.perf_counter() - start
+
+    # Each second turn summarises the first; run one after another on the loop they would take 4 * 0.3 s.
+    assert seconds < 2 * SUMMARY_SECONDS
+    assert all(answer.startswith("answer to:") for answer in answers)
+    assert all("first question" in memory.history(session_id) for session_id in sessions)
+
+
+def test_async_stream_records_the_turn_off_the_loop():
+    memory = ConversationMemory(window=1, summarizer=slow_summarizer)
+    llm = SageMakerStreamingLLM("tgi", runtime_client=FakeStreamingRuntime(ttft=0.0, token_latency=0.0, tokens=3))
+    processor = make_processor(memory, llm)
+    memory.add_turn("user", "first question", "first answer")
+
+    async def consume():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        answer = [token async for token in processor.arag_query_stream("second question", "user")]
+        ticker.cancel()
+        return answer, ticks
+
+    answer, ticks = asyncio.run(consume())
+    assert answer
+    # The event loop kept running while the summary was written.
+    assert ticks >= SUMMARY_SECONDS / 0.01 / 2
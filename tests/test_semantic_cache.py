@@ -0,0 +1,21 @@
+import semantic_cache
+from semantic_cache import SemanticCache
+
+VECTOR = [1.0, 0.0, 0.0]
+
+
+def test_answers_without_generation_expire_sooner(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(semantic_cache.time, "monotonic", lambda: now[0])
+    cache = SemanticCache(3, ttl=3600, ungenerated_ttl=300)
+    cache.put("local", VECTOR, "from LocalIndex", generation=1)
+    assert cache.get(VECTOR, generation=1) == "from LocalIndex"
+    cache.invalidate()
+    cache.put("pinecone", VECTOR, "from Pinecone")
+
+    now[0] = 301.0
+    assert cache.get(VECTOR) is None
+    cache.put("local", VECTOR, "from LocalIndex", generation=1)
+    now[0] = 3000.0
+    assert cache.get(VECTOR, generation=1) == "from LocalIndex"
+    assert cache.get(VECTOR, generation=2) is None
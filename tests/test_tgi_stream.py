@@ -0,0 +1,67 @@
+import json
+import time
+
+import pytest
+
+from local_index import LocalIndex
+from sage_query_processor import QueryProcessor
+from semantic_cache import SemanticCache
+from stubs import FakeEmbedder, FakeStreamingRuntime, fake_embedding
+from tgi_stream import SageMakerStreamingLLM, iter_lines, iter_tgi_tokens
+
+DIMENSION = 8
+
+
+def event(text, special=False):
+    return f"data:{json.dumps({'token': {'id': 0, 'text': text, 'special': special}})}\n\n".encode("utf-8")
+
+
+STREAM = event(" Amazon") + event(" Sageé") + event("Maker") + event("</s>", special=True)
+
+
+def test_events_split_at_any_offset():
+    lines = list(iter_lines([STREAM]))
+    for cut in range(1, len(STREAM)):
+        assert list(iter_lines([STREAM[:cut], STREAM[cut:]])) == lines
+        assert "".join(iter_tgi_tokens([STREAM[:cut], STREAM[cut:]])) == " Amazon SageéMaker"
+
+
+def test_byte_at_a_time_skips_special_tokens():
+    tokens = list(iter_tgi_tokens(STREAM[i:i + 1] for i in range(len(STREAM))))
+    assert tokens == [" Amazon", " Sageé", "Maker"]
+
+
+def test_error_event_raises():
+    chunks = [event(" partial"), b'data:{"error": "Request failed during generation", "error_type": "generation"}\n\n']
+    with pytest.raises(RuntimeError, match="Request failed during generation"):
+        list(iter_tgi_tokens(chunks))
+
+
+def make_processor(runtime):
+    index = LocalIndex(DIMENSION)
+    index.upsert([("faq", fake_embedding("faq", DIMENSION), {"text": "SageMaker hosts models."})])
+    return QueryProcessor(SageMakerStreamingLLM("tgi", runtime_client=runtime), index,
+                          "Context: {context_text}\nQuestion: {question_text}\nAnswer:",
+                          FakeEmbedder(DIMENSION, latency=0.0), top_k=1,
+                          answer_cache=SemanticCache(DIMENSION, threshold=0.99))
+
+
+def test_first_token_arrives_before_generation_ends():
+    processor = make_processor(FakeStreamingRuntime(ttft=0.05, token_latency=0.02, tokens=10))
+    start = time.perf_counter()
+    stream = processor.rag_query_stream("What is SageMaker?")
+    next(stream)
+    first = time.perf_counter() - start
+    list(stream)
+    total = time.perf_counter() - start
+
+    assert first < 0.05 + 0.02 * 3 < total
+
+
+def test_streamed_answer_is_what_gets_cached():
+    processor = make_processor(FakeStreamingRuntime(ttft=0.0, token_latency=0.0, tokens=6))
+    tokens = list(processor.rag_query_stream("What is SageMaker?"))
+
+    assert len(tokens) == 6
+    assert list(processor.rag_query_stream("What is SageMaker?")) == ["".join(tokens)]
+    assert processor.answer_cache.stats()["hits"] == 1
@@ -0,0 +1,63 @@
+from index_manifest import IndexManifest, content_hash
+from local_index import LocalIndex
+from upload_pipeline import incremental_upsert, is_empty_index, prepare_manifest
+
+DIMENSION = 4
+RECORDS = [(f"faq_{i}", f"segment {i}", {"text": f"segment {i}"}) for i in range(5)]
+
+
+def embed_batch(texts):
+    return [[float(len(text)), 1.0, 0.0, 0.0] for text in texts]
+
+
+def write_previous_manifest(path):
+    # A manifest left behind by an earlier run that indexed every record.
+    manifest = IndexManifest(path)
+    manifest.update({vector_id: content_hash(text) for vector_id, text, _ in RECORDS})
+    manifest.close()
+
+
+def test_incremental_run_on_fresh_index_ignores_stale_manifest(tmp_path):
+    path = str(tmp_path / "kit_manifest.sqlite3")
+    write_previous_manifest(path)
+    index = LocalIndex(DIMENSION)
+
+    manifest = prepare_manifest(path, incremental=True, fresh_index=is_empty_index(index))
+    summary = incremental_upsert(index, iter(RECORDS), embed_batch, manifest, batch_size=2)
+
+    assert len(index) == len(RECORDS)
+    assert summary.vectors == len(RECORDS)
+    assert summary.skipped == 0
+    assert set(manifest.hashes()) == {vector_id for vector_id, _, _ in RECORDS}
+
+
+def test_incremental_run_on_populated_index_skips_unchanged(tmp_path):
+    path = str(tmp_path / "kit_manifest.sqlite3")
+    write_previous_manifest(path)
+    index = LocalIndex(DIMENSION)
+    index.upsert([(vector_id, values, metadata) for (vector_id, _, metadata), values
+                  in zip(RECORDS, embed_batch([text for _, text, _ in RECORDS]))])
+
+    manifest = prepare_manifest(path, incremental=True, fresh_index=is_empty_index(index))
+    summary = incremental_upsert(index, iter(RECORDS), embed_batch, manifest, batch_size=2)
+
+    assert summary.vectors == 0
+    assert summary.skipped == len(RECORDS)
+
+
+def test_rebuild_records_what_reached_the_index(tmp_path):
+    path = str(tmp_path / "kit_manifest.sqlite3")
+    write_previous_manifest(path)
+    index = LocalIndex(DIMENSION)
+    changed = [(vector_id, f"{text} (edited)", metadata) for vector_id, text, metadata in RECORDS]
+
+    manifest = prepare_manifest(path, incremental=False, fresh_index=True)
+    summary = incremental_upsert(index, iter(changed), embed_batch, manifest, batch_size=2)
+    assert summary.vectors == len(RECORDS)
+    assert summary.skipped == 0
+
+    # The next incremental run trusts the rebuilt manifest and re-embeds nothing.
+    manifest = prepare_manifest(path, incremental=True, fresh_index=is_empty_index(index))
+    summary = incremental_upsert(index, iter(changed), embed_batch, manifest, batch_size=2)
+    assert summary.vectors == 0
+    assert summary.skipped == len(RECORDS)
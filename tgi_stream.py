@@ -0,0 +1,57 @@
+import json
+
+
+def iter_lines(chunks):
+    # Reassemble newline-terminated lines from byte chunks that may split them anywhere.
+    buffer = b""
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        yield from lines
+    if buffer:
+        yield buffer
+
+
+def iter_tgi_tokens(chunks):
+    '''
+    Yield generated text pieces from a Text Generation Inference server-sent
+    event stream ("data:{"token": {"text": ...}, ...}" lines). Special tokens such
+    as </s> are skipped; an error event raises RuntimeError.
+    '''
+    for line in iter_lines(chunks):
+        line = line.strip()
+        if not line.startswith(b"data:"):
+            continue
+        event = json.loads(line[len(b"data:"):])
+        if event.get("error"):
+            raise RuntimeError(f"Generation failed: {event['error']}")
+        token = event.get("token") or {}
+        if not token.get("special"):
+            yield token.get("text", "")
+
+
+class SageMakerStreamingLLM:
+    '''
+    Client for a SageMaker endpoint running the Hugging Face LLM (TGI) container.
+    predict() takes and returns the same payloads as HuggingFacePredictor.predict;
+    stream() yields tokens as the endpoint generates them through
+    InvokeEndpointWithResponseStream. Pass it as QueryProcessor's llm_predictor to
+    use rag_query_stream / arag_query_stream.
+    '''
+    def __init__(self, endpoint_name, runtime_client=None):
+        if runtime_client is None:
+            import boto3
+            runtime_client = boto3.client("sagemaker-runtime")
+        self.endpoint_name = endpoint_name
+        self.runtime = runtime_client
+
+    def predict(self, data):
+        response = self.runtime.invoke_endpoint(EndpointName=self.endpoint_name, ContentType="application/json",
+                                                Body=json.dumps(data))
+        return json.loads(response["Body"].read())
+
+    def stream(self, data):
+        response = self.runtime.invoke_endpoint_with_response_stream(
+            EndpointName=self.endpoint_name, ContentType="application/json", Body=json.dumps(dict(data, stream=True)))
+        chunks = (event["PayloadPart"]["Bytes"] for event in response["Body"] if "PayloadPart" in event)
+        yield from iter_tgi_tokens(chunks)
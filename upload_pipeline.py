@@ -0,0 +1,170 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+
+from index_manifest import IndexManifest, content_hash
+
+
+def batched(iterable, size):
+    # Yield lists of at most `size` items without materialising the iterable.
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_segment_records(iter_chunks, file_paths):
+    # Yield (vector_id, text, metadata) for every chunk of every file, lazily.
+    # iter_chunks(file_path, prefix) yields chunker.Chunk objects with stable IDs.
+    for file_type, file_path in file_paths.items():
+        for chunk in iter_chunks(file_path, file_type):
+            yield chunk.id, chunk.text, {"text": chunk.text, "type": file_type}
+
+
+def iter_vector_batches(records, embed_batch, batch_size=100):
+    # Embed records one batch at a time and yield upsert-ready (id, values, metadata) lists.
+    for batch in batched(records, batch_size):
+        ids, texts, metadata = zip(*batch)
+        embeddings = embed_batch(list(texts))
+        yield list(zip(ids, embeddings, metadata))
+
+
+@dataclass
+class UpsertSummary:
+    vectors: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    failed_ids: list = field(default_factory=list)
+    skipped: int = 0
+    deleted_ids: list = field(default_factory=list)
+
+    @property
+    def vectors_per_sec(self):
+        return self.vectors / self.seconds if self.seconds else 0.0
+
+
+def upsert_with_retry(index, batch, max_retries=3, backoff=0.5):
+    # Upsert one batch, retrying failures with exponential backoff and full jitter.
+    for attempt in range(max_retries + 1):
+        try:
+            index.upsert(vectors=batch)
+            return
+        except Exception:
+            if attempt == max_retries:
+                raise
+            time.sleep(random.uniform(0, backoff * (2 ** attempt)))
+
+
+def concurrent_upsert(index, vector_batches, max_workers=4, max_in_flight=None, max_retries=3, backoff=0.5):
+    '''
+    Upserts batches from `vector_batches` on a thread pool that shares one index
+    client. At most `max_in_flight` requests are outstanding; producing the next
+    batch (e.g. embedding) blocks until a slot frees up. Batches that still fail
+    after `max_retries` are reported in the summary instead of aborting the run.
+    '''
+    max_in_flight = max_in_flight or max_workers * 2
+    slots = threading.BoundedSemaphore(max_in_flight)
+    lock = threading.Lock()
+    summary = UpsertSummary()
+
+    def send(batch):
+        try:
+            upsert_with_retry(index, batch, max_retries=max_retries, backoff=backoff)
+            with lock:
+                summary.vectors += len(batch)
+        except Exception as e:
+            print(f"Failed to upsert batch of {len(batch)} vectors: {e}")
+            with lock:
+                summary.failed_ids.extend(vector[0] for vector in batch)
+        finally:
+            slots.release()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upsert") as pool:
+        for batch in vector_batches:
+            slots.acquire()
+            summary.batches += 1
+            pool.submit(send, batch)
+    summary.seconds = time.perf_counter() - start
+
+    return summary
+
+
+def sync_lexical_index(records, lexical_index, batch_size=1000):
+    '''
+    Passes `records` through unchanged while upserting them, `batch_size` at
+    a time, into a lexical index (hybrid_search.BM25Index) kept next to the
+    vector index. Once the records are exhausted, IDs the lexical index holds
+    that were not among them are deleted, so it matches this upload whether
+    the run was incremental or a rebuild.
+    '''
+    seen = set()
+    for batch in batched(records, batch_size):
+        lexical_index.upsert(batch)
+        seen.update(vector_id for vector_id, _, _ in batch)
+        yield from batch
+    lexical_index.delete([vector_id for vector_id in list(lexical_index.ids) if vector_id not in seen])
+
+
+def is_empty_index(index):
+    # Indexes that support len() (LocalIndex) can be checked directly; others are assumed populated.
+    return hasattr(index, "__len__") and len(index) == 0
+
+
+def prepare_manifest(path, incremental, fresh_index):
+    '''
+    Opens the manifest an upload diffs against. A full rebuild, or a new or
+    empty index, holds none of the segments a previous run recorded, so the
+    manifest is cleared; the run then upserts everything through
+    incremental_upsert and records what reached the index, which lets the next
+    incremental run skip it.
+    '''
+    manifest = IndexManifest(path)
+    if not incremental or fresh_index:
+        manifest.clear()
+    return manifest
+
+
+def incremental_upsert(index, records, embed_batch, manifest, batch_size=100, delete_batch_size=1000, **upsert_options):
+    '''
+    Brings the index in line with `records` without taking it offline. Only
+    segments whose content hash differs from the manifest are embedded and
+    upserted; IDs in the manifest that no longer appear are deleted. The manifest
+    is only updated for vectors that actually reached the index.
+    '''
+    known = manifest.hashes()
+    seen = set()
+    pending = {}
+    skipped = 0
+
+    def changed_records():
+        nonlocal skipped
+        for vector_id, text, metadata in records:
+            seen.add(vector_id)
+            digest = content_hash(text)
+            if known.get(vector_id) == digest:
+                skipped += 1
+                continue
+            pending[vector_id] = digest
+            yield vector_id, text, metadata
+
+    vector_batches = iter_vector_batches(changed_records(), embed_batch, batch_size=batch_size)
+    summary = concurrent_upsert(index, vector_batches, **upsert_options)
+    summary.skipped = skipped
+
+    for vector_id in summary.failed_ids:
+        pending.pop(vector_id, None)
+    manifest.update(pending)
+
+    removed = [vector_id for vector_id in known if vector_id not in seen]
+    for ids in batched(removed, delete_batch_size):
+        index.delete(ids=ids)
+        manifest.remove(ids)
+        summary.deleted_ids.extend(ids)
+
+    return summary
@@ -2,77 +2,105 @@
 from transformers import AutoTokenizer, AutoModel
 import pinecone
 
+from chunker import TokenChunker
+from embedding_engine import BatchEmbeddingEngine
+from upload_pipeline import (batched, iter_segment_records, incremental_upsert, is_empty_index, prepare_manifest,
+                             sync_lexical_index)
+
 
 class EmbeddingUploader:
     '''
     This class uploads embeeding to PineCone using Hugging Face open source 
     model_name = "bert-large-uncased-whole-word-masking-finetuned-squad"
+    With incremental=True the index is kept online and only new or changed
+    segments are re-embedded, tracked by a local SQLite manifest.
     '''
-    def __init__(self, pinecone_api_key, pinecone_env, index_name, model_name):
-        # Initialize Pinecone
-        pinecone.init(api_key=pinecone_api_key, environment=pinecone_env)
-        existing_indexes = pinecone.list_indexes()
-        if index_name in existing_indexes:
-            pinecone.delete_index(index_name)
-        pinecone.create_index(index_name, dimension=1024)  
-        self.index = pinecone.Index(index_name)
+    def __init__(self, pinecone_api_key, pinecone_env, index_name, model_name, batch_size=16, upsert_workers=4,
+                 incremental=False, manifest_path=None, embedding_cache=None, index=None, chunker=None):
+        self.upsert_workers = upsert_workers
+
+        if index is not None:
+            # Caller-supplied index (e.g. local_index.LocalIndex); Pinecone is not used
+            self.index = index
+            if not incremental:
+                self.index.delete(delete_all=True)
+            fresh_index = is_empty_index(self.index)
+        else:
+            # Initialize Pinecone
+            pinecone.init(api_key=pinecone_api_key, environment=pinecone_env)
+            existing_indexes = pinecone.list_indexes()
+            if not incremental and index_name in existing_indexes:
+                pinecone.delete_index(index_name)
+            if not incremental or index_name not in existing_indexes:
+                pinecone.create_index(index_name, dimension=1024)
+            # One pooled client shared by all upsert workers
+            self.index = pinecone.Index(index_name, pool_threads=upsert_workers)
+            fresh_index = not incremental or index_name not in existing_indexes
+
+        # Every run records what reached the index; a rebuild or a new or emptied index starts the manifest over
+        self.manifest = prepare_manifest(manifest_path or f"{index_name}_manifest.sqlite3", incremental, fresh_index)
 
         # Load the specified text embedding model
+        self.model_name = model_name
+        self.embedding_cache = embedding_cache
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         self.model = AutoModel.from_pretrained(model_name)
 
+        # Batched, length-bucketed embedding path used for uploads
+        self.engine = BatchEmbeddingEngine(self.tokenizer, self.model, batch_size=batch_size)
+        # Sentence packing up to the model's token budget; pass chunker to change size or overlap
+        self.chunker = chunker or TokenChunker.for_model(self.tokenizer)
+
 
     def read_file_segments(self, file_path):
-        with open(file_path, 'r', encoding='utf-8') as file:
-            # Read all lines from the file
-            lines = file.readlines()
-
-        segments = []
-        segment = ""
-        for line in lines:
-            # Check if the line is not just a newline character
-            if line.strip():
-                # Add the line to the current segment
-                segment += line.strip() + " "
-            else:
-                # If the line is empty and there is a current segment, add it to the segments list
-                if segment:
-                    segments.append(segment.strip())
-                    segment = ""  # Reset the segment
-
-        # Add the last segment if it's not empty
-        if segment:
-            segments.append(segment.strip())
-
-        return segments
+        return list(self.iter_file_segments(file_path))
+
+    def iter_file_segments(self, file_path):
+        # Stream the file and yield token-bounded chunks that fit the model's context
+        for chunk in self.chunker.iter_file_chunks(file_path):
+            yield chunk.text
 
 
     def generate_embedding(self, text):
-        # Adjust the max_length to capture more context if needed
-        max_length = 1024  # or another value that works better for your data
+        # BERT cannot attend past 512 positions, so longer inputs are truncated there
+        max_length = 512
         inputs = self.tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=max_length)
         outputs = self.model(**inputs)
         embeddings = outputs.last_hidden_state.mean(dim=1).detach().numpy()
         return embeddings[0]
 
-
-    def upload_embeddings(self, file_paths):
-        vectors_to_upsert = {}
-        for file_type, file_path in file_paths.items():
-            segments = self.read_file_segments(file_path)
-            for i, segment in enumerate(segments):
-                embedding = self.generate_embedding(segment)
-                vectors_to_upsert[f"{file_type}_{i}"] = {
-                    "values": embedding.tolist(),
-                    "metadata": {"text": segment, "type": file_type}
-                }
-
-        self.batch_upsert(vectors_to_upsert)
+    def generate_embeddings(self, texts, batch_size=None):
+        # Embed many segments at once; rows are returned in the same order as texts.
+        return self.engine.embed(texts, batch_size=batch_size)
+
+
+    def upload_embeddings(self, file_paths, batch_size=100, max_in_flight=None, lexical_index=None):
+        # Stream read -> embed -> upsert; at most max_in_flight embedded batches wait in memory.
+        # Returns an UpsertSummary with throughput and the IDs that could not be upserted.
+        # With lexical_index (hybrid_search.BM25Index), the same records keep it in step with the vector index.
+        records = iter_segment_records(self.chunker.iter_file_chunks, file_paths)
+        if lexical_index is not None:
+            records = sync_lexical_index(records, lexical_index)
+        summary = incremental_upsert(self.index, records, self.embed_batch, self.manifest, batch_size=batch_size,
+                                     max_workers=self.upsert_workers, max_in_flight=max_in_flight)
+
+        # Local indexes persist to disk once the run is complete
+        if hasattr(self.index, "flush"):
+            self.index.flush()
+        return summary
+
+    def embed_batch(self, texts):
+        # Unchanged segments come from the embedding cache, if one is configured
+        if self.embedding_cache is not None:
+            embeddings = self.embedding_cache.embed(self.model_name, texts, self.generate_embeddings)
+        else:
+            embeddings = self.generate_embeddings(texts)
+        return [embedding.tolist() for embedding in embeddings]
 
     def batch_upsert(self, data):
         batch_size = 100  # Recommended upsert limit
-        for i in range(0, len(data), batch_size):
-            batch_data = [(k, v['values'], v['metadata']) for k, v in list(data.items())[i:i + batch_size]]
+        for batch in batched(data.items(), batch_size):
+            batch_data = [(k, v['values'], v['metadata']) for k, v in batch]
             self.index.upsert(vectors=batch_data)
 
 
@@ -2,72 +2,109 @@ import openai
 from openai import OpenAI
 import pinecone
 
+from chunker import TokenChunker
+from openai_batch_embedder import OpenAIBatchEmbedder
+from upload_pipeline import (batched, iter_segment_records, incremental_upsert, is_empty_index, prepare_manifest,
+                             sync_lexical_index)
+
 class EmbeddingUploader:
     '''
     This class uses OpenAI to create the embeedings that are uploaded to PineCone for
-    later search.
+    later search. With incremental=True the existing index stays online and only
+    new or changed segments are embedded, based on a local SQLite manifest.
+    Segments are embedded in packed, rate-limited batches by an OpenAIBatchEmbedder;
+    pass batch_embedder to tune the token/item budgets and RPM/TPM limits.
     '''
-    def __init__(self, pinecone_api_key, pinecone_env, index_name, openai_api_key):
-        # Initialize Pinecone with the provided API key and environment.
-        pinecone.init(api_key=pinecone_api_key, environment=pinecone_env)
+    def __init__(self, pinecone_api_key, pinecone_env, index_name, openai_api_key, upsert_workers=4,
+                 incremental=False, manifest_path=None, embedding_cache=None,
+                 batch_embedder=None, index=None, chunker=None):
+        self.upsert_workers = upsert_workers
+
+        if index is not None:
+            # Use a caller-supplied index (e.g. local_index.LocalIndex) instead of Pinecone.
+            self.index = index
+            if not incremental:
+                self.index.delete(delete_all=True)
+            fresh_index = is_empty_index(self.index)
+        else:
+            # Initialize Pinecone with the provided API key and environment.
+            pinecone.init(api_key=pinecone_api_key, environment=pinecone_env)
+            existing_indexes = pinecone.list_indexes()
+
+            # Check if the specified index already exists in Pinecone; if so, delete it unless incremental.
+            if not incremental and index_name in existing_indexes:
+                pinecone.delete_index(index_name)
+
+            # Create a new Pinecone index with the specified name and a fixed dimension size.
+            if not incremental or index_name not in existing_indexes:
+                pinecone.create_index(index_name, dimension=1536)
 
-        # Check if the specified index already exists in Pinecone; if so, delete it.
-        existing_indexes = pinecone.list_indexes()
-        if index_name in existing_indexes:
-            pinecone.delete_index(index_name)
+            # The index client is pooled and shared by all upsert worker threads.
+            self.index = pinecone.Index(index_name, pool_threads=upsert_workers)
+            fresh_index = not incremental or index_name not in existing_indexes
 
-        # Create a new Pinecone index with the specified name and a fixed dimension size.
-        pinecone.create_index(index_name, dimension=1536)  
-        self.index = pinecone.Index(index_name)
+        # The manifest decides what needs re-embedding; it is reset on a rebuild or when the index starts out empty.
+        self.manifest = prepare_manifest(manifest_path or f"{index_name}_manifest.sqlite3", incremental, fresh_index)
 
         # Initialize the OpenAI client with the provided API key.
         openai.api_key = openai_api_key
         self.client = OpenAI()
+        self.embedding_model = "text-embedding-ada-002"
+        self.batch_embedder = batch_embedder or OpenAIBatchEmbedder(self.client, self.embedding_model)
 
-    def read_file_segments(self, file_path):
-        # Read the content of a file and split it into segments based on empty lines.
-        with open(file_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
+        # Chunks are counted with the same tiktoken encoding the batch embedder uses.
+        self.chunker = chunker or TokenChunker(
+            lambda texts: [self.batch_embedder.count_tokens(text) for text in texts], max_tokens=512)
 
-        segments = []
-        segment = ""
-        for line in lines:
-            if line.strip():
-                segment += line.strip() + " "
-            else:
-                if segment:
-                    segments.append(segment.strip())
-                    segment = ""
+        # Optional EmbeddingCache so unchanged segments are not sent to OpenAI again.
+        self.embedding_cache = embedding_cache
 
-        if segment:
-            segments.append(segment.strip())
+    def read_file_segments(self, file_path):
+        # Read the content of a file and split it into token-bounded chunks.
+        return list(self.iter_file_segments(file_path))
 
-        return segments
+    def iter_file_segments(self, file_path):
+        # Stream the file and yield chunks of whole sentences packed up to the token budget.
+        for chunk in self.chunker.iter_file_chunks(file_path):
+            yield chunk.text
 
     def generate_embedding(self, text, model="text-embedding-ada-002"):
         # Generate an embedding for the given text using a specified OpenAI model.
         text = text.replace("\n", " ")
         return self.client.embeddings.create(input=[text], model=model).data[0].embedding
 
-    def upload_embeddings(self, file_paths):
-        # Process each file and upload its embeddings to the Pinecone index.
-        vectors_to_upsert = {}
-        for file_type, file_path in file_paths.items():
-            segments = self.read_file_segments(file_path)
-            for i, segment in enumerate(segments):
-                embedding = self.generate_embedding(segment)
-                vectors_to_upsert[f"{file_type}_{i}"] = {
-                    "values": embedding,
-                    "metadata": {"text": segment, "type": file_type}
-                }
+    def upload_embeddings(self, file_paths, batch_size=100, max_in_flight=None, lexical_index=None):
+        # Stream each file through embedding and upsert, keeping at most
+        # max_in_flight embedded batches in memory at any time. Returns an UpsertSummary.
+        # A lexical_index (hybrid_search.BM25Index) is updated from the same records as the vector index.
+        records = iter_segment_records(self.chunker.iter_file_chunks, file_paths)
+        if lexical_index is not None:
+            records = sync_lexical_index(records, lexical_index)
+        # Only embed what changed since the last run and drop segments that disappeared.
+        summary = incremental_upsert(self.index, records, self.embed_batch, self.manifest, batch_size=batch_size,
+                                     max_workers=self.upsert_workers, max_in_flight=max_in_flight)
+
+        # Persist a local index to disk once the run has finished.
+        if hasattr(self.index, "flush"):
+            self.index.flush()
+        return summary
+
+    def embed_batch(self, texts):
+        # Generate embeddings for a batch of segments, in order, reusing cached ones.
+        if self.embedding_cache is not None:
+            embeddings = self.embedding_cache.embed(self.embedding_model, texts, self.embed_uncached)
+            return [embedding.tolist() for embedding in embeddings]
+        return self.embed_uncached(texts)
 
-        self.batch_upsert(vectors_to_upsert)
+    def embed_uncached(self, texts):
+        # Many segments per embeddings.create request instead of one.
+        return self.batch_embedder.embed(texts)
 
     def batch_upsert(self, data):
         # Batch upsert operation to add vectors to the Pinecone index in batches.
         batch_size = 100
-        for i in range(0, len(data), batch_size):
-            batch_data = [(k, v['values'], v['metadata']) for k, v in list(data.items())[i:i + batch_size]]
+        for batch in batched(data.items(), batch_size):
+            batch_data = [(k, v['values'], v['metadata']) for k, v in batch]
             self.index.upsert(vectors=batch_data)
 
 if __name__ == "__main__":